@@ -0,0 +1,47 @@
+"""Add composite indexes for hot activity and category queries
+
+Revision ID: 3b1e6c9d2f47
+Revises: dbb233098afe
+Create Date: 2026-10-16 10:12:03.418227
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b1e6c9d2f47'
+down_revision: Union[str, Sequence[str], None] = 'dbb233098afe'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (name, table, columns) - must match __table_args__ in models.py
+INDEXES = [
+    # Calendar windows ordered by time: get_activities, last end time
+    ("ix_loggedactivity_user_id_activity_date_start_time", "loggedactivity", ["user_id", "activity_date", "start_time"]),
+    # Psychological-day windows: bootstrap pages, rollup rebuilds
+    ("ix_loggedactivity_user_id_effective_date", "loggedactivity", ["user_id", "effective_date"]),
+    # One category over a calendar window: sleep lookups, challenge attribution
+    ("ix_loggedactivity_user_id_category_id_activity_date", "loggedactivity", ["user_id", "category_id", "activity_date"]),
+    # Case-insensitive category name lookups (the Sleep category, duplicate checks)
+    ("ix_category_user_id_lower_name", "category", ["user_id", sa.text("lower(name)")]),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY can't run inside a transaction, but keeps the tables writable
+    # while the indexes build on Postgres
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, unique=False, if_not_exists=True, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
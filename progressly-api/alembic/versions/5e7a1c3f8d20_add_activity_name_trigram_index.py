@@ -0,0 +1,40 @@
+"""Add pg_trgm GIN index on loggedactivity.activity_name for search
+
+Revision ID: 5e7a1c3f8d20
+Revises: 8c2d4e7a9b15
+Create Date: 2026-10-16 17:05:12.640391
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e7a1c3f8d20'
+down_revision: Union[str, Sequence[str], None] = '8c2d4e7a9b15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_loggedactivity_activity_name_trgm', 'loggedactivity', ['activity_name'],
+            unique=False, if_not_exists=True, postgresql_concurrently=True,
+            postgresql_using='gin', postgresql_ops={'activity_name': 'gin_trgm_ops'}
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # pg_trgm is left installed - other objects may depend on it
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_loggedactivity_activity_name_trgm', table_name='loggedactivity',
+            if_exists=True, postgresql_concurrently=True
+        )
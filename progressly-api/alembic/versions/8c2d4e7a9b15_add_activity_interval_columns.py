@@ -0,0 +1,59 @@
+"""Add persisted start_at/end_at/duration_minutes to loggedactivity
+
+Revision ID: 8c2d4e7a9b15
+Revises: 3b1e6c9d2f47
+Create Date: 2026-10-16 14:37:51.902114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c2d4e7a9b15'
+down_revision: Union[str, Sequence[str], None] = '3b1e6c9d2f47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Same derivation as models.activity_interval(): activity_date's calendar day plus
+# the start/end time, end rolled to the next day for overnight activities,
+# duration in whole minutes (seconds ignored)
+BACKFILL_SQL = """
+UPDATE loggedactivity SET
+    start_at = date_trunc('day', activity_date) + start_time,
+    end_at = date_trunc('day', activity_date) + end_time
+        + CASE WHEN end_time < start_time THEN interval '1 day' ELSE interval '0' END,
+    duration_minutes = (extract(hour FROM end_time) * 60 + extract(minute FROM end_time))
+        - (extract(hour FROM start_time) * 60 + extract(minute FROM start_time))
+        + CASE WHEN end_time < start_time THEN 1440 ELSE 0 END
+WHERE start_at IS NULL
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('loggedactivity', sa.Column('start_at', sa.DateTime(), nullable=True))
+    op.add_column('loggedactivity', sa.Column('end_at', sa.DateTime(), nullable=True))
+    op.add_column('loggedactivity', sa.Column('duration_minutes', sa.Integer(), nullable=True))
+    op.execute(BACKFILL_SQL)
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_loggedactivity_user_id_start_at', 'loggedactivity', ['user_id', 'start_at'],
+            unique=False, if_not_exists=True, postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_loggedactivity_user_id_start_at', table_name='loggedactivity',
+            if_exists=True, postgresql_concurrently=True
+        )
+    op.drop_column('loggedactivity', 'duration_minutes')
+    op.drop_column('loggedactivity', 'end_at')
+    op.drop_column('loggedactivity', 'start_at')
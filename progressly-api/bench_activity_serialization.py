@@ -0,0 +1,111 @@
+"""
+Benchmark: per-row cost of serializing activity listings.
+
+Compares the old path (ORM objects + selectinload -> ActivityReadWithCategory
+-> response_model validation -> JSON) with the projection fast path in
+utils/activity_json.py (column SELECT joined to Category -> dicts -> JSON).
+
+Runs against an in-memory SQLite database, so it needs no configuration:
+    python bench_activity_serialization.py
+"""
+import time as timer
+from datetime import datetime, date, time, timedelta
+from typing import List
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from sqlmodel import Session, SQLModel, create_engine, select
+from sqlalchemy.orm import selectinload
+
+from models import LoggedActivity, Category, ActivityReadWithCategory
+from utils.activity_json import activity_projection, activity_rows_to_dicts, dumps
+
+ROW_COUNTS = [1000, 5000, 20000]
+REPEATS = 3
+USER_ID = "bench-user"
+
+
+def seed(session: Session, rows: int):
+    categories = [Category(user_id=USER_ID, name=f"Category {i}", color="#3B82F6") for i in range(8)]
+    session.add_all(categories)
+    session.flush()
+
+    start = date(2024, 1, 1)
+    session.add_all([
+        LoggedActivity(
+            user_id=USER_ID,
+            activity_name=f"Activity {i}",
+            start_time=time(i % 24, 0),
+            end_time=time((i + 1) % 24, 30),
+            activity_date=datetime.combine(start + timedelta(days=i // 10), time(12, 0)),
+            effective_date=start + timedelta(days=i // 10),
+            category_id=categories[i % len(categories)].id if i % 5 else None,
+        )
+        for i in range(rows)
+    ])
+    session.commit()
+
+
+def old_path(session: Session) -> bytes:
+    activities = session.exec(
+        select(LoggedActivity)
+        .options(selectinload(LoggedActivity.category_rel))
+        .where(LoggedActivity.user_id == USER_ID)
+        .order_by(LoggedActivity.activity_date.asc(), LoggedActivity.start_time.asc())
+    ).all()
+
+    models = []
+    for a in activities:
+        category_obj = None
+        if a.category_rel:
+            category_obj = {"id": a.category_rel.id, "name": a.category_rel.name, "color": a.category_rel.color}
+        models.append(ActivityReadWithCategory(
+            id=a.id,
+            activity_name=a.activity_name,
+            start_time=a.start_time,
+            end_time=a.end_time,
+            activity_date=a.activity_date,
+            effective_date=a.effective_date,
+            user_id=a.user_id,
+            category_id=a.category_id,
+            category=category_obj,
+        ))
+
+    # What FastAPI does with response_model: validate again, then encode
+    validated = TypeAdapter(List[ActivityReadWithCategory]).validate_python(models, from_attributes=True)
+    return dumps(jsonable_encoder(validated))
+
+
+def new_path(session: Session) -> bytes:
+    rows = session.exec(
+        activity_projection()
+        .where(LoggedActivity.user_id == USER_ID)
+        .order_by(LoggedActivity.activity_date.asc(), LoggedActivity.start_time.asc())
+    ).all()
+    return dumps(activity_rows_to_dicts(rows))
+
+
+def best_of(fn, session: Session) -> float:
+    best = float("inf")
+    for _ in range(REPEATS):
+        session.expunge_all()  # Don't let the identity map hide ORM load cost
+        started = timer.perf_counter()
+        fn(session)
+        best = min(best, timer.perf_counter() - started)
+    return best
+
+
+def run_benchmark():
+    print(f"{'rows':>8} {'old us/row':>12} {'new us/row':>12} {'speedup':>9}")
+    for rows in ROW_COUNTS:
+        engine = create_engine("sqlite://")
+        SQLModel.metadata.create_all(engine)
+        with Session(engine) as session:
+            seed(session, rows)
+            old = best_of(old_path, session)
+            new = best_of(new_path, session)
+        print(f"{rows:>8} {old / rows * 1e6:>12.2f} {new / rows * 1e6:>12.2f} {old / new:>8.1f}x")
+
+
+if __name__ == "__main__":
+    run_benchmark()
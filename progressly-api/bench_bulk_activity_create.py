@@ -0,0 +1,99 @@
+"""
+Benchmark: per-activity cost of flushing an offline queue.
+
+Compares replaying the queue one POST /api/activities at a time with sending it
+to POST /api/activities/bulk in batches of different sizes. Every run logs the
+same activities for a user with an active challenge, so challenge accounting,
+rollups and change tracking are all part of the measured cost.
+
+Runs the real app against an in-memory SQLite database through dependency
+overrides. Importing main still needs the API's environment variables set:
+    python bench_bulk_activity_create.py
+"""
+import time as timer
+from datetime import date, timedelta
+
+from fastapi.testclient import TestClient
+from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel.pool import StaticPool
+
+from main import app
+from database import get_session
+from dependencies import get_db_session, get_current_user
+from models import Category, Challenge
+
+QUEUE_LENGTH = 500
+BATCH_SIZES = [1, 10, 50, 100, 500]
+USER_ID = "bench-user"
+
+
+def make_engine():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    today = date.today()
+    with Session(engine) as session:
+        work = Category(user_id=USER_ID, name="Work", color="#3B82F6")
+        session.add(work)
+        session.add(Challenge(
+            user_id=USER_ID, name="Bench", start_date=today - timedelta(days=29),
+            end_date=today, duration_days=30,
+            commitments=[
+                {"id": "c1", "habit": "Deep work", "category": "Work", "target": 4, "unit": "hours"},
+                {"id": "c2", "habit": "Read", "target": 30, "unit": "minutes"},
+            ],
+        ))
+        session.commit()
+        return engine, work.id
+
+
+def queue(category_id: int):
+    # A week offline: activities spread over the last seven days
+    today = date.today()
+    return [
+        {
+            "activity_name": "Deep work" if i % 3 else "Read",
+            "start_time": f"{i % 24:02d}:00:00",
+            "end_time": f"{i % 24:02d}:45:00",
+            "category_id": category_id if i % 3 else None,
+            "target_date": (today - timedelta(days=i % 7)).isoformat(),
+        }
+        for i in range(QUEUE_LENGTH)
+    ]
+
+
+def run(batch_size: int) -> float:
+    engine, category_id = make_engine()
+
+    def get_session_override():
+        with Session(engine) as session:
+            yield session
+
+    app.dependency_overrides[get_db_session] = get_session_override
+    app.dependency_overrides[get_session] = get_session_override
+    app.dependency_overrides[get_current_user] = lambda: USER_ID
+    client = TestClient(app)
+    items = queue(category_id)
+
+    started = timer.perf_counter()
+    if batch_size == 1:
+        for item in items:
+            client.post("/api/activities", json=item)
+    else:
+        for offset in range(0, len(items), batch_size):
+            client.post("/api/activities/bulk", json={"activities": items[offset:offset + batch_size]})
+    return timer.perf_counter() - started
+
+
+def run_benchmark():
+    print(f"{'batch':>6} {'ms/activity':>12} {'speedup':>9}")
+    baseline = None
+    for batch_size in BATCH_SIZES:
+        elapsed = run(batch_size)
+        baseline = baseline or elapsed
+        label = "single" if batch_size == 1 else batch_size
+        print(f"{label:>6} {elapsed / QUEUE_LENGTH * 1e3:>12.3f} {baseline / elapsed:>8.1f}x")
+    app.dependency_overrides.clear()
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,135 @@
+"""
+Benchmark: streak and rate calculations over long metric histories.
+
+Compares the old per-element loops (isinstance/getattr per row, a sort for
+the longest streak) with the columnar kernel in utils/metrics.py, both through
+the calculate_* adapters (which still pull the columns out of the rows) and
+called directly on columns. Also times one batched kernel call over many
+challenges against a kernel call per challenge.
+
+Pure computation over synthetic data, so it needs no configuration:
+    python bench_metrics_kernel.py
+"""
+import random
+import time as timer
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+from utils import metrics
+from utils.metrics import (
+    calculate_consistency_rate,
+    calculate_current_streak,
+    calculate_diligence_rate,
+    calculate_longest_streak,
+    metrics_kernel,
+)
+
+DAY_COUNTS = [1000, 10000]
+BATCH_CHALLENGES = 100
+BATCH_DAYS = 100
+REPEATS = 5
+
+
+def synthetic_rows(days: int, seed: int = 3):
+    rng = random.Random(seed)
+    start = date(2000, 1, 1)
+    return [
+        {
+            "date": start + timedelta(days=i),
+            "overall_completion_pct": rng.choice([0.0, 50.0, 75.0, 100.0]),
+            "consistency_score": rng.choice([0.0, 100.0]),
+            "diligence_score": rng.random() * 100,
+        }
+        for i in range(days)
+    ]
+
+
+def get(metric, name):
+    return metric.get(name, 0) if isinstance(metric, dict) else getattr(metric, name, 0)
+
+
+def old_path(rows):
+    """The loops utils/metrics.py used before the kernel."""
+    newest_first = rows[::-1]
+    current = 0
+    for metric in newest_first:
+        if get(metric, "overall_completion_pct") >= 70.0:
+            current += 1
+        else:
+            break
+    longest = streak = 0
+    for metric in sorted(rows, key=lambda m: get(m, "date")):
+        if get(metric, "overall_completion_pct") >= 70.0:
+            streak += 1
+            longest = max(longest, streak)
+        else:
+            streak = 0
+    consistent = sum(1 for metric in rows if get(metric, "consistency_score") > 0)
+    diligence = 0
+    for metric in rows:
+        diligence += get(metric, "diligence_score")
+    return current, longest, round(consistent / len(rows) * 100, 1), round(diligence / len(rows), 1)
+
+
+def adapter_path(rows):
+    return (
+        calculate_current_streak(rows[::-1]),
+        calculate_longest_streak(rows),
+        calculate_consistency_rate(rows),
+        calculate_diligence_rate(rows),
+    )
+
+
+def best_of(fn, *args) -> float:
+    best = float("inf")
+    for _ in range(REPEATS):
+        started = timer.perf_counter()
+        fn(*args)
+        best = min(best, timer.perf_counter() - started)
+    return best
+
+
+def run_benchmark():
+    if metrics.np is None:
+        print("NumPy is not installed: the kernel times below are its pure-Python fallback")
+
+    print(f"{'days':>8} {'rows':>8} {'old ms':>9} {'adapters ms':>12} {'kernel ms':>10} {'speedup':>9}")
+    for days in DAY_COUNTS:
+        for kind, rows in [("dicts", synthetic_rows(days)), ("objects", [SimpleNamespace(**r) for r in synthetic_rows(days)])]:
+            assert adapter_path(rows) == old_path(rows)
+            columns = dict(
+                completion=[get(r, "overall_completion_pct") for r in rows],
+                consistency=[get(r, "consistency_score") for r in rows],
+                diligence=[get(r, "diligence_score") for r in rows],
+                dates=[get(r, "date") for r in rows],
+            )
+            if metrics.np is not None:
+                columns = {name: metrics.np.asarray(values, dtype="datetime64[D]" if name == "dates" else float)
+                           for name, values in columns.items()}
+            old = best_of(old_path, rows)
+            adapters = best_of(adapter_path, rows)
+            kernel = best_of(lambda: metrics_kernel(**columns))
+            print(f"{days:>8} {kind:>8} {old * 1e3:>9.2f} {adapters * 1e3:>12.2f} {kernel * 1e3:>10.3f} {old / kernel:>8.1f}x")
+
+    # Many challenges: one batched call vs one call per challenge
+    groups = [synthetic_rows(BATCH_DAYS, seed) for seed in range(BATCH_CHALLENGES)]
+    batched = dict(
+        completion=[r["overall_completion_pct"] for g in groups for r in g],
+        consistency=[r["consistency_score"] for g in groups for r in g],
+        diligence=[r["diligence_score"] for g in groups for r in g],
+        dates=[r["date"] for g in groups for r in g],
+        groups=[i for i, g in enumerate(groups) for _ in g],
+    )
+    per_challenge = [
+        dict(completion=[r["overall_completion_pct"] for r in g], consistency=[r["consistency_score"] for r in g],
+             diligence=[r["diligence_score"] for r in g], dates=[r["date"] for r in g])
+        for g in groups
+    ]
+    one_call = best_of(lambda: metrics_kernel(**batched))
+    many_calls = best_of(lambda: [metrics_kernel(**columns) for columns in per_challenge])
+    print(f"\n{BATCH_CHALLENGES} challenges x {BATCH_DAYS} days: "
+          f"batched {one_call * 1e3:.2f} ms, per challenge {many_calls * 1e3:.2f} ms ({many_calls / one_call:.1f}x)")
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -1,9 +1,13 @@
 import os
 import jwt
-from fastapi import Depends, HTTPException, status
+from datetime import date
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlmodel import Session
 from database import get_session as get_db_session_generator
+from services.change_tracker import get_data_and_day_version
+from services.challenge_updates import flush_challenge_updates
+from effective_date import resolve_current_effective_date
 
 # This scheme will look for an "Authorization" header with a "Bearer" token.
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
@@ -51,3 +55,43 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> str:
 def get_db_session():
     '''Yields a database session.'''
     yield from get_db_session_generator()
+
+def conditional_get(
+    request: Request,
+    user_id: str = Depends(get_current_user),
+    db: Session = Depends(get_db_session)
+) -> str:
+    """
+    ETag support for read endpoints, based on the user's data version and
+    current effective date.
+    Answers 304 Not Modified after a single version lookup when the client's
+    If-None-Match still matches, so the endpoint's own queries never run.
+    The ETag is stored on request.state and added to the response by middleware.
+    """
+    # Include the dates: "today" and the effective day can change with no write
+    # (an End-Day session expires after SESSION_TTL). The effective date comes from
+    # the per-user cache, keyed by the day version read in the same lookup
+    data_version, day_version = get_data_and_day_version(db, user_id)
+    today = date.today()
+    effective_date = resolve_current_effective_date(db, user_id, today, day_version=day_version).effective_date
+    etag = f'"{data_version}-{today.isoformat()}-{effective_date.isoformat()}"'
+    request.state.etag = etag
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        if "*" in candidates or etag in candidates:
+            raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+    return etag
+
+def fresh_challenge_metrics(
+    user_id: str = Depends(get_current_user),
+    db: Session = Depends(get_db_session)
+):
+    """
+    Read-your-writes for challenge progress: counts the user's queued activities
+    (see services/challenge_updates.py) before the endpoint or its ETag check runs.
+    List it before conditional_get.
+    """
+    flush_challenge_updates(db, user_id)
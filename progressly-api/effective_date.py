@@ -12,20 +12,22 @@ Rules:
 3. NO automatic cutoff at 6 AM - session continues indefinitely
 """
 
+import threading
 from datetime import date, time, datetime, timedelta
-from typing import Optional
-from sqlmodel import Session, select
-from models import LoggedActivity, Category
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from sqlmodel import Session, SQLModel, select
+from sqlalchemy import extract
+from models import LoggedActivity, UserSession
+from services.change_tracker import bump_day_version, get_day_version
+from services import reference_cache
+
+# An End-Day session only overrides the day for this long after it was saved
+SESSION_TTL = timedelta(hours=48)
 
 
 def get_sleep_category_id(user_id: str, db: Session) -> Optional[int]:
-    """Get the Sleep category ID for a user."""
-    statement = select(Category).where(
-        Category.user_id == user_id,
-        Category.name.ilike("sleep")
-    )
-    category = db.exec(statement).first()
-    return category.id if category else None
+    """Get the Sleep category ID for a user (from the reference-data cache)."""
+    return reference_cache.get_sleep_category_id(db, user_id)
 
 
 def has_night_sleep_ended_today(user_id: str, db: Session, today: date) -> bool:
@@ -41,40 +43,95 @@ def has_night_sleep_ended_today(user_id: str, db: Session, today: date) -> bool:
     if not sleep_category_id:
         return False
     
-    # Get sleep activities from today
+    # Sleeps logged yesterday or today (to catch overnight sleep), tested in SQL
+    # against the persisted interval columns
     yesterday = today - timedelta(days=1)
-    statement = select(LoggedActivity).where(
+    statement = select(LoggedActivity.id).where(
         LoggedActivity.user_id == user_id,
         LoggedActivity.category_id == sleep_category_id,
-        # Activities from yesterday or today (to catch overnight sleep)
         LoggedActivity.activity_date >= datetime.combine(yesterday, time(0, 0)),
-        LoggedActivity.activity_date < datetime.combine(today + timedelta(days=1), time(0, 0))
-    )
-    
-    sleep_activities = db.exec(statement).all()
-    
-    for activity in sleep_activities:
-        end_hour = activity.end_time.hour
-        
-        # Check if end time is in morning wake-up window (4 AM - 12 PM)
-        if not (4 <= end_hour < 12):
-            continue
-        
-        # Calculate duration
-        start_minutes = activity.start_time.hour * 60 + activity.start_time.minute
-        end_minutes = activity.end_time.hour * 60 + activity.end_time.minute
-        
-        # Handle overnight sleep (end < start means crossed midnight)
-        if end_minutes < start_minutes:
-            end_minutes += 24 * 60
-        
-        duration_hours = (end_minutes - start_minutes) / 60
-        
+        LoggedActivity.activity_date < datetime.combine(today + timedelta(days=1), time(0, 0)),
+        # End time is in the morning wake-up window (4 AM - 12 PM)
+        extract("hour", LoggedActivity.end_at).between(4, 11),
         # Night sleep must be at least 2 hours
-        if duration_hours >= 2:
-            return True
+        LoggedActivity.duration_minutes >= 120,
+    ).limit(1)
     
-    return False
+    return db.exec(statement).first() is not None
+
+
+def night_sleep_conditions(day: date) -> tuple:
+    """
+    WHERE conditions for activities that started the day before `day` and ended
+    on it - i.e. the night sleep that opens `day`. Combine with a Sleep category
+    filter. start_at shares activity_date's calendar day, so the range goes on
+    activity_date where the (user_id, category_id, activity_date) index serves it.
+    """
+    return (
+        LoggedActivity.activity_date >= datetime.combine(day - timedelta(days=1), time(0, 0)),
+        LoggedActivity.activity_date < datetime.combine(day, time(0, 0)),
+        LoggedActivity.end_at >= datetime.combine(day, time(0, 0)),
+        LoggedActivity.end_at < datetime.combine(day + timedelta(days=1), time(0, 0)),
+    )
+
+
+def night_wake_ups(sleeps: Iterable[Tuple[datetime, datetime]]) -> Dict[date, datetime]:
+    """
+    Latest wake-up per calendar day, from sleeps that began the previous day
+    and ended on it - the wake-up that starts that psychological day.
+
+    Args:
+        sleeps: (start_at, end_at) of the user's sleep activities, any order
+    """
+    wake_ups: Dict[date, datetime] = {}
+    for start_at, end_at in sleeps:
+        woke_on = end_at.date()
+        if start_at.date() != woke_on - timedelta(days=1):
+            continue
+        if woke_on not in wake_ups or end_at > wake_ups[woke_on]:
+            wake_ups[woke_on] = end_at
+    return wake_ups
+
+
+def wake_up_days(day_starts: Dict[date, datetime], from_date: date, to_date: date) -> List[Tuple[date, datetime, datetime]]:
+    """
+    Wake-up-to-wake-up boundaries for every day in [from_date, to_date].
+    Returns (day, start, end) tuples in date order.
+
+    A day starts at day_starts[day] (else midnight) and ends where the next day
+    starts, so consecutive days tile the timeline without gaps or overlaps.
+    """
+    def day_start(day: date) -> datetime:
+        return day_starts.get(day) or datetime.combine(day, time(0, 0))
+
+    days = []
+    day = from_date
+    start = day_start(day)
+    while day <= to_date:
+        next_start = max(day_start(day + timedelta(days=1)), start)
+        days.append((day, start, next_start))
+        day, start = day + timedelta(days=1), next_start
+    return days
+
+
+def sweep_into_days(rows: Iterable[Any], days: List[Tuple[date, datetime, datetime]]) -> List[List[Any]]:
+    """
+    Assign rows to the wake-up days they overlap (start_at < day end and end_at >
+    day start), in one linear sweep. `rows` must be sorted by start_at and `days`
+    must tile the timeline as wake_up_days() returns them. A row spanning a
+    boundary lands in both days, same as the single-day view.
+    """
+    buckets: List[List[Any]] = [[] for _ in days]
+    first = 0
+    for row in rows:
+        # Days ending at or before this row's start can't overlap it or any later row
+        while first < len(days) and days[first][2] <= row.start_at:
+            first += 1
+        index = first
+        while index < len(days) and days[index][1] < row.end_at:
+            buckets[index].append(row)
+            index += 1
+    return buckets
 
 
 def calculate_effective_date(
@@ -135,29 +192,189 @@ def calculate_effective_date(
     return calendar_date
 
 
+# --- Current Effective Date Resolver ---
+# "Which psychological day is it for this user?" is asked on every dashboard
+# load, but the answer only changes when a sleep is logged, the Sleep category
+# changes, the user ends their day, or the clock passes the next boundary
+# (midnight, or the End-Day session expiring). Results are cached per user and
+# tagged with the user's day_version, which those writes bump, so a write handled
+# by one worker invalidates the cached answer in every worker.
+
+class ResolvedEffectiveDate(SQLModel):
+    effective_date: date
+    # What produced it: "session" (End My Day), "sleep" (night sleep ended today),
+    # "awaiting_sleep" (still in yesterday's day) or "default" (no Sleep category)
+    source: str
+    # The boundary behind `source`: session end or wake-up time, if any
+    boundary: Optional[datetime] = None
+    # Valid while the local calendar day and day_version are unchanged,
+    # and (for sessions) until expires_at (UTC)
+    resolved_for: date
+    day_version: int = 0
+    expires_at: Optional[datetime] = None
+
+
+_resolved_cache: Dict[str, ResolvedEffectiveDate] = {}
+_resolved_cache_lock = threading.Lock()
+
+
+def is_session_current(ended_at: datetime, now: Optional[datetime] = None) -> bool:
+    """True if an End-Day session saved at ended_at (UTC) still sets the day."""
+    return (now or datetime.utcnow()) - ended_at < SESSION_TTL
+
+
+def compute_current_effective_date(
+    today: date,
+    session: Optional[Tuple[int, date, datetime]],
+    sleep_category_id: Optional[int],
+    wake_ups: List[datetime],
+    now: Optional[datetime] = None,
+) -> ResolvedEffectiveDate:
+    """
+    Resolve the current effective date from already-loaded inputs. No queries.
+
+    Priority:
+    1. A recent End-Day session (within SESSION_TTL)
+    2. A night sleep that started yesterday and ended today -> today
+    3. Otherwise yesterday, if the user tracks sleep at all
+    4. Default to today
+
+    Args:
+        session: (id, current_effective_date, ended_at) of the user's session, if any
+        wake_ups: end_at of night sleeps that started yesterday and ended today
+        now: current UTC time (for session expiry)
+    """
+    now = now or datetime.utcnow()
+
+    if session:
+        _, session_effective_date, session_ended_at = session
+        if is_session_current(session_ended_at, now):
+            return ResolvedEffectiveDate(
+                effective_date=session_effective_date,
+                source="session",
+                boundary=session_ended_at,
+                resolved_for=today,
+                expires_at=session_ended_at + SESSION_TTL,
+            )
+
+    if not sleep_category_id:
+        return ResolvedEffectiveDate(effective_date=today, source="default", resolved_for=today)
+
+    if wake_ups:
+        return ResolvedEffectiveDate(
+            effective_date=today, source="sleep", boundary=max(wake_ups), resolved_for=today
+        )
+
+    # No sleep ended today - user is still in yesterday's day cycle
+    return ResolvedEffectiveDate(effective_date=today - timedelta(days=1), source="awaiting_sleep", resolved_for=today)
+
+
+def _cached_effective_date(user_id: str, day_version: int, today: date) -> Optional[ResolvedEffectiveDate]:
+    resolved = _resolved_cache.get(user_id)
+    if resolved is None or resolved.day_version != day_version or resolved.resolved_for != today:
+        return None
+    if resolved.expires_at is not None and datetime.utcnow() >= resolved.expires_at:
+        return None
+    return resolved
+
+
+def _store_effective_date(user_id: str, resolved: ResolvedEffectiveDate):
+    with _resolved_cache_lock:
+        current = _resolved_cache.get(user_id)
+        # Never replace an entry computed from newer data
+        if current is None or current.day_version <= resolved.day_version:
+            _resolved_cache[user_id] = resolved
+
+
+def resolve_current_effective_date(
+    db: Session,
+    user_id: str,
+    today: Optional[date] = None,
+    day_version: Optional[int] = None,
+    inputs: Optional[Tuple] = None,
+) -> ResolvedEffectiveDate:
+    """
+    Return the user's current effective date, from the cache when still valid.
+
+    Callers that already loaded the resolver inputs in the same snapshot (the
+    dashboard bootstrap) pass day_version and inputs=(session, sleep_category_id,
+    wake_ups) so a miss costs no queries. Otherwise a hit costs one
+    primary-key lookup and a miss three small indexed ones.
+    """
+    today = today or date.today()
+    if day_version is None:
+        # Read the version before the inputs so a concurrent write can only
+        # make the stored entry look stale, never fresh
+        day_version = get_day_version(db, user_id)
+
+    resolved = _cached_effective_date(user_id, day_version, today)
+    if resolved is not None:
+        return resolved
+
+    if inputs is None:
+        inputs = _load_resolver_inputs(db, user_id, today)
+    session, sleep_category_id, wake_ups = inputs
+
+    resolved = compute_current_effective_date(today, session, sleep_category_id, wake_ups)
+    resolved.day_version = day_version
+    _store_effective_date(user_id, resolved)
+    return resolved
+
+
+def _load_resolver_inputs(db: Session, user_id: str, today: date):
+    session = db.exec(
+        select(UserSession.id, UserSession.current_effective_date, UserSession.ended_at)
+        .where(UserSession.user_id == user_id)
+    ).first()
+
+    sleep_category_id = get_sleep_category_id(user_id, db)
+    wake_ups = []
+    if sleep_category_id:
+        wake_ups = db.exec(
+            select(LoggedActivity.end_at)
+            .where(LoggedActivity.user_id == user_id)
+            .where(LoggedActivity.category_id == sleep_category_id)
+            .where(*night_sleep_conditions(today))
+        ).all()
+
+    return (tuple(session) if session else None, sleep_category_id, list(wake_ups))
+
+
+def is_sleep_category(db: Session, user_id: str, category_id: Optional[int]) -> bool:
+    """True if category_id is one of the user's categories named "Sleep"."""
+    category = reference_cache.get_category(db, user_id, category_id)
+    return category is not None and category.name.lower() == "sleep"
+
+
+def can_move_current_day(db: Session, activity: LoggedActivity) -> bool:
+    """
+    True if writing this activity can change the user's current effective date:
+    only sleeps logged yesterday or today are considered by the resolver.
+    For updates, check both before and after changing the fields.
+    """
+    yesterday = date.today() - timedelta(days=1)
+    if activity.activity_date < datetime.combine(yesterday, time(0, 0)):
+        return False
+    return is_sleep_category(db, activity.user_id, activity.category_id)
+
+
+def invalidate_current_effective_date(db: Session, user_id: str) -> int:
+    """
+    Drop the user's cached effective date, here and (via day_version) in every
+    other worker. Call before commit from any write that can move the day:
+    sleep activity writes, Sleep category changes, End My Day, session creation.
+    Returns the new day version.
+    """
+    day_version = bump_day_version(db, user_id)
+    with _resolved_cache_lock:
+        _resolved_cache.pop(user_id, None)
+    return day_version
+
+
 def get_user_current_effective_date(user_id: str, db: Session) -> date:
     """
     Get the current effective date for a user's active session.
     
     This is used by the dashboard to determine which day to show.
     """
-    today = date.today()
-    
-    # If night sleep ended today, it's a new day
-    if has_night_sleep_ended_today(user_id, db, today):
-        return today
-    
-    # Otherwise, might still be in yesterday's session
-    yesterday = today - timedelta(days=1)
-    
-    # Check for activities with today's effective_date
-    statement = select(LoggedActivity).where(
-        LoggedActivity.user_id == user_id,
-        LoggedActivity.effective_date == today
-    ).limit(1)
-    
-    if db.exec(statement).first():
-        return today
-    
-    # No activities today and no sleep - still yesterday's session
-    return yesterday
+    return resolve_current_effective_date(db, user_id).effective_date
@@ -3,27 +3,37 @@
 import os
 from contextlib import asynccontextmanager
 from datetime import date, datetime, timedelta, time
-from fastapi import FastAPI, Depends, HTTPException, Query
+from fastapi import FastAPI, Depends, HTTPException, Query, Request
 from sqlmodel import SQLModel, Session, select
-from sqlalchemy import func, and_, or_
+from sqlalchemy import and_, or_, tuple_, case, delete as sql_delete, insert as sql_insert
 from sqlalchemy.orm import selectinload
-from typing import Annotated, Optional
+from typing import Annotated, Literal, Optional
 from fastapi.middleware.cors import CORSMiddleware
 
 # We only need get_session from database now for the DBSession type hint
 from database import engine, get_session
 
 # Import the models used in this file
-from models import Goal, GoalCreate, LoggedActivity, ActivityCreate, ActivityUpdate, Category, ActivityReadWithCategory, DailyTarget, CategoryCreate
+from models import Goal, GoalCreate, LoggedActivity, ActivityCreate, ActivityUpdate, Category, ActivityReadWithCategory, DailyTarget, CategoryCreate, ActivityTombstone, UserSession, activity_interval
 
 # Import our routers
 from routers import summary, jobs, ai as ai_router, targets as targets_router, categories as categories_router, challenges as challenges_router
 
 # Import the shared dependencies used in this file
-from dependencies import get_current_user, get_db_session
+from dependencies import get_current_user, get_db_session, conditional_get, fresh_challenge_metrics
 
 # Import Services
-from services.challenge_tracker import update_challenge_progress
+from services.challenge_tracker import recompute_challenge_days
+from services.challenge_updates import enqueue_challenge_updates, schedule_challenge_updates
+from services.change_tracker import lock_user_writes, next_change_seq, record_activity_tombstone, record_activity_tombstones, touch_activities, bump_data_version
+from services.category_rollup import add_activity_to_rollup, apply_activity_batch_to_rollup, remove_activity_from_rollup
+from services.dashboard_bootstrap import load_bootstrap_context
+from services.reference_cache import invalidate_reference_data, get_category, get_categories
+from services.activity_presets import record_activity_usage, suggest_activity_names
+from services.day_boundaries import sleep_wake_day, refresh_day_boundaries, set_manual_day_start, load_day_boundaries
+from effective_date import resolve_current_effective_date, invalidate_current_effective_date, is_session_current, can_move_current_day, sweep_into_days
+from utils.pagination import encode_activity_cursor, decode_activity_cursor
+from utils.activity_json import activity_projection, activity_row_to_dict, activity_rows_to_dicts, activity_rows_to_columnar, activity_to_dict, json_response
 
 DBSession = Annotated[Session, Depends(get_db_session)]
 
@@ -35,13 +45,110 @@ class PieChartData(SQLModel):
     color: str
 
 class DashboardBootstrapResponse(SQLModel):
-    # Note: Despite the name, this field now contains ALL activities (unlimited retention)
+    # Note: Despite the name, this field contains ALL activities in legacy mode
+    # (unlimited retention), or one page of the requested window in windowed mode.
     # The name is kept for backward compatibility with existing frontend code
     activities_last_3_days: list[ActivityReadWithCategory]
     pie_chart_data: list[PieChartData]
     last_end_time: Optional[time]
     categories: list[Category]
     effective_date: date  # The "current day" based on wake-up logic
+    # Windowed mode only: pass back as ?cursor= to fetch the next (older) page
+    next_cursor: Optional[str] = None
+
+# Activity listing wire formats: "default" is one object per activity,
+# "columnar" is the compact parallel-array form from utils/activity_json.py
+ActivityFormat = Literal["default", "columnar"]
+
+# Page size limits for windowed bootstrap mode
+BOOTSTRAP_DEFAULT_PAGE_SIZE = 500
+BOOTSTRAP_MAX_PAGE_SIZE = 2000
+
+class ActivityChangesResponse(SQLModel):
+    # Activities created or updated since the client's sync token
+    changed: list[ActivityReadWithCategory]
+    # Ids of activities deleted since the client's sync token
+    deleted_ids: list[int]
+    # Pass back as ?since= on the next call
+    sync_token: int
+    # True if the page was cut at `limit` - call again with sync_token to continue
+    has_more: bool
+
+# Page size limits for delta sync
+CHANGES_DEFAULT_PAGE_SIZE = 500
+CHANGES_MAX_PAGE_SIZE = 2000
+
+class ActivityRangeDay(SQLModel):
+    date: date
+    # Wake-up-to-wake-up boundaries of this day
+    start: datetime
+    end: datetime
+    activities: list[ActivityReadWithCategory]
+
+class ActivityRangeResponse(SQLModel):
+    days: list[ActivityRangeDay]
+
+# Longest span /api/activities/range serves in one call
+RANGE_MAX_DAYS = 93
+
+class ActivitySearchResponse(SQLModel):
+    # Matches, newest first
+    activities: list[ActivityReadWithCategory]
+    # Pass back as ?cursor= to fetch the next (older) page; None on the last page
+    next_cursor: Optional[str] = None
+
+# Page size limits for activity search
+SEARCH_DEFAULT_PAGE_SIZE = 50
+SEARCH_MAX_PAGE_SIZE = 200
+# pg_trgm can only use the index for patterns with at least one full trigram
+SEARCH_MIN_QUERY_LENGTH = 3
+
+class ActivitySuggestion(SQLModel):
+    activity_name: str
+    category_id: Optional[int] = None
+    typical_start_time: Optional[time] = None
+    typical_duration_minutes: Optional[int] = None
+    usage_count: int
+    score: float
+
+# Most suggestions GET /api/activities/suggest returns
+SUGGEST_MAX_RESULTS = 20
+
+class ActivityBulkCreate(SQLModel):
+    activities: list[ActivityCreate]
+
+class ActivityBulkItemResult(SQLModel):
+    # Position of the item in the request
+    index: int
+    success: bool
+    activity: Optional[ActivityReadWithCategory] = None
+    error: Optional[str] = None
+
+class ActivityBulkCreateResponse(SQLModel):
+    created: int
+    results: list[ActivityBulkItemResult]
+
+class ActivityBulkUpdate(SQLModel):
+    ids: list[int]
+    # Set on every listed activity; fields left out (or null) are not changed
+    activity_name: Optional[str] = None
+    start_time: Optional[time] = None
+    end_time: Optional[time] = None
+    category_id: Optional[int] = None
+
+class ActivityBulkDelete(SQLModel):
+    ids: list[int]
+
+class ActivityBulkWriteResponse(SQLModel):
+    # Ids that were updated or deleted
+    affected_ids: list[int]
+    # Requested ids that don't exist or belong to another user
+    not_found_ids: list[int]
+
+# Most activities one /api/activities/bulk call accepts
+BULK_MAX_ITEMS = 500
+# Longest interval a bulk PATCH may leave when it sets only one of start_time/end_time
+BULK_MAX_SHIFTED_MINUTES = 12 * 60
 
 
 
@@ -64,6 +171,17 @@ FRONTEND_URL = os.environ.get("FRONTEND_URL", "http://localhost:3000")
 origins = [FRONTEND_URL]
 app.add_middleware(CORSMiddleware, allow_origins=origins, allow_credentials=True, allow_methods=["*"], allow_headers=["*"])
 
+@app.middleware("http")
+async def add_etag_header(request: Request, call_next):
+    """Attach the ETag computed by the conditional_get dependency to successful reads."""
+    response = await call_next(request)
+    etag = getattr(request.state, "etag", None)
+    if etag and response.status_code == 200:
+        response.headers["ETag"] = etag
+        # Let browsers keep the body but always revalidate with If-None-Match
+        response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
 app.include_router(categories_router.router, prefix="/api/categories", tags=["categories"])
 app.include_router(summary.router)
 app.include_router(jobs.router)
@@ -115,6 +233,7 @@ def create_goal(goal_data: GoalCreate, db: DBSession, user_id: str = Depends(get
     try:
         new_goal = Goal(content=goal_data.content, user_id=user_id)
         db.add(new_goal)
+        invalidate_reference_data(db, user_id)
         db.commit()
         db.refresh(new_goal)
         return new_goal
@@ -122,7 +241,7 @@ def create_goal(goal_data: GoalCreate, db: DBSession, user_id: str = Depends(get
         print(f"ERROR in create_goal: {type(e).__name__}: {e}")
         raise HTTPException(status_code=500, detail="Failed to create goal.")
 
-@app.get("/api/goals", response_model=list[Goal])
+@app.get("/api/goals", response_model=list[Goal], dependencies=[Depends(conditional_get)])
 def get_goals(db: DBSession, user_id: str = Depends(get_current_user)):
     """Get all goals for the authenticated user."""
     try:
@@ -153,6 +272,7 @@ def create_daily_target(
             # Update existing target
             existing_target.target_hours = target_data["target_hours"]
             db.add(existing_target)
+            invalidate_reference_data(db, user_id)
             db.commit()
             db.refresh(existing_target)
             return existing_target
@@ -164,6 +284,7 @@ def create_daily_target(
                 target_hours=target_data["target_hours"]
             )
             db.add(new_target)
+            invalidate_reference_data(db, user_id)
             db.commit()
             db.refresh(new_target)
             return new_target
@@ -172,8 +293,8 @@ def create_daily_target(
         print(f"ERROR in create_daily_target: {type(e).__name__}: {e}")
         raise HTTPException(status_code=500, detail="Failed to create/update daily target.")
 
-@app.get("/api/targets/", response_model=list[DailyTarget])
-@app.get("/api/targets", response_model=list[DailyTarget])
+@app.get("/api/targets/", response_model=list[DailyTarget], dependencies=[Depends(conditional_get)])
+@app.get("/api/targets", response_model=list[DailyTarget], dependencies=[Depends(conditional_get)])
 def get_daily_targets(db: DBSession, user_id: str = Depends(get_current_user)):
     """Get all daily targets for the authenticated user."""
     try:
@@ -206,6 +327,7 @@ def update_daily_target(
         target.target_hours = target_data["target_hours"]
         
         db.add(target)
+        invalidate_reference_data(db, user_id)
         db.commit()
         db.refresh(target)
         return target
@@ -233,6 +355,7 @@ def delete_daily_target(
             raise HTTPException(status_code=404, detail="Target not found.")
         
         db.delete(target)
+        invalidate_reference_data(db, user_id)
         db.commit()
         return {"message": "Target deleted successfully"}
     except HTTPException:
@@ -280,6 +403,9 @@ def end_my_day(
             )
             db.add(new_session)
         
+        # The new day starts now, whatever the sleep log says
+        set_manual_day_start(db, user_id, request.new_effective_date, datetime.now())
+        invalidate_current_effective_date(db, user_id)
         db.commit()
         
         return EndDayResponse(
@@ -365,7 +491,10 @@ def set_active_timer(
                 active_timer=timer_data
             )
             db.add(session)
+            # A fresh session also pins the current day
+            invalidate_current_effective_date(db, user_id)
         
+        bump_data_version(db, user_id)
         db.commit()
         db.refresh(session)
         
@@ -395,6 +524,7 @@ def clear_active_timer(
         
         if session:
             session.active_timer = None
+            bump_data_version(db, user_id)
             db.commit()
         
         return {"success": True}
@@ -403,8 +533,8 @@ def clear_active_timer(
         raise HTTPException(status_code=500, detail="Failed to clear timer.")
 
 # === Categories Endpoints ===
-@app.get("/api/categories/", response_model=list[Category])
-@app.get("/api/categories", response_model=list[Category])
+@app.get("/api/categories/", response_model=list[Category], dependencies=[Depends(conditional_get)])
+@app.get("/api/categories", response_model=list[Category], dependencies=[Depends(conditional_get)])
 def get_categories(db: DBSession, user_id: str = Depends(get_current_user)):
     """Get all categories for the authenticated user."""
     try:
@@ -432,6 +562,9 @@ def create_category(
             user_id=user_id
         )
         db.add(new_category)
+        if new_category.name.lower() == "sleep":
+            invalidate_current_effective_date(db, user_id)
+        invalidate_reference_data(db, user_id)
         db.commit()
         db.refresh(new_category)
         return new_category
@@ -454,23 +587,25 @@ def create_activity(activity_data: ActivityCreate, db: DBSession, user_id: str =
         **activity_dict,
         user_id=user_id,
         activity_date=datetime.now(),  # Actual timestamp for when activity was logged
-        effective_date=selected_date   # The psychological day (from frontend)
+        effective_date=selected_date,  # The psychological day (from frontend)
+        change_seq=next_change_seq(db, user_id)
     )
 
     db.add(new_activity)
+    add_activity_to_rollup(db, new_activity)
+    record_activity_usage(db, user_id, [new_activity])
+    refresh_day_boundaries(db, user_id, [sleep_wake_day(db, new_activity)])
+    if can_move_current_day(db, new_activity):
+        invalidate_current_effective_date(db, user_id)
+    challenge_days = enqueue_challenge_updates(db, user_id, [new_activity])
     db.commit()
     db.refresh(new_activity)
     
-    # Return with category data
-    category = db.get(Category, new_activity.category_id) if new_activity.category_id else None
+    # Challenge progress is counted in the background, once per burst of logs
+    schedule_challenge_updates(db, user_id, challenge_days)
     
-    # --- Update Challenge Progress ---
-    try:
-        cat_name = category.name if category else None
-        update_challenge_progress(db, user_id, new_activity, cat_name)
-    except Exception as e:
-        print(f"WARNING: Challenge progress update failed: {e}")
-    # ---------------------------------
+    # Return with category data (from the reference cache - no round trip)
+    category = get_category(db, user_id, new_activity.category_id)
     
     return ActivityReadWithCategory(
         id=new_activity.id,
@@ -484,11 +619,210 @@ def create_activity(activity_data: ActivityCreate, db: DBSession, user_id: str =
         category=category
     )
 
-@app.get("/api/activities", response_model=list[ActivityReadWithCategory])
+@app.post("/api/activities/bulk", response_model=ActivityBulkCreateResponse)
+def create_activities_bulk(payload: ActivityBulkCreate, db: DBSession, user_id: str = Depends(get_current_user)):
+    """
+    Create many activities in one transaction - used when the PWA flushes its
+    offline queue. Each item is validated on its own and reported in `results`
+    by position; invalid items are skipped without failing the batch.
+
+    Valid items go in with one multi-row INSERT sharing one change_seq, categories
+    are resolved once from the reference cache, rollups and day boundaries are
+    updated once per affected key, and challenge progress is queued for one
+    background update per affected day.
+    """
+    if len(payload.activities) > BULK_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"A batch is limited to {BULK_MAX_ITEMS} activities.")
+
+    categories = {category.id: category for category in get_categories(db, user_id)}
+    logged_at = datetime.now()  # One timestamp for the whole flush, like a single POST
+    results: list = [None] * len(payload.activities)
+    accepted = []
+
+    for index, item in enumerate(payload.activities):
+        try:
+            selected_date = datetime.fromisoformat(item.target_date).date()
+        except ValueError:
+            results[index] = {"index": index, "success": False, "activity": None, "error": "Invalid target_date."}
+            continue
+        if item.category_id is not None and item.category_id not in categories:
+            results[index] = {"index": index, "success": False, "activity": None, "error": "Category not found."}
+            continue
+        accepted.append((index, LoggedActivity(
+            **item.model_dump(exclude={'target_date'}),
+            user_id=user_id,
+            activity_date=logged_at,
+            effective_date=selected_date,
+        )))
+
+    if accepted:
+        try:
+            seq = next_change_seq(db, user_id)
+            rows = []
+            for _, activity in accepted:
+                activity.change_seq = seq
+                activity.start_at, activity.end_at, activity.duration_minutes = activity_interval(
+                    activity.activity_date, activity.start_time, activity.end_time
+                )
+                rows.append(activity.model_dump(exclude={"id"}))
+
+            # One batched INSERT (SQLAlchemy's insertmanyvalues). RETURNING gives no
+            # order guarantee, so ask for the ids in parameter order to line them up
+            table = LoggedActivity.__table__
+            ids = db.exec(
+                sql_insert(table).returning(table.c.id, sort_by_parameter_order=True), params=rows
+            ).scalars().all()
+            activities = [activity for _, activity in accepted]
+            for activity, activity_id in zip(activities, ids):
+                activity.id = activity_id
+
+            apply_activity_batch_to_rollup(db, added=activities)
+            record_activity_usage(db, user_id, activities)
+            refresh_day_boundaries(db, user_id, [sleep_wake_day(db, activity) for activity in activities])
+            if any(can_move_current_day(db, activity) for activity in activities):
+                invalidate_current_effective_date(db, user_id)
+            challenge_days = enqueue_challenge_updates(db, user_id, activities)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"ERROR in create_activities_bulk: {type(e).__name__}: {e}")
+            raise HTTPException(status_code=500, detail="Failed to create activities.")
+
+        for index, activity in accepted:
+            category = categories.get(activity.category_id)
+            results[index] = {"index": index, "success": True, "activity": activity_to_dict(activity, category), "error": None}
+
+        schedule_challenge_updates(db, user_id, challenge_days)
+
+    return json_response({"created": len(accepted), "results": results})
+
+def _load_owned_activities(db: Session, user_id: str, ids: list[int]) -> list[LoggedActivity]:
+    """
+    The listed activities that belong to user_id, locked until commit, as detached
+    snapshots of their current state (for rollup and challenge bookkeeping).
+    """
+    if len(ids) > BULK_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"A batch is limited to {BULK_MAX_ITEMS} activities.")
+    rows = db.exec(
+        select(
+            LoggedActivity.id,
+            LoggedActivity.user_id,
+            LoggedActivity.activity_name,
+            LoggedActivity.start_time,
+            LoggedActivity.end_time,
+            LoggedActivity.category_id,
+            LoggedActivity.activity_date,
+            LoggedActivity.effective_date,
+        )
+        .where(LoggedActivity.user_id == user_id)
+        .where(LoggedActivity.id.in_(ids))
+        .order_by(LoggedActivity.id.asc())
+        .with_for_update()
+    ).all()
+    return [LoggedActivity(**row._mapping) for row in rows]
+
+
+def _after_bulk_write(db: Session, user_id: str, before: list[LoggedActivity], after: list[LoggedActivity]):
+    """Shared bookkeeping for bulk updates and deletes, once per batch, in the write's transaction. Commits."""
+    apply_activity_batch_to_rollup(db, removed=before, added=after)
+    refresh_day_boundaries(db, user_id, [sleep_wake_day(db, activity) for activity in before + after])
+    if any(can_move_current_day(db, activity) for activity in before + after):
+        invalidate_current_effective_date(db, user_id)
+    # Edits can take progress back, so affected days are rebuilt rather than accrued
+    recompute_challenge_days(db, user_id, [activity.effective_date for activity in before])
+    db.commit()
+
+
+@app.patch("/api/activities/bulk", response_model=ActivityBulkWriteResponse)
+def update_activities_bulk(payload: ActivityBulkUpdate, db: DBSession, user_id: str = Depends(get_current_user)):
+    """
+    Apply the same change to many activities, e.g. re-categorizing a week.
+    One UPDATE scoped to the user's own rows does the write; rollups, day
+    boundaries and challenge metrics are then recomputed once for the batch.
+    """
+    changes = payload.model_dump(exclude_none=True, exclude={"ids"})
+    if not changes:
+        raise HTTPException(status_code=400, detail="Nothing to update.")
+    if "category_id" in changes and get_category(db, user_id, changes["category_id"]) is None:
+        raise HTTPException(status_code=400, detail="Category not found.")
+
+    before = _load_owned_activities(db, user_id, payload.ids)
+    affected_ids = [activity.id for activity in before]
+    not_found_ids = sorted(set(payload.ids) - set(affected_ids))
+    after = [LoggedActivity(**{**activity.model_dump(), **changes}) for activity in before]
+
+    # One shared start or end time only makes sense for rows it keeps plausible; sent
+    # alone it can turn a 03:00 finish into a 17-hour overnight activity
+    if ("start_time" in changes) != ("end_time" in changes):
+        implausible_ids = [
+            activity.id for activity in after
+            if not 0 < calculate_duration(activity.start_time, activity.end_time) <= BULK_MAX_SHIFTED_MINUTES
+        ]
+        if implausible_ids:
+            raise HTTPException(status_code=400, detail={
+                "message": "The new time leaves these activities empty or longer than "
+                           f"{BULK_MAX_SHIFTED_MINUTES // 60} hours. Send both start_time and end_time to set them.",
+                "ids": implausible_ids,
+            })
+
+    if before:
+        try:
+            values = dict(changes)
+            if "start_time" in changes or "end_time" in changes:
+                # The derived interval depends on each row's own day, so set it per id
+                intervals = {
+                    activity.id: activity_interval(activity.activity_date, activity.start_time, activity.end_time)
+                    for activity in after
+                }
+                for position, column in enumerate(("start_at", "end_at", "duration_minutes")):
+                    values[column] = case(
+                        {activity_id: interval[position] for activity_id, interval in intervals.items()},
+                        value=LoggedActivity.id,
+                    )
+            touch_activities(db, user_id, affected_ids, **values)
+            _after_bulk_write(db, user_id, before, after)
+        except Exception as e:
+            db.rollback()
+            print(f"ERROR in update_activities_bulk: {type(e).__name__}: {e}")
+            raise HTTPException(status_code=500, detail="Failed to update activities.")
+
+    return ActivityBulkWriteResponse(affected_ids=affected_ids, not_found_ids=not_found_ids)
+
+
+@app.delete("/api/activities/bulk", response_model=ActivityBulkWriteResponse)
+def delete_activities_bulk(payload: ActivityBulkDelete, db: DBSession, user_id: str = Depends(get_current_user)):
+    """
+    Delete many activities, e.g. clearing a bad import. One DELETE scoped to the
+    user's own rows, one multi-row tombstone insert for delta-sync clients, and
+    one batched recomputation of rollups, day boundaries and challenge metrics.
+    """
+    before = _load_owned_activities(db, user_id, payload.ids)
+    affected_ids = [activity.id for activity in before]
+    not_found_ids = sorted(set(payload.ids) - set(affected_ids))
+
+    if before:
+        try:
+            record_activity_tombstones(db, user_id, affected_ids)
+            db.exec(
+                sql_delete(LoggedActivity)
+                .where(LoggedActivity.user_id == user_id)
+                .where(LoggedActivity.id.in_(affected_ids))
+            )
+            _after_bulk_write(db, user_id, before, [])
+        except Exception as e:
+            db.rollback()
+            print(f"ERROR in delete_activities_bulk: {type(e).__name__}: {e}")
+            raise HTTPException(status_code=500, detail="Failed to delete activities.")
+
+    return ActivityBulkWriteResponse(affected_ids=affected_ids, not_found_ids=not_found_ids)
+
+
+@app.get("/api/activities", response_model=list[ActivityReadWithCategory], dependencies=[Depends(conditional_get)])
 def get_activities(
     db: DBSession, 
     user_id: str = Depends(get_current_user),
-    target_date: Optional[date] = Query(None, description="Target date for wake-up to wake-up cycle")
+    target_date: Optional[date] = Query(None, description="Target date for wake-up to wake-up cycle"),
+    response_format: ActivityFormat = Query("default", alias="format", description="Use 'columnar' for the compact parallel-array form")
 ):
     """
     Get activities using wake-up to wake-up day cycle logic.
@@ -499,139 +833,241 @@ def get_activities(
     if target_date is None:
         target_date = date.today()
     
-    # Fetch a 4-day window of data to ensure we have enough context
-    # This includes the day before target_date to catch sleep that started the previous day
-    data_start = target_date - timedelta(days=1)
-    data_end = target_date + timedelta(days=2)
+    # Precomputed wake-up boundaries (one indexed lookup on day_boundaries)
+    _, start_boundary, end_boundary = load_day_boundaries(db, user_id, target_date, target_date)[0]
     
-    # Get all activities in the 4-day window with eager loading
-    base_statement = (
-        select(LoggedActivity)
-        .options(selectinload(LoggedActivity.category_rel))  # Eager load categories
+    # Activities that overlap the target day's wake-up boundaries, tested in SQL on
+    # the persisted intervals. Durations are under a day, so start_at > start - 1 day
+    # adds nothing logically but bounds the (user_id, start_at) index range scan.
+    statement = (
+        activity_projection()
         .where(LoggedActivity.user_id == user_id)
-        .where(func.date(LoggedActivity.activity_date) >= data_start)
-        .where(func.date(LoggedActivity.activity_date) <= data_end)
+        .where(LoggedActivity.start_at < end_boundary)
+        .where(LoggedActivity.start_at > start_boundary - timedelta(days=1))
+        .where(LoggedActivity.end_at > start_boundary)
         .order_by(LoggedActivity.activity_date.asc(), LoggedActivity.start_time.asc())
     )
-    
-    all_activities = db.exec(base_statement).all()
-    
-    # Find the user's Sleep category
-    sleep_category = db.exec(
-        select(Category)
-        .where(Category.user_id == user_id)
-        .where(Category.name.ilike("sleep"))
-    ).first()
-    
-    sleep_category_id = sleep_category.id if sleep_category else None
-    
-    # Get the wake-up boundaries for the target date
-    start_boundary, end_boundary = find_wake_up_boundaries(
-        all_activities, target_date, sleep_category_id
-    )
-    
-    # Filter activities that fall within the wake-up boundaries
-    filtered_activities = []
-    for activity in all_activities:
-        # Create datetime objects for comparison
-        activity_start = datetime.combine(activity.activity_date, activity.start_time)
-        
-        # Handle activities that cross midnight
-        activity_end = datetime.combine(
-            activity.activity_date + timedelta(days=1) if activity.end_time < activity.start_time 
-            else activity.activity_date, 
-            activity.end_time
-        )
-        
-        # Check if activity overlaps with the target day's wake-up boundaries
-        if activity_start < end_boundary and activity_end > start_boundary:
-            filtered_activities.append(activity)
+    filtered_activities = db.exec(statement).all()
     
     # The database query already sorts the activities, so no need to sort again.
     
-    # Build response with nested category data
-    results = []
-    for a in filtered_activities:
-        category_obj = None
-        if a.category_rel is not None:
-            category_obj = {
-                "id": a.category_rel.id,
-                "name": a.category_rel.name,
-                "color": a.category_rel.color,
-            }
+    # Encode straight to JSON - no per-row model construction or response validation
+    if response_format == "columnar":
+        return json_response(activity_rows_to_columnar(filtered_activities))
+    return json_response(activity_rows_to_dicts(filtered_activities))
 
-        results.append(
-            {
-                "id": a.id,
-                "activity_name": a.activity_name,
-                "start_time": a.start_time,
-                "end_time": a.end_time,
-                "activity_date": a.activity_date,
-                "effective_date": a.effective_date,
-                "user_id": a.user_id,
-                "category_id": a.category_id,
-                "category": category_obj,
-            }
-        )
 
-    return results
+@app.get("/api/activities/range", response_model=ActivityRangeResponse, dependencies=[Depends(conditional_get)])
+def get_activities_range(
+    db: DBSession,
+    user_id: str = Depends(get_current_user),
+    from_date: date = Query(..., alias="from", description="First wake-up-to-wake-up day"),
+    to_date: date = Query(..., alias="to", description="Last wake-up-to-wake-up day (inclusive)"),
+    response_format: ActivityFormat = Query("default", alias="format", description="Use 'columnar' for the compact parallel-array form per day")
+):
+    """
+    Get several wake-up-to-wake-up days in one call - each day holds exactly what
+    GET /api/activities?target_date= returns for it, ordered by start time.
+
+    Day boundaries come from day_boundaries, one query loads every activity that
+    can touch the span, and one linear sweep over the activities (sorted by
+    start_at) assigns each to the days it overlaps.
+    """
+    if to_date < from_date:
+        raise HTTPException(status_code=400, detail="'to' must not be before 'from'.")
+    if (to_date - from_date).days + 1 > RANGE_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"Range is limited to {RANGE_MAX_DAYS} days.")
+
+    days = load_day_boundaries(db, user_id, from_date, to_date)
+
+    # Durations are under a day, so anything overlapping the span starts at most
+    # a day before its first wake-up (see get_activities)
+    statement = (
+        activity_projection()
+        .add_columns(LoggedActivity.start_at, LoggedActivity.end_at)
+        .where(LoggedActivity.user_id == user_id)
+        .where(LoggedActivity.start_at > days[0][1] - timedelta(days=1))
+        .where(LoggedActivity.start_at < days[-1][2])
+        .order_by(LoggedActivity.start_at.asc(), LoggedActivity.id.asc())
+    )
+    rows = db.exec(statement).all()
+
+    encode = activity_rows_to_columnar if response_format == "columnar" else activity_rows_to_dicts
+    return json_response({
+        "days": [
+            {"date": day, "start": start, "end": end, "activities": encode(day_rows)}
+            for (day, start, end), day_rows in zip(days, sweep_into_days(rows, days))
+        ]
+    })
 
 
-def find_wake_up_boundaries(activities, target_date, sleep_category_id):
+@app.get("/api/activities/suggest", response_model=list[ActivitySuggestion])
+def suggest_activities(
+    db: DBSession,
+    user_id: str = Depends(get_current_user),
+    prefix: str = Query("", description="What the user has typed so far; empty for the top presets"),
+    at: Optional[time] = Query(None, description="Start time being logged, for time-of-day ranking (defaults to now)"),
+    limit: int = Query(8, ge=1, le=SUGGEST_MAX_RESULTS),
+):
     """
-    Find wake-up boundaries for the target date using sleep detection.
-    Returns (start_boundary, end_boundary) as datetime objects.
+    Autocomplete activity names from the user's presets, ranked by frequency,
+    recency and how well `at` fits each name's usual start time.
+
+    Served from the in-memory prefix index in services/activity_presets.py, so
+    keystroke lookups don't touch the database. No ETag check for the same reason.
     """
-    # Default to midnight-to-midnight boundaries
-    start_boundary = datetime.combine(target_date, time(0, 0))
-    end_boundary = datetime.combine(target_date + timedelta(days=1), time(0, 0))
-    
-    if not sleep_category_id or not activities:
-        # No sleep category found or no activities, use default boundaries
-        return start_boundary, end_boundary
-    
-    # Find sleep activities using full timestamp comparison
-    previous_day_sleeps = []
-    current_day_sleeps = []
-    
-    # Get the previous day's date
-    previous_date = target_date - timedelta(days=1)
-    
-    for activity in activities:
-        if activity.category_id != sleep_category_id:
-            continue
-            
-        # Create full timestamp for the activity's start and end times
-        activity_start = datetime.combine(activity.activity_date, activity.start_time)
-        activity_end = datetime.combine(
-            activity.activity_date + timedelta(days=1) if activity.end_time < activity.start_time 
-            else activity.activity_date, 
-            activity.end_time
+    if at is None:
+        at = datetime.now().time()
+    suggestions = suggest_activity_names(db, user_id, prefix, at, limit)
+    return json_response([
+        {
+            "activity_name": entry.activity_name,
+            "category_id": entry.category_id,
+            "typical_start_time": entry.typical_start_time,
+            "typical_duration_minutes": entry.typical_duration_minutes,
+            "usage_count": entry.usage_count,
+            "score": round(score, 3),
+        }
+        for entry, score in suggestions
+    ])
+
+
+@app.get("/api/activities/search", response_model=ActivitySearchResponse, dependencies=[Depends(conditional_get)])
+def search_activities(
+    db: DBSession,
+    user_id: str = Depends(get_current_user),
+    q: str = Query(..., min_length=SEARCH_MIN_QUERY_LENGTH, description="Case-insensitive substring of the activity name"),
+    category_id: Optional[int] = Query(None),
+    from_date: Optional[date] = Query(None, alias="from", description="First effective_date to include"),
+    to_date: Optional[date] = Query(None, alias="to", description="Last effective_date to include"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(SEARCH_DEFAULT_PAGE_SIZE, ge=1, le=SEARCH_MAX_PAGE_SIZE),
+):
+    """
+    Search the user's whole history by activity name, newest first.
+
+    The ILIKE is served by the pg_trgm GIN index on activity_name, so the cost
+    follows the number of matches rather than the size of the history, and pages
+    are keyset-paginated on (effective_date, start_time, id) like the windowed
+    dashboard bootstrap.
+    """
+    # Decode up front so a malformed cursor is a 400, not a 500
+    cursor_key = decode_activity_cursor(cursor)
+
+    # Match the text literally - % and _ typed by the user aren't wildcards
+    pattern = "%" + q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+    statement = (
+        activity_projection()
+        .where(LoggedActivity.user_id == user_id)
+        .where(LoggedActivity.activity_name.ilike(pattern, escape="\\"))
+        .where(LoggedActivity.effective_date.is_not(None))
+    )
+    if category_id is not None:
+        statement = statement.where(LoggedActivity.category_id == category_id)
+    if from_date is not None:
+        statement = statement.where(LoggedActivity.effective_date >= from_date)
+    if to_date is not None:
+        statement = statement.where(LoggedActivity.effective_date <= to_date)
+    if cursor_key:
+        statement = statement.where(
+            tuple_(LoggedActivity.effective_date, LoggedActivity.start_time, LoggedActivity.id)
+            < tuple_(*cursor_key)
         )
-        
-        # Check if this sleep started on the previous day and ended on target_date
-        if activity_start.date() == previous_date and activity_end.date() == target_date:
-            previous_day_sleeps.append((activity_start, activity_end, activity))
-        
-        # Check if this sleep starts on target_date and ends the next day
-        elif activity_start.date() == target_date and activity_end.date() == (target_date + timedelta(days=1)):
-            current_day_sleeps.append((activity_start, activity_end, activity))
-    
-    # Find the latest wake-up time from the previous night's sleep
-    if previous_day_sleeps:
-        # Sort by end time descending to get the latest wake-up
-        previous_day_sleeps.sort(key=lambda x: x[1], reverse=True)
-        latest_wake_up = previous_day_sleeps[0][1]
-        start_boundary = latest_wake_up
-    
-    # Find the next night's sleep end time (wake-up time for the next day)
-    if current_day_sleeps:
-        # Sort by end time descending to get the latest wake-up
-        current_day_sleeps.sort(key=lambda x: x[1], reverse=True)
-        next_wake_up = current_day_sleeps[0][1]
-        end_boundary = next_wake_up
-    
-    return start_boundary, end_boundary
+
+    statement = statement.order_by(
+        LoggedActivity.effective_date.desc(),
+        LoggedActivity.start_time.desc(),
+        LoggedActivity.id.desc(),
+    ).limit(limit + 1)
+    page = list(db.exec(statement).all())
+
+    next_cursor = None
+    if len(page) > limit:
+        page = page[:limit]
+        oldest = page[-1]
+        next_cursor = encode_activity_cursor(oldest.effective_date, oldest.start_time, oldest.id)
+
+    return json_response({"activities": activity_rows_to_dicts(page), "next_cursor": next_cursor})
+
+
+def _load_change_events(db: Session, user_id: str, since: int, limit: Optional[int], until: Optional[int] = None):
+    """Return (change_seq, row) pairs for activities and tombstones after `since`, in seq order."""
+    activities_statement = (
+        activity_projection()
+        .add_columns(LoggedActivity.change_seq)
+        .where(LoggedActivity.user_id == user_id)
+        .where(LoggedActivity.change_seq > since)
+        .order_by(LoggedActivity.change_seq.asc())
+    )
+    tombstones_statement = (
+        select(ActivityTombstone)
+        .where(ActivityTombstone.user_id == user_id)
+        .where(ActivityTombstone.change_seq > since)
+        .order_by(ActivityTombstone.change_seq.asc())
+    )
+    if until is not None:
+        activities_statement = activities_statement.where(LoggedActivity.change_seq <= until)
+        tombstones_statement = tombstones_statement.where(ActivityTombstone.change_seq <= until)
+    if limit is not None:
+        activities_statement = activities_statement.limit(limit)
+        tombstones_statement = tombstones_statement.limit(limit)
+
+    events = [(a.change_seq, a) for a in db.exec(activities_statement).all()]
+    events += [(t.change_seq, t) for t in db.exec(tombstones_statement).all()]
+    events.sort(key=lambda e: e[0])
+    return events[:limit] if limit is not None else events
+
+
+@app.get("/api/activities/changes", response_model=ActivityChangesResponse)
+def get_activity_changes(
+    db: DBSession,
+    user_id: str = Depends(get_current_user),
+    since: int = Query(0, ge=0, description="sync_token from the previous call (0 for a full sync)"),
+    limit: int = Query(CHANGES_DEFAULT_PAGE_SIZE, ge=1, le=CHANGES_MAX_PAGE_SIZE),
+):
+    """
+    Delta sync: return activities created, updated or deleted after `since`.
+    Both lookups are range scans on change_seq, so the cost depends on the number
+    of changes rather than on the size of the user's history.
+    """
+    try:
+        fetched = _load_change_events(db, user_id, since, limit + 1)
+        has_more = len(fetched) > limit
+        events = fetched[:limit]
+
+        # Bulk writes stamp many rows with one seq number. Never cut the page inside
+        # such a group, or the rest of it would be skipped by the next sync_token
+        if has_more and fetched[limit][0] == events[-1][0]:
+            last_seq = events[-1][0]
+            trimmed = [e for e in events if e[0] != last_seq]
+            if trimmed:
+                events = trimmed
+            else:
+                # The group alone is larger than `limit` - send all of it
+                events = _load_change_events(db, user_id, last_seq - 1, None, until=last_seq)
+
+        changed = []
+        deleted_ids = []
+        for _, item in events:
+            if isinstance(item, ActivityTombstone):
+                deleted_ids.append(item.activity_id)
+                continue
+
+            changed.append(activity_row_to_dict(item))
+
+        # Advance only to what was actually read, so a write committing mid-request
+        # is picked up by the next call instead of being skipped
+        sync_token = events[-1][0] if events else since
+
+        return json_response({
+            "changed": changed,
+            "deleted_ids": deleted_ids,
+            "sync_token": sync_token,
+            "has_more": has_more,
+        })
+    except Exception as e:
+        print(f"ERROR in get_activity_changes: {type(e).__name__}: {e}")
+        raise HTTPException(status_code=500, detail="Failed to fetch activity changes.")
 
 
 def calculate_duration(start_time, end_time):
@@ -644,152 +1080,136 @@ def calculate_duration(start_time, end_time):
         return (end_time.hour * 60 + end_time.minute) - (start_time.hour * 60 + start_time.minute)
 
 # === Dashboard Bootstrap Endpoint ===
-@app.get("/api/dashboard-bootstrap", response_model=DashboardBootstrapResponse)
-def get_dashboard_bootstrap(db: DBSession, user_id: str = Depends(get_current_user)):
+@app.get("/api/dashboard-bootstrap", response_model=DashboardBootstrapResponse, dependencies=[Depends(fresh_challenge_metrics), Depends(conditional_get)])
+def get_dashboard_bootstrap(
+    db: DBSession,
+    user_id: str = Depends(get_current_user),
+    from_date: Optional[date] = Query(None, alias="from", description="Windowed mode: first effective_date to include"),
+    to_date: Optional[date] = Query(None, alias="to", description="Windowed mode: last effective_date to include"),
+    cursor: Optional[str] = Query(None, description="Windowed mode: next_cursor from the previous page"),
+    limit: int = Query(BOOTSTRAP_DEFAULT_PAGE_SIZE, ge=1, le=BOOTSTRAP_MAX_PAGE_SIZE),
+    full_history: bool = Query(True, description="Compatibility flag: return the entire history when no window is given"),
+    response_format: ActivityFormat = Query("default", alias="format", description="Use 'columnar' to send activities_last_3_days in the compact parallel-array form"),
+):
     """
     Fetch dashboard data including activities, pie chart, and last end time.
-    Uses eager loading for optimal performance.
+    Activities are read as column projections joined to Category and encoded
+    straight to JSON, skipping per-row model construction and validation.
+
+    Windowed mode (?from=&to= on effective_date, and/or ?cursor=) returns at most
+    `limit` activities, newest first by keyset, so response size no longer depends
+    on account age. Without a window the legacy full history is returned unless
+    full_history=false, in which case only the first page of the whole range is sent.
+
+    With ?format=columnar, activities_last_3_days holds the compact columnar object
+    (parallel arrays, category dictionary) instead of a list of activity objects.
     """
+    # Decode up front so a malformed cursor is a 400, not a 500
+    cursor_key = decode_activity_cursor(cursor)
+
     try:
         today = date.today()
-
-        # 1. Fetch ALL Activities with eager loading to prevent N+1 queries
-        # Changed from 3-day limit to unlimited retention - all activities are now kept
-        activities_statement = (
-            select(LoggedActivity)
-            .options(selectinload(LoggedActivity.category_rel))  # Eager load categories
-            .where(LoggedActivity.user_id == user_id)
-            .order_by(LoggedActivity.activity_date.asc(), LoggedActivity.start_time.asc())
-        )
-        all_activities_raw = db.exec(activities_statement).all()
-
-        # Note: Variable name kept as activities_last_3_days for API response compatibility
-        # but it now contains ALL activities (unlimited retention)
-        activities_last_3_days = []
-        for a in all_activities_raw:
-            category_obj = None
-            if a.category_rel:
-                category_obj = {
-                    "id": a.category_rel.id,
-                    "name": a.category_rel.name,
-                    "color": a.category_rel.color,
-                }
-            activities_last_3_days.append(
-                ActivityReadWithCategory(
-                    id=a.id,
-                    activity_name=a.activity_name,
-                    start_time=a.start_time,
-                    end_time=a.end_time,
-                    activity_date=a.activity_date,
-                    effective_date=a.effective_date,  # CRITICAL: Include psychological day for filtering
-                    user_id=a.user_id,
-                    category_id=a.category_id,
-                    category=category_obj,
-                )
+        windowed = from_date is not None or to_date is not None or cursor is not None or not full_history
+        next_cursor = None
+
+        if windowed:
+            # 1a. Windowed mode: one keyset page over (effective_date, start_time, id),
+            # walking backwards in time so that ?cursor= fetches older pages
+            activities_statement = (
+                activity_projection()
+                .where(LoggedActivity.user_id == user_id)
+                .where(LoggedActivity.effective_date.is_not(None))
             )
+            if from_date is not None:
+                activities_statement = activities_statement.where(LoggedActivity.effective_date >= from_date)
+            if to_date is not None:
+                activities_statement = activities_statement.where(LoggedActivity.effective_date <= to_date)
+            if cursor_key:
+                activities_statement = activities_statement.where(
+                    tuple_(LoggedActivity.effective_date, LoggedActivity.start_time, LoggedActivity.id)
+                    < tuple_(*cursor_key)
+                )
 
-        # 2. Aggregate Pie Chart Data for today
-        today_activities_statement = (
-            select(LoggedActivity)
-            .where(LoggedActivity.user_id == user_id)
-            .where(LoggedActivity.activity_date == today)
-        )
-        today_activities = db.exec(today_activities_statement).all()
+            activities_statement = activities_statement.order_by(
+                LoggedActivity.effective_date.desc(),
+                LoggedActivity.start_time.desc(),
+                LoggedActivity.id.desc(),
+            ).limit(limit + 1)
+            page = list(db.exec(activities_statement).all())
 
-        user_categories_statement = select(Category).where(Category.user_id == user_id)
-        user_categories = db.exec(user_categories_statement).all()
-        category_map = {cat.id: cat for cat in user_categories}
+            if len(page) > limit:
+                page = page[:limit]
+                oldest = page[-1]
+                next_cursor = encode_activity_cursor(oldest.effective_date, oldest.start_time, oldest.id)
 
-        category_durations = {}
-        for act in today_activities:
-            duration = calculate_duration(act.start_time, act.end_time)
-            if act.category_id and act.category_id in category_map:
-                category = category_map[act.category_id]
-                if category.id not in category_durations:
-                    category_durations[category.id] = {"duration": 0, "name": category.name, "color": category.color}
-                category_durations[category.id]["duration"] += duration
-
-        pie_chart_data_unsorted = [
-            PieChartData(id=cat_id, name=data["name"], duration=data["duration"], color=data["color"])
-            for cat_id, data in category_durations.items()
-        ]
-
-        # Sort the pie chart data by duration in descending order
-        pie_chart_data = sorted(pie_chart_data_unsorted, key=lambda x: x.duration, reverse=True)
+            # Keep the response in chronological order, like the legacy mode
+            all_activities_raw = list(reversed(page))
+        else:
+            # 1b. Legacy mode: fetch ALL Activities, category joined in the same statement
+            # Changed from 3-day limit to unlimited retention - all activities are now kept
+            activities_statement = (
+                activity_projection()
+                .where(LoggedActivity.user_id == user_id)
+                .order_by(LoggedActivity.activity_date.asc(), LoggedActivity.start_time.asc())
+            )
+            all_activities_raw = db.exec(activities_statement).all()
 
-        # 3. Fetch Last End Time
-        latest_activity_statement = (
-            select(LoggedActivity)
-            .where(LoggedActivity.user_id == user_id)
-            .order_by(LoggedActivity.activity_date.desc(), LoggedActivity.start_time.desc())
-            .limit(1)
+        # Note: Variable name kept as activities_last_3_days for API response compatibility
+        # but it contains ALL activities (legacy mode) or the requested page (windowed mode)
+        if response_format == "columnar":
+            activities_last_3_days = activity_rows_to_columnar(all_activities_raw)
+        else:
+            activities_last_3_days = activity_rows_to_dicts(all_activities_raw)
+
+        # 2. Everything else in ONE round trip: categories, last end time,
+        # End-Day session, recent sleeps and candidate pie chart rows
+        context = load_bootstrap_context(db, user_id, today)
+        user_categories = context.categories
+
+        # 3. Last End Time
+        last_end_time = context.last_end_time
+
+        # 4. Current effective date (End-Day session, then night sleep, then
+        # today) - cached per user, resolved from the context rows on a miss
+        if context.session and not is_session_current(context.session[2]):
+            # Session too old, delete it. Its expiry already changed the effective
+            # date (and so the ETag); the day version drops every worker's cached
+            # copy and marks the delete as a write like any other
+            db.exec(sql_delete(UserSession).where(UserSession.id == context.session[0]))
+            context.day_version = invalidate_current_effective_date(db, user_id)
+            context.session = None
+            db.commit()
+        effective_date = resolve_current_effective_date(
+            db, user_id, today,
+            day_version=context.day_version,
+            inputs=(context.session, context.sleep_category_id, context.sleep_wake_ups),
+        ).effective_date
+
+        # 5. Pie Chart Data for the current psychological day, from the
+        # pre-aggregated rollup rows already loaded above
+        category_map = {cat.id: cat for cat in user_categories}
+        pie_chart_data = sorted(
+            [
+                PieChartData(id=cat_id, name=category_map[cat_id].name, duration=minutes, color=category_map[cat_id].color)
+                for cat_id, minutes in context.day_totals.get(effective_date, [])
+                if cat_id in category_map
+            ],
+            key=lambda x: x.duration,
+            reverse=True
         )
-        latest_activity = db.exec(latest_activity_statement).first()
-        last_end_time = latest_activity.end_time if latest_activity else None
-
-        # 4. Calculate effective_date - PRIORITY ORDER:
-        # 1. Check user_sessions table for manual End Day (cross-device sync)
-        # 2. Check if Night Sleep ended today
-        # 3. Default to today
-        from models import UserSession
-        
-        effective_date = today
-        
-        # Priority 1: Check if user has a saved session (from End My Day)
-        user_session = db.exec(
-            select(UserSession).where(UserSession.user_id == user_id)
-        ).first()
-        
-        if user_session:
-            # Use the saved effective date, but only if it's recent (within 48 hours)
-            hours_since_ended = (datetime.utcnow() - user_session.ended_at).total_seconds() / 3600
-            if hours_since_ended < 48:
-                effective_date = user_session.current_effective_date
-                print(f"[Progressly] Using saved session effective_date: {effective_date}")
-            else:
-                # Session too old, delete it
-                db.delete(user_session)
-                db.commit()
-        
-        # If no saved session, check for night sleep (Priority 2)
-        if not user_session or (user_session and (datetime.utcnow() - user_session.ended_at).total_seconds() / 3600 >= 48):
-            sleep_category = db.exec(
-                select(Category)
-                .where(Category.user_id == user_id)
-                .where(Category.name.ilike("sleep"))
-            ).first()
-            
-            if sleep_category:
-                yesterday = today - timedelta(days=1)
-                sleep_that_ended_today = False
-                
-                for activity in all_activities_raw:
-                    if activity.category_id != sleep_category.id:
-                        continue
-                        
-                    # Check if this is an overnight sleep that ended today
-                    activity_start = datetime.combine(activity.activity_date, activity.start_time)
-                    activity_end = datetime.combine(
-                        activity.activity_date + timedelta(days=1) if activity.end_time < activity.start_time 
-                        else activity.activity_date, 
-                        activity.end_time
-                    )
-                    
-                    if activity_start.date() == yesterday and activity_end.date() == today:
-                        sleep_that_ended_today = True
-                        break
-                
-                # If no sleep ended today, user is still in yesterday's day cycle
-                if not sleep_that_ended_today:
-                    effective_date = yesterday
-
-        return DashboardBootstrapResponse(
-            activities_last_3_days=activities_last_3_days,
+
+        # Validate the small fields through the response model as usual, then splice
+        # in the pre-built activity dicts so they are encoded without per-row models
+        response = DashboardBootstrapResponse(
+            activities_last_3_days=[],
             pie_chart_data=pie_chart_data,
             last_end_time=last_end_time,
             categories=user_categories,
             effective_date=effective_date,
-        )
+            next_cursor=next_cursor,
+        ).model_dump(mode="json")
+        response["activities_last_3_days"] = activities_last_3_days
+        return json_response(response)
     except Exception as e:
         print(f"ERROR in get_dashboard_bootstrap: {type(e).__name__}: {e}")
         raise HTTPException(
@@ -809,6 +1229,11 @@ def update_activity(
     db: DBSession,
     user_id: str = Depends(get_current_user)
 ):
+    # Take the user's write lock before reading the row, so a concurrent edit of
+    # the same activity has committed and its interval is the one moved out of
+    # the rollup below
+    lock_user_writes(db, user_id)
+
     # Fetch the activity from database
     activity = db.get(LoggedActivity, activity_id)
     if not activity:
@@ -818,19 +1243,32 @@ def update_activity(
     if activity.user_id != user_id:
         raise HTTPException(status_code=403, detail="Not authorized to update this activity")
     
+    # Move the activity's contribution in the category rollup
+    remove_activity_from_rollup(db, activity)
+    moves_day = can_move_current_day(db, activity)
+    old_wake_day = sleep_wake_day(db, activity)
+
     # Update the fields
     activity.activity_name = update_data.activity_name
     activity.start_time = update_data.start_time
     activity.end_time = update_data.end_time
     activity.category_id = update_data.category_id
+    activity.change_seq = next_change_seq(db, user_id)
     
     # Commit changes and refresh
     db.add(activity)
+    add_activity_to_rollup(db, activity)
+    refresh_day_boundaries(db, user_id, [old_wake_day, sleep_wake_day(db, activity)])
+    if moves_day or can_move_current_day(db, activity):
+        invalidate_current_effective_date(db, user_id)
+    # The edit can take progress back, so the day is rebuilt rather than accrued,
+    # in the same transaction
+    recompute_challenge_days(db, user_id, [activity.effective_date])
     db.commit()
     db.refresh(activity)
     
     # Return updated activity with category data
-    category = db.get(Category, activity.category_id) if activity.category_id else None
+    category = get_category(db, user_id, activity.category_id)
     
     return ActivityReadWithCategory(
         id=activity.id,
@@ -851,6 +1289,10 @@ def delete_activity(
     db: DBSession,
     user_id: str = Depends(get_current_user)
 ):
+    # Write lock first, as in update_activity, so a concurrent edit or delete
+    # can't be subtracted from the rollup twice
+    lock_user_writes(db, user_id)
+
     # Fetch the activity from the database
     activity = db.get(LoggedActivity, activity_id)
     if not activity:
@@ -860,8 +1302,16 @@ def delete_activity(
     if activity.user_id != user_id:
         raise HTTPException(status_code=403, detail="Not authorized to delete this activity")
     
-    # Delete the activity
+    # Delete the activity, leaving a tombstone for delta-sync clients
+    record_activity_tombstone(db, activity)
+    remove_activity_from_rollup(db, activity)
+    if can_move_current_day(db, activity):
+        invalidate_current_effective_date(db, user_id)
+    wake_day = sleep_wake_day(db, activity)
+    effective_date = activity.effective_date
     db.delete(activity)
+    refresh_day_boundaries(db, user_id, [wake_day])
+    recompute_challenge_days(db, user_id, [effective_date])
     db.commit()
     
     return {"success": True, "message": "Activity deleted successfully"}
\ No newline at end of file
@@ -0,0 +1,52 @@
+-- Migration: Add per-user change sequence + tombstones for activity delta sync
+-- Run this in Supabase SQL Editor
+
+-- Step 1: Per-user change counter
+CREATE TABLE IF NOT EXISTS user_sync_state (
+  id SERIAL PRIMARY KEY,
+  user_id VARCHAR NOT NULL UNIQUE,
+  change_seq INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE INDEX IF NOT EXISTS idx_user_sync_state_user_id ON user_sync_state(user_id);
+
+-- Step 2: Add change_seq to activities (nullable, backfilled below)
+ALTER TABLE loggedactivity ADD COLUMN IF NOT EXISTS change_seq INTEGER;
+
+-- Step 3: Backfill existing activities with a per-user sequence (oldest first)
+UPDATE loggedactivity la
+SET change_seq = numbered.seq
+FROM (
+  SELECT id, ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY id) AS seq
+  FROM loggedactivity
+) AS numbered
+WHERE la.id = numbered.id
+  AND la.change_seq IS NULL;
+
+-- Step 4: Start each user's counter after their backfilled rows
+INSERT INTO user_sync_state (user_id, change_seq)
+SELECT user_id, MAX(change_seq) FROM loggedactivity GROUP BY user_id
+ON CONFLICT (user_id) DO UPDATE
+SET change_seq = GREATEST(user_sync_state.change_seq, EXCLUDED.change_seq);
+
+-- Step 5: Index for "changed since" range scans
+CREATE INDEX IF NOT EXISTS idx_loggedactivity_user_change_seq
+ON loggedactivity(user_id, change_seq);
+
+-- Step 6: Tombstones for deleted activities
+CREATE TABLE IF NOT EXISTS activity_tombstones (
+  id SERIAL PRIMARY KEY,
+  user_id VARCHAR NOT NULL,
+  activity_id INTEGER NOT NULL,
+  change_seq INTEGER NOT NULL,
+  deleted_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_activity_tombstones_user_change_seq
+ON activity_tombstones(user_id, change_seq);
+
+-- Verify the migration
+SELECT
+    COUNT(*) as total_activities,
+    COUNT(change_seq) as with_change_seq
+FROM loggedactivity;
@@ -0,0 +1,19 @@
+-- Migration: One activity_presets row per (user_id, activity_name)
+-- activity_presets comes from 001_challenge_schema.sql; the API now maintains it
+-- incrementally on every activity create. Run this in Supabase SQL Editor, then
+-- backfill with:
+--   python rebuild_activity_presets.py
+-- or POST /api/jobs/rebuild-presets
+
+-- Keep the most used row if duplicates exist
+DELETE FROM activity_presets a
+USING activity_presets b
+WHERE a.user_id = b.user_id
+  AND a.activity_name = b.activity_name
+  AND (COALESCE(a.usage_count, 0), a.id) < (COALESCE(b.usage_count, 0), b.id);
+
+ALTER TABLE activity_presets
+  ADD CONSTRAINT unique_user_activity_preset UNIQUE (user_id, activity_name);
+
+-- Verify the constraint was created
+SELECT conname FROM pg_constraint WHERE conname = 'unique_user_activity_preset';
@@ -0,0 +1,30 @@
+-- Migration: Add running totals to daily_challenge_metrics
+-- Lets services/challenge_tracker.py extend the cumulative rates from the previous
+-- day's row instead of rescanning the whole challenge on every logged activity.
+-- Run this in Supabase SQL Editor. Rows left NULL are filled in by the app the next
+-- time their challenge is updated.
+
+ALTER TABLE daily_challenge_metrics ADD COLUMN IF NOT EXISTS cumulative_days INTEGER;
+ALTER TABLE daily_challenge_metrics ADD COLUMN IF NOT EXISTS cumulative_consistent_days INTEGER;
+ALTER TABLE daily_challenge_metrics ADD COLUMN IF NOT EXISTS cumulative_diligence_total DOUBLE PRECISION;
+
+-- Backfill: totals over each challenge's days up to and including this one
+UPDATE daily_challenge_metrics m
+SET cumulative_days = t.days,
+    cumulative_consistent_days = t.consistent_days,
+    cumulative_diligence_total = t.diligence_total
+FROM (
+  SELECT id,
+         ROW_NUMBER() OVER w AS days,
+         SUM(CASE WHEN consistency_score > 0 THEN 1 ELSE 0 END) OVER w AS consistent_days,
+         SUM(COALESCE(diligence_score, 0)) OVER w AS diligence_total
+  FROM daily_challenge_metrics
+  WINDOW w AS (PARTITION BY challenge_id ORDER BY date ROWS UNBOUNDED PRECEDING)
+) t
+WHERE t.id = m.id;
+
+-- Verify the migration
+SELECT
+    COUNT(*) AS total_rows,
+    COUNT(cumulative_days) AS with_running_totals
+FROM daily_challenge_metrics;
@@ -0,0 +1,52 @@
+-- Migration: Add streak state to challenges
+-- services/challenge_tracker.py keeps each challenge's current streak, longest streak
+-- and last successful day up to date as days are scored, so readers get them with one
+-- primary-key lookup instead of loading and sorting every daily_challenge_metrics row.
+-- Day streaks were counted against a fixed 70%; this also recounts them against each
+-- challenge's success_threshold.
+-- Run this in Supabase SQL Editor.
+
+ALTER TABLE challenges ADD COLUMN IF NOT EXISTS current_streak INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE challenges ADD COLUMN IF NOT EXISTS longest_streak INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE challenges ADD COLUMN IF NOT EXISTS last_success_date DATE;
+
+-- Backfill each day's streak: its position in the challenge minus the position of the
+-- last unsuccessful day up to it (0 if there was none)
+WITH days AS (
+  SELECT m.id, m.challenge_id, m.date,
+         COALESCE(m.overall_completion_pct, 0) >= c.success_threshold AS success,
+         ROW_NUMBER() OVER (PARTITION BY m.challenge_id ORDER BY m.date) AS n
+  FROM daily_challenge_metrics m
+  JOIN challenges c ON c.id = m.challenge_id
+), streaks AS (
+  SELECT id,
+         n - MAX(CASE WHEN success THEN 0 ELSE n END)
+             OVER (PARTITION BY challenge_id ORDER BY date ROWS UNBOUNDED PRECEDING) AS streak
+  FROM days
+)
+UPDATE daily_challenge_metrics m
+SET consecutive_completion_streak = s.streak
+FROM streaks s
+WHERE s.id = m.id;
+
+-- Backfill the challenge state from the day streaks
+UPDATE challenges c
+SET current_streak = s.current_streak,
+    longest_streak = s.longest_streak,
+    last_success_date = s.last_success_date
+FROM (
+  SELECT challenge_id,
+         (ARRAY_AGG(consecutive_completion_streak ORDER BY date DESC))[1] AS current_streak,
+         MAX(consecutive_completion_streak) AS longest_streak,
+         MAX(date) FILTER (WHERE consecutive_completion_streak > 0) AS last_success_date
+  FROM daily_challenge_metrics
+  GROUP BY challenge_id
+) s
+WHERE s.challenge_id = c.id;
+
+-- Verify the migration
+SELECT
+    COUNT(*) AS total_challenges,
+    COUNT(last_success_date) AS with_successful_days,
+    MAX(longest_streak) AS longest_streak
+FROM challenges;
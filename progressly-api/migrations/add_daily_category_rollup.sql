@@ -0,0 +1,20 @@
+-- Migration: Add daily_category_rollup table (minutes per user/day/category)
+-- Run this in Supabase SQL Editor, then backfill with:
+--   python rebuild_category_rollups.py
+-- or POST /api/jobs/rebuild-rollups
+
+CREATE TABLE IF NOT EXISTS daily_category_rollup (
+  id SERIAL PRIMARY KEY,
+  user_id VARCHAR NOT NULL,
+  effective_date DATE NOT NULL,
+  category_id INTEGER NOT NULL REFERENCES category(id) ON DELETE CASCADE,
+  total_minutes INTEGER NOT NULL DEFAULT 0,
+  activity_count INTEGER NOT NULL DEFAULT 0,
+  CONSTRAINT unique_user_day_category UNIQUE (user_id, effective_date, category_id)
+);
+
+-- The unique constraint's index serves the (user_id, effective_date) lookups
+CREATE INDEX IF NOT EXISTS ix_daily_category_rollup_user_id ON daily_category_rollup(user_id);
+
+-- Verify the table was created
+SELECT * FROM daily_category_rollup LIMIT 1;
@@ -0,0 +1,20 @@
+-- Migration: Add day_boundaries table (wake-up-to-wake-up start/end per user/day)
+-- Run this in Supabase SQL Editor, then backfill with:
+--   python rebuild_day_boundaries.py
+-- or POST /api/jobs/rebuild-day-boundaries
+
+CREATE TABLE IF NOT EXISTS day_boundaries (
+  id SERIAL PRIMARY KEY,
+  user_id VARCHAR NOT NULL,
+  effective_date DATE NOT NULL,
+  start_at TIMESTAMP NOT NULL,
+  end_at TIMESTAMP NOT NULL,
+  source VARCHAR NOT NULL DEFAULT 'default',
+  CONSTRAINT unique_user_day_boundary UNIQUE (user_id, effective_date)
+);
+
+-- The unique constraint's index serves the (user_id, effective_date) lookups
+CREATE INDEX IF NOT EXISTS ix_day_boundaries_user_id ON day_boundaries(user_id);
+
+-- Verify the table was created
+SELECT * FROM day_boundaries LIMIT 1;
@@ -0,0 +1,22 @@
+-- Migration: Add pending_challenge_activities (activities not yet counted in challenge metrics)
+-- Run this in Supabase SQL Editor. Activities logged before this migration are
+-- already counted, so there is nothing to backfill.
+
+CREATE TABLE IF NOT EXISTS pending_challenge_activities (
+  id SERIAL PRIMARY KEY,
+  user_id VARCHAR NOT NULL,
+  activity_id INTEGER NOT NULL REFERENCES loggedactivity(id) ON DELETE CASCADE,
+  effective_date DATE NOT NULL,
+  created_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+-- Drains look up a user's queued rows
+CREATE INDEX IF NOT EXISTS ix_pending_challenge_activities_user_id
+ON pending_challenge_activities(user_id);
+
+-- The cascade needs an index to find a deleted activity's rows
+CREATE INDEX IF NOT EXISTS ix_pending_challenge_activities_activity_id
+ON pending_challenge_activities(activity_id);
+
+-- Verify the table was created
+SELECT * FROM pending_challenge_activities LIMIT 1;
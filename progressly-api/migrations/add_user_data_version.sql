@@ -0,0 +1,12 @@
+-- Migration: Add per-user data version for ETag / If-None-Match on read endpoints
+-- Run this in Supabase SQL Editor (after add_activity_change_seq.sql)
+
+ALTER TABLE user_sync_state ADD COLUMN IF NOT EXISTS data_version INTEGER NOT NULL DEFAULT 0;
+
+-- Start from the activity counter so existing users get a non-zero version
+UPDATE user_sync_state SET data_version = change_seq WHERE data_version = 0;
+
+-- Verify the migration
+SELECT column_name, data_type, is_nullable
+FROM information_schema.columns
+WHERE table_name = 'user_sync_state';
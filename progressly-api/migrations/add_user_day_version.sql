@@ -0,0 +1,9 @@
+-- Migration: Add per-user day version for the cached current-effective-date resolver
+-- Run this in Supabase SQL Editor (after add_user_data_version.sql)
+
+ALTER TABLE user_sync_state ADD COLUMN IF NOT EXISTS day_version INTEGER NOT NULL DEFAULT 0;
+
+-- Verify the migration
+SELECT column_name, data_type, is_nullable
+FROM information_schema.columns
+WHERE table_name = 'user_sync_state';
@@ -0,0 +1,9 @@
+-- Migration: Add per-user reference version for the reference-data cache
+-- Run this in Supabase SQL Editor (after add_user_day_version.sql)
+
+ALTER TABLE user_sync_state ADD COLUMN IF NOT EXISTS reference_version INTEGER NOT NULL DEFAULT 0;
+
+-- Verify the migration
+SELECT column_name, data_type, is_nullable
+FROM information_schema.columns
+WHERE table_name = 'user_sync_state';
@@ -1,8 +1,8 @@
 # progressly-api/models.py
-from datetime import datetime, time, date
-from typing import Optional, List
+from datetime import datetime, time, date, timedelta
+from typing import Optional, List, Tuple
 from sqlmodel import Field, SQLModel, Relationship
-from sqlalchemy import UniqueConstraint, Column, JSON
+from sqlalchemy import UniqueConstraint, Column, JSON, Index, Integer, ForeignKey, event, text
 
 # --- Goal Models (Existing and Unchanged) ---
 
@@ -29,6 +29,8 @@ class Category(CategoryBase, table=True):
     __table_args__ = (
         # This ensures a user cannot have two categories with the same name
         UniqueConstraint("user_id", "name", name="unique_user_category_name"),
+        # Case-insensitive name lookups (the Sleep category, duplicate checks)
+        Index("ix_category_user_id_lower_name", "user_id", text("lower(name)")),
     )
     
     id: Optional[int] = Field(default=None, primary_key=True)
@@ -59,6 +61,21 @@ class LoggedActivityBase(SQLModel):
     end_time: time
 
 class LoggedActivity(LoggedActivityBase, table=True):
+    __table_args__ = (
+        # Composite indexes matching the hot access patterns (see alembic 3b1e6c9d2f47)
+        # Calendar windows ordered by time: get_activities, last end time
+        Index("ix_loggedactivity_user_id_activity_date_start_time", "user_id", "activity_date", "start_time"),
+        # Psychological-day windows: bootstrap pages, rollup rebuilds
+        Index("ix_loggedactivity_user_id_effective_date", "user_id", "effective_date"),
+        # One category over a calendar window: sleep lookups, challenge attribution
+        Index("ix_loggedactivity_user_id_category_id_activity_date", "user_id", "category_id", "activity_date"),
+        # Interval overlap: start_at < :end AND start_at >= :start - 1 day AND end_at > :start
+        Index("ix_loggedactivity_user_id_start_at", "user_id", "start_at"),
+        # Substring search (ILIKE '%q%') uses ix_loggedactivity_activity_name_trgm, a pg_trgm
+        # GIN index created with the extension by alembic 5e7a1c3f8d20. It stays out of the
+        # metadata so create_all works on databases without pg_trgm
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: str = Field(index=True)
     activity_date: datetime = Field(default_factory=datetime.utcnow, nullable=False)
@@ -74,6 +91,18 @@ class LoggedActivity(LoggedActivityBase, table=True):
     # 'back_populates' links this to the 'activities' field in Category.
     category_rel: Optional["Category"] = Relationship(back_populates="activities")
 
+    # Per-user change sequence, bumped on every create/update (see services/change_tracker.py).
+    # Clients pass the highest value they have seen to /api/activities/changes to delta-sync.
+    change_seq: Optional[int] = Field(default=None, index=True)
+
+    # Absolute interval of the activity: activity_date's calendar day + start/end time,
+    # with end rolled to the next day for overnight activities. Derived - kept in sync
+    # on every ORM insert/update by the listeners at the end of this module (Core bulk
+    # inserts must fill them in from activity_interval() themselves).
+    start_at: Optional[datetime] = Field(default=None)
+    end_at: Optional[datetime] = Field(default=None)
+    duration_minutes: Optional[int] = Field(default=None)
+
 # NEW: We are replacing the old ActivityCreate with a more explicit version
 # that uses the new category_id.
 class ActivityCreate(SQLModel):
@@ -101,6 +130,78 @@ class ActivityUpdate(SQLModel):
     category_id: int
 
 
+# --- Delta Sync Models ---
+# These track per-user changes so clients can sync only what changed since their last sync.
+
+class UserSyncState(SQLModel, table=True):
+    """
+    Holds the per-user change counters. Every activity write takes the next
+    change_seq, so sequence numbers are monotonic per user and double as sync tokens.
+    data_version is bumped by every write of any user data and backs read ETags.
+    """
+    __tablename__ = "user_sync_state"
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: str = Field(unique=True, index=True)  # One counter per user
+    change_seq: int = 0
+    data_version: int = 0
+    # Bumped only by writes that can move the current psychological day (sleep
+    # activities, the Sleep category, End My Day); validates the effective-date cache
+    day_version: int = 0
+    # Bumped by category, goal, target and challenge writes; validates the
+    # reference-data cache (see services/reference_cache.py)
+    reference_version: int = 0
+
+class ActivityTombstone(SQLModel, table=True):
+    """Records a deleted activity so delta-sync clients can drop their local copy."""
+    __tablename__ = "activity_tombstones"
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: str = Field(index=True)
+    activity_id: int
+    change_seq: int = Field(index=True)
+    deleted_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
+
+
+# --- Daily Category Rollup Model ---
+# Pre-aggregated minutes per (user, psychological day, category), kept up to date by
+# the activity write paths (see services/category_rollup.py). Powers the pie chart and
+# daily summary without scanning raw activities.
+
+class DailyCategoryRollup(SQLModel, table=True):
+    __tablename__ = "daily_category_rollup"
+    __table_args__ = (
+        UniqueConstraint("user_id", "effective_date", "category_id", name="unique_user_day_category"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: str = Field(index=True)
+    effective_date: date
+    category_id: int
+    total_minutes: int = 0
+    activity_count: int = 0
+
+
+# --- Day Boundary Model ---
+# Persisted wake-up-to-wake-up boundaries per (user, psychological day), kept up to date
+# by sleep activity writes and End My Day (see services/day_boundaries.py). A day with
+# no row runs midnight to midnight unless the next day's row says otherwise.
+
+class DayBoundary(SQLModel, table=True):
+    __tablename__ = "day_boundaries"
+    __table_args__ = (
+        UniqueConstraint("user_id", "effective_date", name="unique_user_day_boundary"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: str = Field(index=True)
+    effective_date: date
+    start_at: datetime
+    end_at: datetime  # Always the next day's start_at
+    # What set start_at: "sleep" (last night's wake-up), "manual_end_day" or "default" (midnight)
+    source: str = "default"
+
+
 # --- Daily Target Models ---
 # These models define the 'daily_targets' table for user-defined daily time allocation goals.
 
@@ -166,6 +267,12 @@ class Challenge(ChallengeBase, table=True):
     __tablename__ = "challenges"
     id: Optional[UUID] = Field(default_factory=uuid4, primary_key=True)
     user_id: str = Field(index=True)
+    # Streak state over the daily metrics (days with overall completion >= success_threshold),
+    # maintained by services/challenge_tracker.py as days are scored. Written without bumping
+    # reference_version, so the reference cache's snapshots can lag - read get_streak_state().
+    current_streak: int = 0
+    longest_streak: int = 0
+    last_success_date: Optional[date] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
@@ -181,6 +288,10 @@ class DailyChallengeMetricsBase(SQLModel):
     overall_completion_pct: float = 0.0
     consistency_score: float = 0.0
     diligence_score: float = 0.0
+    # Cumulative metrics (up to this day), maintained by services/challenge_tracker.py
+    cumulative_consistency_rate: float = 0.0
+    cumulative_diligence_rate: float = 0.0
+    consecutive_completion_streak: int = 0
     # Context
     notes: Optional[str] = None
     mood: Optional[str] = None
@@ -188,7 +299,82 @@ class DailyChallengeMetricsBase(SQLModel):
 
 class DailyChallengeMetrics(DailyChallengeMetricsBase, table=True):
     __tablename__ = "daily_challenge_metrics"
+    __table_args__ = (
+        # Named as Postgres named the UNIQUE(challenge_id, date) in migrations/001_challenge_schema.sql
+        UniqueConstraint("challenge_id", "date", name="daily_challenge_metrics_challenge_id_date_key"),
+    )
     id: Optional[UUID] = Field(default_factory=uuid4, primary_key=True)
+    # Running totals behind the cumulative rates (days with metrics, consistent days,
+    # summed diligence) up to this day, so the next day extends them without a scan.
+    # NULL until migrations/add_challenge_running_totals.sql backfills them.
+    cumulative_days: Optional[int] = None
+    cumulative_consistent_days: Optional[int] = None
+    cumulative_diligence_total: Optional[float] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
+
+# --- Pending Challenge Progress ---
+# Activities logged but not yet counted in their day's challenge metrics. The create
+# paths enqueue them and services/challenge_updates.py drains the queue after a short
+# debounce, or straight away when the user reads their challenge.
+
+class PendingChallengeActivity(SQLModel, table=True):
+    __tablename__ = "pending_challenge_activities"
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: str = Field(index=True)
+    activity_id: int = Field(
+        sa_column=Column(Integer, ForeignKey("loggedactivity.id", ondelete="CASCADE"), nullable=False)
+    )
+    effective_date: date
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+# --- Activity Preset Model ---
+# One row per (user, activity name) with usage statistics for autocomplete, kept up to
+# date by the activity create paths (see services/activity_presets.py). The table comes
+# from migrations/001_challenge_schema.sql; typical_days_of_week isn't used by the API.
+
+class ActivityPreset(SQLModel, table=True):
+    __tablename__ = "activity_presets"
+    __table_args__ = (
+        UniqueConstraint("user_id", "activity_name", name="unique_user_activity_preset"),
+    )
+
+    id: Optional[UUID] = Field(default_factory=uuid4, primary_key=True)
+    user_id: str = Field(index=True)
+    activity_name: str
+    category_id: Optional[int] = Field(default=None, foreign_key="category.id")  # Most recently used
+    icon: Optional[str] = "📋"
+    is_frequent: bool = False
+    usage_count: int = 0
+    last_used_at: Optional[datetime] = None  # UTC
+    # Running (circular) mean of start times and mean duration
+    typical_start_time: Optional[time] = None
+    typical_duration_minutes: Optional[int] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+# --- Derived Activity Interval ---
+
+def activity_interval(activity_date: datetime, start_time: time, end_time: time) -> Tuple[datetime, datetime, int]:
+    """
+    Return (start_at, end_at, duration_minutes) for an activity. Durations ignore
+    seconds and are always under 24 hours, so end_at <= start_at + 1 day.
+    """
+    day = activity_date.date()
+    start_at = datetime.combine(day, start_time)
+    end_at = datetime.combine(day + timedelta(days=1) if end_time < start_time else day, end_time)
+    duration = (end_time.hour * 60 + end_time.minute) - (start_time.hour * 60 + start_time.minute)
+    if end_time < start_time:
+        duration += 24 * 60
+    return start_at, end_at, duration
+
+
+@event.listens_for(LoggedActivity, "before_insert")
+@event.listens_for(LoggedActivity, "before_update")
+def _stamp_activity_interval(mapper, connection, activity: LoggedActivity):
+    activity.start_at, activity.end_at, activity.duration_minutes = activity_interval(
+        activity.activity_date, activity.start_time, activity.end_time
+    )
@@ -0,0 +1,18 @@
+"""
+One-time script to backfill activity_presets from existing activities.
+Run this after applying migrations/add_activity_presets_unique.sql.
+"""
+from sqlmodel import Session
+from database import engine
+from services.activity_presets import rebuild_activity_presets
+
+def rebuild_all_presets():
+    """Recompute every user's activity presets."""
+    with Session(engine) as session:
+        rows_written = rebuild_activity_presets(session)
+        session.commit()
+        print(f"Wrote {rows_written} presets.")
+
+if __name__ == "__main__":
+    rebuild_all_presets()
+    print("Done!")
@@ -0,0 +1,18 @@
+"""
+One-time script to backfill daily_category_rollup from existing activities.
+Run this after applying migrations/add_daily_category_rollup.sql.
+"""
+from sqlmodel import Session
+from database import engine
+from services.category_rollup import rebuild_category_rollups
+
+def rebuild_all_rollups():
+    """Recompute every user's daily category rollup."""
+    with Session(engine) as session:
+        rows_written = rebuild_category_rollups(session)
+        session.commit()
+        print(f"Wrote {rows_written} rollup rows.")
+
+if __name__ == "__main__":
+    rebuild_all_rollups()
+    print("Done!")
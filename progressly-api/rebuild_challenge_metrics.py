@@ -0,0 +1,23 @@
+"""
+One-time script to rebuild daily_challenge_metrics from existing activities.
+Run this to repair metrics left stale by activity edits and deletes, or by
+commitment changes, made before those rebuilt the affected days.
+"""
+from sqlmodel import Session, select
+from database import engine
+from models import Challenge
+from services.challenge_tracker import rebuild_challenge_metrics
+
+def rebuild_all_challenge_metrics():
+    """Recompute every challenge's daily metrics."""
+    with Session(engine) as session:
+        challenges = session.exec(select(Challenge)).all()
+        rows_written = 0
+        for challenge in challenges:
+            rows_written += rebuild_challenge_metrics(session, challenge)
+        session.commit()
+        print(f"Rebuilt {len(challenges)} challenges ({rows_written} day rows).")
+
+if __name__ == "__main__":
+    rebuild_all_challenge_metrics()
+    print("Done!")
@@ -0,0 +1,18 @@
+"""
+One-time script to backfill day_boundaries from existing sleep activities.
+Run this after applying migrations/add_day_boundaries.sql.
+"""
+from sqlmodel import Session
+from database import engine
+from services.day_boundaries import rebuild_day_boundaries
+
+def rebuild_all_day_boundaries():
+    """Recompute every user's wake-up-to-wake-up day boundaries."""
+    with Session(engine) as session:
+        rows_written = rebuild_day_boundaries(session)
+        session.commit()
+        print(f"Wrote {rows_written} day boundary rows.")
+
+if __name__ == "__main__":
+    rebuild_all_day_boundaries()
+    print("Done!")
@@ -13,6 +13,8 @@ from uuid import UUID, uuid4
 
 # Import the AI context builder service
 from services.ai_context_builder import build_coach_context
+from services.challenge_updates import flush_challenge_updates
+from services.reference_cache import get_goals, get_daily_targets
 
 # Import the modern, correct Google GenAI SDK and its types module.
 # FACT: Our diagnostic proved 'genai' and 'genai.types' exist.
@@ -478,18 +480,18 @@ async def stream_chat(
                 )
             ).all()
             
-            # Fetch goals
-            goals = db.exec(select(Goal).where(Goal.user_id == user_id)).all()
-            
-            # Fetch daily targets
-            targets = db.exec(select(DailyTarget).where(DailyTarget.user_id == user_id)).all()
+            # Goals and daily targets (reference-data cache)
+            goals = get_goals(db, user_id)
+            targets = get_daily_targets(db, user_id)
             
             # Format all context for the AI prompt
             activities_context = format_activities_for_prompt(activities)
             goals_context = format_goals_for_prompt(goals)
             targets_context = format_daily_targets_for_prompt(targets)
             
-            # Build comprehensive challenge context for psychology-informed coaching
+            # Build comprehensive challenge context for psychology-informed coaching,
+            # counting activities still queued for challenge accounting first
+            flush_challenge_updates(db, user_id)
             challenge_context = build_coach_context(db, user_id)
         
         # Step 3: Create streaming response (AI message saved in stream_generator's finally block)
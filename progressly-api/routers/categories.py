@@ -1,12 +1,18 @@
 from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlmodel import Session, select, SQLModel
+from sqlmodel import Session, select, SQLModel, func
 from sqlalchemy.exc import IntegrityError # Important for handling duplicates
 import random
 
 from database import get_session
-from dependencies import get_current_user
-from models import Category
+from dependencies import get_current_user, conditional_get
+from models import Category, LoggedActivity
+from services.change_tracker import lock_user_writes, touch_activities
+from services.reference_cache import invalidate_reference_data
+from services.category_rollup import delete_category_rollups
+from services.day_boundaries import rebuild_day_boundaries
+from services.activity_presets import detach_category_presets
+from effective_date import invalidate_current_effective_date
 
 router = APIRouter()
 
@@ -22,7 +28,7 @@ class CategoryUpdate(SQLModel):
 
 # --- API Endpoints ---
 
-@router.get("/", response_model=List[Category])
+@router.get("/", response_model=List[Category], dependencies=[Depends(conditional_get)])
 def get_user_categories(
     *,
     session: Session = Depends(get_session),
@@ -43,11 +49,12 @@ def create_user_category(
 ):
     """Create a new category for the authenticated user."""
     
-    # Check if category with the same name (case-insensitive) already exists
+    # Check if category with the same name (case-insensitive) already exists.
+    # lower(name) = ... rather than ilike so the (user_id, lower(name)) index applies
     existing_category = session.exec(
         select(Category).where(
             Category.user_id == user_id,
-            Category.name.ilike(category.name) # ilike for case-insensitive search
+            func.lower(Category.name) == category.name.lower()
         )
     ).first()
 
@@ -65,6 +72,9 @@ def create_user_category(
     
     try:
         session.add(db_category)
+        if db_category.name.lower() == "sleep":
+            invalidate_current_effective_date(session, user_id)
+        invalidate_reference_data(session, user_id)
         session.commit()
         session.refresh(db_category)
         return db_category
@@ -93,6 +103,9 @@ def update_category(
     if category.user_id != user_id:
         raise HTTPException(status_code=403, detail="Not authorized")
     
+    # Renaming to or from "Sleep" changes which category ends the day
+    was_sleep = category.name.lower() == "sleep"
+
     # Update fields if provided
     if category_update.name is not None:
         category.name = category_update.name
@@ -101,6 +114,11 @@ def update_category(
     
     try:
         session.add(category)
+        if was_sleep or category.name.lower() == "sleep":
+            invalidate_current_effective_date(session, user_id)
+        invalidate_reference_data(session, user_id)
+        if was_sleep or category.name.lower() == "sleep":
+            rebuild_day_boundaries(session, user_id)
         session.commit()
         session.refresh(category)
         return category
@@ -127,9 +145,26 @@ def delete_category(
     if category.user_id != user_id:
         raise HTTPException(status_code=403, detail="Not authorized")
     
-    # Note: Activities with this category_id will have NULL category after delete
-    # This is handled by the database foreign key (SET NULL or no action)
+    # Note: Activities with this category_id will have NULL category after delete.
+    # Detach them explicitly so they also get a new change_seq for delta-sync clients.
+    # The write lock comes first so no activity can join the category meanwhile
+    lock_user_writes(session, user_id)
+    detached_ids = session.exec(
+        select(LoggedActivity.id).where(
+            LoggedActivity.user_id == user_id,
+            LoggedActivity.category_id == category_id
+        )
+    ).all()
+    touch_activities(session, user_id, list(detached_ids), category_id=None)
+    delete_category_rollups(session, user_id, category_id)
+    detach_category_presets(session, user_id, category_id)
+
     session.delete(category)
+    if category.name.lower() == "sleep":
+        invalidate_current_effective_date(session, user_id)
+    invalidate_reference_data(session, user_id)
+    if category.name.lower() == "sleep":
+        rebuild_day_boundaries(session, user_id)
     session.commit()
     
     return {"success": True, "message": f"Category '{category.name}' deleted"}
\ No newline at end of file
@@ -4,8 +4,12 @@ from typing import Annotated, Optional, List
 from datetime import datetime
 from uuid import UUID
 
-from dependencies import get_current_user, get_db_session
+from dependencies import get_current_user, get_db_session, conditional_get, fresh_challenge_metrics
 from models import Challenge, ChallengeCreate
+from services.reference_cache import invalidate_reference_data
+from services.challenge_tracker import rebuild_challenge_metrics
+from services.challenge_heatmap import build_challenge_heatmap
+from services.commitment_matcher import invalidate_commitment_matcher
 
 router = APIRouter()
 DBSession = Annotated[Session, Depends(get_db_session)]
@@ -42,6 +46,7 @@ def create_challenge(
         )
         
         db.add(new_challenge)
+        invalidate_reference_data(db, user_id)
         db.commit()
         db.refresh(new_challenge)
         return new_challenge
@@ -50,7 +55,7 @@ def create_challenge(
         print(f"ERROR creating challenge: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/api/challenges/active", response_model=Optional[Challenge])
+@router.get("/api/challenges/active", response_model=Optional[Challenge], dependencies=[Depends(fresh_challenge_metrics), Depends(conditional_get)])
 def get_active_challenge(db: DBSession, user_id: str = Depends(get_current_user)):
     """Get the user's currently active challenge."""
     try:
@@ -67,6 +72,31 @@ def get_active_challenge(db: DBSession, user_id: str = Depends(get_current_user)
         print(f"ERROR getting active challenge: {e}")
         raise HTTPException(status_code=500, detail="Failed to fetch active challenge")
 
+@router.get("/api/challenges/{challenge_id}/heatmap", dependencies=[Depends(fresh_challenge_metrics), Depends(conditional_get)])
+def get_challenge_heatmap(
+    challenge_id: UUID,
+    db: DBSession,
+    user_id: str = Depends(get_current_user)
+):
+    """
+    Compact per-day view of a challenge for calendar heatmaps: a completion
+    bucket per day and a bitset per commitment (see services/challenge_heatmap.py).
+    """
+    try:
+        challenge = db.get(Challenge, challenge_id)
+        if not challenge:
+            raise HTTPException(status_code=404, detail="Challenge not found")
+            
+        if challenge.user_id != user_id:
+            raise HTTPException(status_code=403, detail="Not authorized")
+        
+        return build_challenge_heatmap(db, challenge)
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"ERROR getting challenge heatmap: {e}")
+        raise HTTPException(status_code=500, detail="Failed to fetch challenge heatmap")
+
 @router.put("/api/challenges/{challenge_id}", response_model=Challenge)
 def update_challenge(
     challenge_id: UUID, 
@@ -91,6 +121,11 @@ def update_challenge(
         
         challenge.updated_at = datetime.utcnow()
         db.add(challenge)
+        if challenge_update.commitments is not None:
+            # History is scored against the commitments as they are now
+            invalidate_commitment_matcher(challenge.id)
+            rebuild_challenge_metrics(db, challenge)
+        invalidate_reference_data(db, user_id)
         db.commit()
         db.refresh(challenge)
         return challenge
@@ -118,6 +153,7 @@ def abandon_challenge(
         challenge.status = "abandoned"
         challenge.updated_at = datetime.utcnow()
         db.add(challenge)
+        invalidate_reference_data(db, user_id)
         db.commit()
         
         return {"success": True, "message": "Challenge abandoned"}
@@ -143,6 +179,8 @@ def delete_challenge(
             raise HTTPException(status_code=403, detail="Not authorized")
             
         db.delete(challenge)
+        invalidate_commitment_matcher(challenge.id)
+        invalidate_reference_data(db, user_id)
         db.commit()
         return {"success": True}
     except HTTPException:
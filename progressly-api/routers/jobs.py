@@ -5,9 +5,15 @@ from datetime import date, timedelta
 from fastapi import APIRouter, Depends, HTTPException, Header
 from sqlmodel import Session, select, delete
 from typing import Annotated
+from uuid import UUID
 
 from database import get_session
-from models import LoggedActivity
+from models import Challenge, LoggedActivity
+from services.category_rollup import rebuild_category_rollups
+from services.day_boundaries import rebuild_day_boundaries
+from services.activity_presets import rebuild_activity_presets
+from services.challenge_tracker import rebuild_challenge_metrics, verify_streak_state
+from services.reference_cache import reference_cache_stats
 
 # Create the router
 router = APIRouter(
@@ -68,3 +74,154 @@ def cleanup_old_activities(
         "deleted_count": 0,
         "note": "This endpoint is kept for backward compatibility but no longer deletes data."
     }
+
+
+@router.post("/rebuild-rollups")
+def rebuild_rollups(
+    db: DBSession,
+    _: bool = Depends(verify_cleanup_token),
+    user_id: str | None = None
+):
+    """
+    Rebuild daily_category_rollup from the activity log.
+    Used to backfill after the rollup migration, or to repair drift.
+    Pass ?user_id= to rebuild a single user.
+
+    Returns:
+        dict: Number of rollup rows written
+    """
+    rows_written = rebuild_category_rollups(db, user_id)
+    db.commit()
+    return {
+        "success": True,
+        "rows_written": rows_written,
+    }
+
+
+@router.post("/rebuild-day-boundaries")
+def rebuild_boundaries(
+    db: DBSession,
+    _: bool = Depends(verify_cleanup_token),
+    user_id: str | None = None
+):
+    """
+    Rebuild day_boundaries from sleep activities, keeping End My Day starts.
+    Used to backfill after the day_boundaries migration, or to repair drift.
+    Pass ?user_id= to rebuild a single user.
+
+    Returns:
+        dict: Number of boundary rows written
+    """
+    rows_written = rebuild_day_boundaries(db, user_id)
+    db.commit()
+    return {
+        "success": True,
+        "rows_written": rows_written,
+    }
+
+
+@router.post("/rebuild-presets")
+def rebuild_presets(
+    db: DBSession,
+    _: bool = Depends(verify_cleanup_token),
+    user_id: str | None = None
+):
+    """
+    Rebuild activity_presets (autocomplete statistics) from the activity log.
+    Used to backfill after migrations/add_activity_presets_unique.sql, or to
+    repair drift. Pass ?user_id= to rebuild a single user.
+
+    Returns:
+        dict: Number of presets written
+    """
+    rows_written = rebuild_activity_presets(db, user_id)
+    db.commit()
+    return {
+        "success": True,
+        "rows_written": rows_written,
+    }
+
+
+@router.post("/rebuild-challenge-metrics")
+def rebuild_challenge_metrics_job(
+    db: DBSession,
+    _: bool = Depends(verify_cleanup_token),
+    challenge_id: UUID | None = None,
+    user_id: str | None = None,
+    day: date | None = None
+):
+    """
+    Rebuild daily_challenge_metrics from the activity log, for one challenge
+    (?challenge_id=), one user's challenges (?user_id=) or every challenge.
+    Pass ?day= to rebuild just that day (and the cumulative rates after it).
+    Used to repair drift, e.g. from edits made before edits were tracked.
+
+    Returns:
+        dict: Number of challenges rebuilt and day rows written
+    """
+    statement = select(Challenge)
+    if challenge_id is not None:
+        statement = statement.where(Challenge.id == challenge_id)
+    if user_id is not None:
+        statement = statement.where(Challenge.user_id == user_id)
+    challenges = db.exec(statement).all()
+
+    rows_written = 0
+    for challenge in challenges:
+        rows_written += rebuild_challenge_metrics(db, challenge, None if day is None else [day])
+    db.commit()
+    return {
+        "success": True,
+        "challenges_rebuilt": len(challenges),
+        "rows_written": rows_written,
+    }
+
+
+@router.post("/verify-challenge-streaks")
+def verify_challenge_streaks_job(
+    db: DBSession,
+    _: bool = Depends(verify_cleanup_token),
+    challenge_id: UUID | None = None,
+    user_id: str | None = None,
+    repair: bool = False
+):
+    """
+    Cross-check the streak state stored on challenges against a recomputation
+    from their daily metrics, for one challenge (?challenge_id=), one user's
+    challenges (?user_id=) or every challenge. Pass ?repair=true to overwrite
+    mismatches with the recomputed state.
+
+    Returns:
+        dict: Number of challenges checked and the mismatches found
+    """
+    statement = select(Challenge)
+    if challenge_id is not None:
+        statement = statement.where(Challenge.id == challenge_id)
+    if user_id is not None:
+        statement = statement.where(Challenge.user_id == user_id)
+    challenges = db.exec(statement).all()
+
+    mismatches = []
+    for challenge in challenges:
+        mismatch = verify_streak_state(db, challenge, repair=repair)
+        if mismatch is not None:
+            mismatches.append({"challenge_id": str(challenge.id), **mismatch})
+    if repair:
+        db.commit()
+    return {
+        "success": True,
+        "challenges_checked": len(challenges),
+        "mismatches": mismatches,
+        "repaired": repair,
+    }
+
+
+@router.get("/cache-stats")
+def cache_stats(_: bool = Depends(verify_cleanup_token)):
+    """
+    Reference-data cache hit/miss counters for the worker that serves this request.
+
+    Returns:
+        dict: hits, misses, invalidations, hit_rate and cached_users
+    """
+    return reference_cache_stats()
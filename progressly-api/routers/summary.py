@@ -4,11 +4,11 @@ import logging
 from datetime import date
 from typing import List
 from fastapi import APIRouter, Depends
-from sqlmodel import SQLModel, Session, select, func, case
+from sqlmodel import SQLModel, Session
 
 # --- Import our new, clean dependencies ---
-from dependencies import get_current_user, get_db_session
-from models import Category, LoggedActivity
+from dependencies import get_current_user, get_db_session, conditional_get
+from services.category_rollup import get_daily_category_totals
 
 
 # --- API Response Model (No Change) ---
@@ -31,43 +31,30 @@ router = APIRouter(
 @router.get(
     "/daily/{summary_date}",
     response_model=List[DailySummaryItem],
+    dependencies=[Depends(conditional_get)],
 )
 def get_daily_summary(summary_date: date, db: Session = Depends(get_db_session), user_id: str = Depends(get_current_user)):
     """
     Calculates the total time spent in each category for a specific user on a given date.
     This endpoint powers the daily data visualization chart.
-    """
-
-    duration_calculation = case(
-        (LoggedActivity.end_time < LoggedActivity.start_time,
-         func.extract('epoch', LoggedActivity.end_time - LoggedActivity.start_time) + 86400),
-        else_=func.extract('epoch', LoggedActivity.end_time - LoggedActivity.start_time)
-    )
 
-    statement = (
-        select(
-            Category.id,
-            Category.name,
-            Category.color,
-            func.sum(duration_calculation).label("total_seconds")
-        )
-        .join(Category, LoggedActivity.category_id == Category.id)
-        .where(LoggedActivity.user_id == user_id)
-        .where(func.date(LoggedActivity.activity_date) == summary_date)
-        .group_by(Category.id, Category.name, Category.color)
-        .order_by(func.sum(duration_calculation).desc())
-    )
-
-    results = db.exec(statement).all()
+    Reads the pre-aggregated daily_category_rollup for the psychological day
+    (effective_date), so it is an indexed lookup over at most one row per category.
 
+    Note: summary_date is matched against effective_date, the day the activity
+    was logged for, like the dashboard pie chart - not the calendar date of
+    activity_date as before the rollup. An activity logged after midnight for the
+    previous day counts towards that day. Totals are whole minutes (seconds in
+    start/end times are ignored), the same durations the pie chart shows.
+    """
     summary_data = [
         DailySummaryItem(
-            category_id=res.id,
-            category_name=res.name,
-            category_color=res.color,
-            total_duration_minutes=round(res.total_seconds / 60, 2)
+            category_id=category_id,
+            category_name=name,
+            category_color=color,
+            total_duration_minutes=float(minutes)
         )
-        for res in results
+        for category_id, name, color, minutes in get_daily_category_totals(db, user_id, summary_date)
     ]
 
     # Safety net: Check if total exceeds 24 hours (1440 minutes)
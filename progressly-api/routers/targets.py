@@ -3,8 +3,9 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlmodel import Session, select, SQLModel
 
 from database import get_session
-from dependencies import get_current_user
+from dependencies import get_current_user, conditional_get
 from models import DailyTarget
+from services.reference_cache import invalidate_reference_data
 
 router = APIRouter()
 
@@ -20,7 +21,7 @@ class DailyTargetUpdate(SQLModel):
 
 # --- API Endpoints ---
 
-@router.get("/", response_model=List[DailyTarget])
+@router.get("/", response_model=List[DailyTarget], dependencies=[Depends(conditional_get)])
 def get_user_targets(
     *,
     session: Session = Depends(get_session),
@@ -42,6 +43,7 @@ def create_user_target(
     """Create a new daily target for the authenticated user."""
     db_target = DailyTarget.from_orm(target, update={'user_id': user_id})
     session.add(db_target)
+    invalidate_reference_data(session, user_id)
     session.commit()
     session.refresh(db_target)
     return db_target
@@ -62,6 +64,7 @@ def delete_user_target(
         raise HTTPException(status_code=403, detail="Not authorized to delete this target")
 
     session.delete(db_target)
+    invalidate_reference_data(session, user_id)
     session.commit()
     return
 
@@ -85,6 +88,7 @@ def update_user_target(
     db_target.target_hours = target.target_hours
 
     session.add(db_target)
+    invalidate_reference_data(session, user_id)
     session.commit()
     session.refresh(db_target)
     return db_target
\ No newline at end of file
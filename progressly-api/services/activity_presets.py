@@ -0,0 +1,348 @@
+# services/activity_presets.py
+"""
+Activity Preset Service
+Maintains activity_presets (usage statistics per user and activity name) and
+serves ranked autocomplete suggestions from them.
+
+The activity create paths fold each new activity into its preset inside their
+own transaction: usage count, last use, most recent category, and running
+means of start time and duration. Suggestions are served from a per-user
+in-memory prefix index over the user's most used names, so a keystroke-level
+lookup is a bisect plus scoring a handful of entries, with no database access.
+
+Index entries are dropped in the worker that handles a write, once it commits,
+and expire after PRESET_INDEX_TTL everywhere else, so other workers can lag by
+a few minutes - fine for autocomplete, and it keeps lookups free of version
+checks.
+"""
+
+import heapq
+import math
+import threading
+import time as clock
+from bisect import bisect_left
+from datetime import datetime, time, timezone
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import event
+from sqlmodel import Session, SQLModel, select, update, delete
+
+from models import ActivityPreset, LoggedActivity, activity_interval
+
+# Names per user kept in the in-memory index (by usage)
+PRESET_INDEX_SIZE = 200
+# Seconds an index lives before it is reloaded from the database
+PRESET_INDEX_TTL = 300
+# Uses after which a preset counts as frequent (quick-tap list)
+PRESET_FREQUENT_USES = 5
+
+# Ranking: score = FREQUENCY_WEIGHT * log(1 + uses)
+#                + RECENCY_WEIGHT * 0.5 ** (days since last use / RECENCY_HALF_LIFE_DAYS)
+#                + TIME_FIT_WEIGHT * exp(-(minutes between `at` and typical start / TIME_FIT_SCALE_MINUTES) ** 2)
+FREQUENCY_WEIGHT = 1.0
+RECENCY_WEIGHT = 1.5
+RECENCY_HALF_LIFE_DAYS = 14
+TIME_FIT_WEIGHT = 2.0
+TIME_FIT_SCALE_MINUTES = 90
+
+MINUTES_PER_DAY = 24 * 60
+
+
+def _minute_of_day(value: time) -> int:
+    return value.hour * 60 + value.minute
+
+
+def _minutes_apart(a: int, b: int) -> int:
+    """Signed shortest distance from b to a around the clock, in (-720, 720]."""
+    delta = (a - b) % MINUTES_PER_DAY
+    return delta - MINUTES_PER_DAY if delta > MINUTES_PER_DAY // 2 else delta
+
+
+def _as_utc_naive(value: Optional[datetime]) -> Optional[datetime]:
+    # timestamptz columns come back aware on Postgres; the rest of the app uses naive UTC
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+# --- Incremental maintenance ---
+
+def _apply_usage(preset: ActivityPreset, activity: LoggedActivity, used_at: datetime):
+    _, _, duration = activity_interval(activity.activity_date, activity.start_time, activity.end_time)
+    start_minute = _minute_of_day(activity.start_time)
+
+    preset.usage_count = (preset.usage_count or 0) + 1
+    count = preset.usage_count
+    if activity.category_id is not None:
+        preset.category_id = activity.category_id
+    preset.last_used_at = max(_as_utc_naive(preset.last_used_at) or used_at, used_at)
+    preset.is_frequent = count >= PRESET_FREQUENT_USES
+
+    if preset.typical_start_time is None or count == 1:
+        typical = start_minute
+    else:
+        # Running mean taken around the clock, so 23:30 and 00:30 average to midnight
+        typical = _minute_of_day(preset.typical_start_time)
+        typical = round(typical + _minutes_apart(start_minute, typical) / count) % MINUTES_PER_DAY
+    preset.typical_start_time = time(typical // 60, typical % 60)
+
+    previous = preset.typical_duration_minutes if count > 1 and preset.typical_duration_minutes is not None else duration
+    preset.typical_duration_minutes = round(previous + (duration - previous) / count)
+
+
+def record_activity_usage(db: Session, user_id: str, activities: List[LoggedActivity]):
+    """
+    Fold newly created activities into their presets: one SELECT for the names
+    involved, then an insert or update per name. Call in the create's transaction
+    after next_change_seq(), whose lock on the user's sync state row serializes
+    this read-modify-write per user. Does not commit.
+    """
+    activities = [a for a in activities if a.activity_name and a.activity_name.strip()]
+    if not activities:
+        return
+
+    names = {activity.activity_name for activity in activities}
+    presets = {
+        preset.activity_name: preset
+        for preset in db.exec(
+            select(ActivityPreset)
+            .where(ActivityPreset.user_id == user_id)
+            .where(ActivityPreset.activity_name.in_(names))
+        ).all()
+    }
+
+    used_at = datetime.utcnow()
+    for activity in activities:
+        preset = presets.get(activity.activity_name)
+        if preset is None:
+            preset = presets[activity.activity_name] = ActivityPreset(
+                user_id=user_id, activity_name=activity.activity_name, usage_count=0
+            )
+        _apply_usage(preset, activity, used_at)
+        db.add(preset)
+
+    _drop_index_after_commit(db, user_id)
+
+
+def detach_category_presets(db: Session, user_id: str, category_id: int):
+    """Clear the category from presets that point at it, before the category is deleted."""
+    db.exec(
+        update(ActivityPreset)
+        .where(ActivityPreset.user_id == user_id)
+        .where(ActivityPreset.category_id == category_id)
+        .values(category_id=None)
+    )
+    _drop_index_after_commit(db, user_id)
+
+
+def rebuild_activity_presets(db: Session, user_id: Optional[str] = None) -> int:
+    """
+    Recompute presets from the activity log, for one user or everyone, replaying
+    activities in creation order. Used for the initial backfill and as a repair
+    tool. Does not commit.
+
+    Returns:
+        Number of presets written
+    """
+    clear_statement = delete(ActivityPreset)
+    activities_statement = (
+        select(
+            LoggedActivity.user_id,
+            LoggedActivity.activity_name,
+            LoggedActivity.category_id,
+            LoggedActivity.activity_date,
+            LoggedActivity.start_time,
+            LoggedActivity.end_time,
+        )
+        .order_by(LoggedActivity.id.asc())
+    )
+    if user_id is not None:
+        clear_statement = clear_statement.where(ActivityPreset.user_id == user_id)
+        activities_statement = activities_statement.where(LoggedActivity.user_id == user_id)
+
+    presets: Dict[Tuple[str, str], ActivityPreset] = {}
+    for row in db.exec(activities_statement.execution_options(yield_per=1000)):
+        if not row.activity_name or not row.activity_name.strip():
+            continue
+        key = (row.user_id, row.activity_name)
+        preset = presets.get(key)
+        if preset is None:
+            preset = presets[key] = ActivityPreset(user_id=row.user_id, activity_name=row.activity_name, usage_count=0)
+        # activity_date is local wall time; close enough to order uses by recency
+        _apply_usage(preset, row, row.activity_date)
+
+    db.exec(clear_statement)
+    db.add_all(presets.values())
+    db.flush()
+    _drop_index_after_commit(db, user_id)
+    return len(presets)
+
+
+# --- In-memory prefix index ---
+
+class PresetEntry(SQLModel):
+    """Read-only snapshot of one preset, shared by every request for the user."""
+    activity_name: str
+    category_id: Optional[int]
+    usage_count: int
+    last_used_at: Optional[datetime]
+    typical_start_time: Optional[time]
+    typical_duration_minutes: Optional[int]
+
+
+class PresetIndex:
+    """
+    Sorted keys for one user's top presets: the full lower-cased name plus the
+    tail starting at each later word, so "work" finds "Deep work". A prefix
+    lookup is a bisect into the keys followed by scoring the matches.
+    """
+
+    def __init__(self, entries: List[PresetEntry]):
+        self.entries = entries
+        keys = []
+        for position, entry in enumerate(entries):
+            name = entry.activity_name.lower()
+            keys.append((name, position))
+            for i in range(1, len(name)):
+                if name[i - 1] == " " and name[i] != " ":
+                    keys.append((name[i:], position))
+        keys.sort()
+        self.keys = [key for key, _ in keys]
+        self.positions = [position for _, position in keys]
+        self.loaded_at = clock.monotonic()
+
+    def matches(self, prefix: str) -> List[PresetEntry]:
+        prefix = prefix.lower().strip()
+        if not prefix:
+            return self.entries
+        seen = set()
+        start = bisect_left(self.keys, prefix)
+        for i in range(start, len(self.keys)):
+            if not self.keys[i].startswith(prefix):
+                break
+            seen.add(self.positions[i])
+        return [self.entries[position] for position in seen]
+
+
+_index_cache: Dict[str, PresetIndex] = {}
+_index_lock = threading.Lock()
+# Bumped on every drop (per user, and overall for drop-everything), so a load that
+# read the presets before a write committed is never stored after its drop
+_index_generations: Dict[str, int] = {}
+_index_epoch = 0
+
+
+def _index_generation(user_id: str) -> Tuple[int, int]:
+    return _index_epoch, _index_generations.get(user_id, 0)
+
+
+def _drop_index(user_id: Optional[str]):
+    """Drop one user's index, or every index for user_id=None."""
+    global _index_epoch
+    with _index_lock:
+        if user_id is None:
+            _index_cache.clear()
+            _index_epoch += 1
+        else:
+            _index_cache.pop(user_id, None)
+            _index_generations[user_id] = _index_generations.get(user_id, 0) + 1
+
+
+def _drop_index_after_commit(db: Session, user_id: Optional[str]):
+    """
+    Drop the index once `db` commits. Dropping earlier would let a concurrent
+    suggest reload the index from the pre-commit presets and keep that stale
+    copy for PRESET_INDEX_TTL. A rollback drops nothing.
+    """
+    pending = db.info.get("preset_index_drops")
+    if pending is None:
+        pending = db.info["preset_index_drops"] = set()
+        event.listen(db, "after_commit", _drop_pending_indexes)
+        event.listen(db, "after_rollback", _discard_pending_drops)
+    pending.add(user_id)
+
+
+def _drop_pending_indexes(db: Session):
+    # Savepoints fire these events too; only the outermost transaction counts
+    if db.in_nested_transaction():
+        return
+    pending = db.info["preset_index_drops"]
+    for user_id in pending:
+        _drop_index(user_id)
+    pending.clear()
+
+
+def _discard_pending_drops(db: Session):
+    if db.in_nested_transaction():
+        return
+    db.info["preset_index_drops"].clear()
+
+
+def _load_index(db: Session, user_id: str) -> PresetIndex:
+    rows = db.exec(
+        select(
+            ActivityPreset.activity_name,
+            ActivityPreset.category_id,
+            ActivityPreset.usage_count,
+            ActivityPreset.last_used_at,
+            ActivityPreset.typical_start_time,
+            ActivityPreset.typical_duration_minutes,
+        )
+        .where(ActivityPreset.user_id == user_id)
+        .order_by(ActivityPreset.usage_count.desc(), ActivityPreset.last_used_at.desc())
+        .limit(PRESET_INDEX_SIZE)
+    ).all()
+    return PresetIndex([
+        PresetEntry(
+            activity_name=row.activity_name,
+            category_id=row.category_id,
+            usage_count=row.usage_count or 0,
+            last_used_at=_as_utc_naive(row.last_used_at),
+            typical_start_time=row.typical_start_time,
+            typical_duration_minutes=row.typical_duration_minutes,
+        )
+        for row in rows
+    ])
+
+
+def get_preset_index(db: Session, user_id: str) -> PresetIndex:
+    """The user's prefix index, loaded on first use and after writes or expiry."""
+    index = _index_cache.get(user_id)
+    if index is not None and clock.monotonic() - index.loaded_at < PRESET_INDEX_TTL:
+        return index
+    generation = _index_generation(user_id)
+    index = _load_index(db, user_id)
+    with _index_lock:
+        # A write committed while this one loaded: serve it, but don't keep it
+        if _index_generation(user_id) == generation:
+            _index_cache[user_id] = index
+    return index
+
+
+def score_preset(entry: PresetEntry, at: Optional[time], now: datetime) -> float:
+    score = FREQUENCY_WEIGHT * math.log1p(entry.usage_count)
+    if entry.last_used_at is not None:
+        days = max((now - entry.last_used_at).total_seconds(), 0) / 86400
+        score += RECENCY_WEIGHT * 0.5 ** (days / RECENCY_HALF_LIFE_DAYS)
+    if at is not None and entry.typical_start_time is not None:
+        apart = _minutes_apart(_minute_of_day(at), _minute_of_day(entry.typical_start_time))
+        score += TIME_FIT_WEIGHT * math.exp(-((apart / TIME_FIT_SCALE_MINUTES) ** 2))
+    return score
+
+
+def suggest_activity_names(
+    db: Session,
+    user_id: str,
+    prefix: str,
+    at: Optional[time] = None,
+    limit: int = 8,
+    now: Optional[datetime] = None
+) -> List[Tuple[PresetEntry, float]]:
+    """
+    Top `limit` presets whose name (or a word in it) starts with `prefix`, best
+    first, ranked by frequency, recency and how well `at` fits their usual start.
+    Only touches the database when the user's index isn't loaded.
+    """
+    now = now or datetime.utcnow()
+    matches = get_preset_index(db, user_id).matches(prefix)
+    scored = ((entry, score_preset(entry, at, now)) for entry in matches)
+    return heapq.nlargest(limit, scored, key=lambda pair: (pair[1], pair[0].usage_count))
@@ -14,10 +14,10 @@ from sqlalchemy.orm import selectinload
 from models import (
     Challenge, 
     DailyChallengeMetrics, 
-    LoggedActivity, 
-    Goal, 
-    DailyTarget
+    LoggedActivity
 )
+from services.reference_cache import get_active_challenge, get_goals, get_daily_targets
+from services.challenge_tracker import get_streak_state
 
 
 def calculate_duration_minutes(start_time: time, end_time: time) -> int:
@@ -29,43 +29,6 @@ def calculate_duration_minutes(start_time: time, end_time: time) -> int:
         return (end_time.hour * 60 + end_time.minute) - (start_time.hour * 60 + start_time.minute)
 
 
-def calculate_current_streak(metrics: List[DailyChallengeMetrics], threshold: float = 70.0) -> int:
-    """
-    Calculate current streak of consecutive days with completion >= threshold.
-    Metrics should be sorted by date descending (most recent first).
-    """
-    streak = 0
-    for metric in metrics:
-        if metric.overall_completion_pct >= threshold:
-            streak += 1
-        else:
-            break
-    return streak
-
-
-def calculate_longest_streak(metrics: List[DailyChallengeMetrics], threshold: float = 70.0) -> int:
-    """
-    Calculate longest streak of consecutive days with completion >= threshold.
-    """
-    if not metrics:
-        return 0
-    
-    max_streak = 0
-    current_streak = 0
-    
-    # Sort chronologically (oldest first)
-    sorted_metrics = sorted(metrics, key=lambda m: m.date)
-    
-    for metric in sorted_metrics:
-        if metric.overall_completion_pct >= threshold:
-            current_streak += 1
-            max_streak = max(max_streak, current_streak)
-        else:
-            current_streak = 0
-    
-    return max_streak
-
-
 def format_commitment_progress(
     commitment: dict, 
     status: dict
@@ -115,11 +78,7 @@ def build_coach_context(
     if challenge_id:
         challenge = db.get(Challenge, challenge_id)
     else:
-        statement = select(Challenge).where(
-            Challenge.user_id == user_id,
-            Challenge.status == "active"
-        ).order_by(Challenge.created_at.desc())
-        challenge = db.exec(statement).first()
+        challenge = get_active_challenge(db, user_id)
     
     # --- 2. Build Challenge Context ---
     if challenge:
@@ -205,23 +164,17 @@ Success Threshold: {challenge.success_threshold}%""")
             
             context_sections.append("\n".join(summary_lines))
         
-        # Streaks
-        all_metrics_query = select(DailyChallengeMetrics).where(
-            DailyChallengeMetrics.challenge_id == challenge.id
-        ).order_by(DailyChallengeMetrics.date.desc())
-        all_metrics = list(db.exec(all_metrics_query).all())
+        # Streaks (stored on the challenge as days are scored)
+        streak = get_streak_state(db, challenge.id)
         
-        if all_metrics:
-            current_streak = calculate_current_streak(all_metrics, challenge.success_threshold)
-            longest_streak = calculate_longest_streak(all_metrics, challenge.success_threshold)
-            
+        if streak and (recent_metrics or streak.longest_streak):
             context_sections.append(f"""
 STREAKS (days with ≥{challenge.success_threshold:.0f}% completion):
-• Current streak: {current_streak} days
-• Longest streak: {longest_streak} days""")
+• Current streak: {streak.current_streak} days
+• Longest streak: {streak.longest_streak} days""")
     
     # --- 4. Goals ---
-    goals = db.exec(select(Goal).where(Goal.user_id == user_id)).all()
+    goals = get_goals(db, user_id)
     if goals:
         goal_lines = ["", "USER'S GOALS:"]
         for goal in goals:
@@ -229,7 +182,7 @@ STREAKS (days with ≥{challenge.success_threshold:.0f}% completion):
         context_sections.append("\n".join(goal_lines))
     
     # --- 5. Daily Targets ---
-    targets = db.exec(select(DailyTarget).where(DailyTarget.user_id == user_id)).all()
+    targets = get_daily_targets(db, user_id)
     if targets:
         target_lines = ["", "DAILY TIME TARGETS:"]
         for target in targets:
@@ -0,0 +1,193 @@
+# services/category_rollup.py
+"""
+Category Rollup Service
+Maintains daily_category_rollup: total minutes and activity count per
+(user, effective_date, category).
+
+The activity write paths apply +/- deltas inside their own transaction, so the
+rollup always matches the activity log. Readers (pie chart, daily summary) then
+look up a handful of pre-aggregated rows instead of scanning raw activities.
+"""
+
+from collections import defaultdict
+from datetime import date, time
+from typing import Dict, List, Optional, Tuple
+from sqlmodel import Session, select
+from sqlalchemy import delete
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from models import DailyCategoryRollup, LoggedActivity, Category
+from services.challenge_tracker import calculate_duration_minutes
+
+
+def _apply_delta(
+    db: Session,
+    user_id: str,
+    effective_date: date,
+    category_id: int,
+    minutes: int,
+    count: int
+):
+    """Atomically add a delta to one rollup row, creating it if needed."""
+    table = DailyCategoryRollup.__table__
+    insert = pg_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+
+    statement = insert(table).values(
+        user_id=user_id,
+        effective_date=effective_date,
+        category_id=category_id,
+        total_minutes=minutes,
+        activity_count=count,
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=["user_id", "effective_date", "category_id"],
+        set_={
+            "total_minutes": table.c.total_minutes + statement.excluded.total_minutes,
+            "activity_count": table.c.activity_count + statement.excluded.activity_count,
+        },
+    )
+    db.exec(statement)
+
+    if count < 0:
+        # Drop rows whose last activity was removed so reads stay small
+        db.exec(
+            delete(DailyCategoryRollup)
+            .where(DailyCategoryRollup.user_id == user_id)
+            .where(DailyCategoryRollup.effective_date == effective_date)
+            .where(DailyCategoryRollup.category_id == category_id)
+            .where(DailyCategoryRollup.activity_count <= 0)
+        )
+
+
+def _activity_delta(
+    db: Session,
+    user_id: str,
+    effective_date: Optional[date],
+    category_id: Optional[int],
+    start_time: time,
+    end_time: time,
+    sign: int
+):
+    # Uncategorized activities and legacy rows without a psychological day aren't rolled up
+    if category_id is None or effective_date is None:
+        return
+    minutes = calculate_duration_minutes(start_time, end_time)
+    _apply_delta(db, user_id, effective_date, category_id, sign * minutes, sign)
+
+
+def add_activity_to_rollup(db: Session, activity: LoggedActivity):
+    """Count an activity in its day's rollup. Call in the same transaction as the insert."""
+    _activity_delta(
+        db, activity.user_id, activity.effective_date, activity.category_id,
+        activity.start_time, activity.end_time, 1
+    )
+
+
+def _sum_deltas(deltas: Dict[Tuple[str, date, int], List[int]], activities: List[LoggedActivity], sign: int):
+    for activity in activities:
+        if activity.category_id is None or activity.effective_date is None:
+            continue
+        entry = deltas[(activity.user_id, activity.effective_date, activity.category_id)]
+        entry[0] += sign * calculate_duration_minutes(activity.start_time, activity.end_time)
+        entry[1] += sign
+
+
+def apply_activity_batch_to_rollup(
+    db: Session,
+    removed: List[LoggedActivity] = (),
+    added: List[LoggedActivity] = ()
+):
+    """
+    Apply a batch of writes with one upsert per affected (user, day, category):
+    `removed` are deleted activities (or the old state of updated ones), `added`
+    are new activities (or the new state). Call in the write's transaction.
+    """
+    deltas: Dict[Tuple[str, date, int], List[int]] = defaultdict(lambda: [0, 0])
+    _sum_deltas(deltas, removed, -1)
+    _sum_deltas(deltas, added, 1)
+
+    for (user_id, effective_date, category_id), (minutes, count) in deltas.items():
+        if minutes or count:
+            _apply_delta(db, user_id, effective_date, category_id, minutes, count)
+
+
+def remove_activity_from_rollup(db: Session, activity: LoggedActivity):
+    """
+    Remove an activity's contribution. For updates, call this before changing
+    the activity's fields and add_activity_to_rollup after.
+    """
+    _activity_delta(
+        db, activity.user_id, activity.effective_date, activity.category_id,
+        activity.start_time, activity.end_time, -1
+    )
+
+
+def delete_category_rollups(db: Session, user_id: str, category_id: int):
+    """Drop all rollup rows for a category that is being deleted."""
+    db.exec(
+        delete(DailyCategoryRollup)
+        .where(DailyCategoryRollup.user_id == user_id)
+        .where(DailyCategoryRollup.category_id == category_id)
+    )
+
+
+def get_daily_category_totals(db: Session, user_id: str, effective_date: date) -> List[Tuple[int, str, str, int]]:
+    """
+    Return (category_id, name, color, total_minutes) for one psychological day,
+    largest first. Indexed lookup over at most one row per category.
+    """
+    statement = (
+        select(Category.id, Category.name, Category.color, DailyCategoryRollup.total_minutes)
+        .join(Category, DailyCategoryRollup.category_id == Category.id)
+        .where(DailyCategoryRollup.user_id == user_id)
+        .where(DailyCategoryRollup.effective_date == effective_date)
+        .where(DailyCategoryRollup.total_minutes > 0)
+        .order_by(DailyCategoryRollup.total_minutes.desc())
+    )
+    return list(db.exec(statement).all())
+
+
+def rebuild_category_rollups(db: Session, user_id: Optional[str] = None) -> int:
+    """
+    Recompute the rollup from the activity log, for one user or everyone.
+    Used for the initial backfill and as a repair tool. Does not commit.
+
+    Returns:
+        Number of rollup rows written
+    """
+    clear_statement = delete(DailyCategoryRollup)
+    activities_statement = (
+        select(
+            LoggedActivity.user_id,
+            LoggedActivity.effective_date,
+            LoggedActivity.category_id,
+            LoggedActivity.start_time,
+            LoggedActivity.end_time,
+        )
+        .where(LoggedActivity.category_id.is_not(None))
+        .where(LoggedActivity.effective_date.is_not(None))
+    )
+    if user_id is not None:
+        clear_statement = clear_statement.where(DailyCategoryRollup.user_id == user_id)
+        activities_statement = activities_statement.where(LoggedActivity.user_id == user_id)
+
+    totals: Dict[Tuple[str, date, int], List[int]] = defaultdict(lambda: [0, 0])
+    for row in db.exec(activities_statement.execution_options(yield_per=1000)):
+        entry = totals[(row.user_id, row.effective_date, row.category_id)]
+        entry[0] += calculate_duration_minutes(row.start_time, row.end_time)
+        entry[1] += 1
+
+    db.exec(clear_statement)
+    db.add_all([
+        DailyCategoryRollup(
+            user_id=key[0],
+            effective_date=key[1],
+            category_id=key[2],
+            total_minutes=minutes,
+            activity_count=count,
+        )
+        for key, (minutes, count) in totals.items()
+    ])
+    db.flush()
+    return len(totals)
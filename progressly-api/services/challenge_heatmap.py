@@ -0,0 +1,101 @@
+# services/challenge_heatmap.py
+"""
+Challenge Heatmap
+Compact whole-challenge view of daily_challenge_metrics for calendar heatmaps.
+
+Instead of one full row per day (commitments_status JSON included), a challenge
+comes back as one small integer per day - its completion bucket - plus a bitset
+per commitment marking the days it was completed, and one for the days that
+met the challenge's success_threshold. A 100-day challenge is a few hundred
+bytes.
+
+Day i of every array and bitset is start_date + i days. Bitsets are base64 of
+bytes with day i at bit (i % 8) of byte i // 8, least significant bit first.
+"""
+
+import base64
+from typing import List
+
+from sqlalchemy import String, func, type_coerce
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlmodel import Session, select
+
+from models import Challenge, DailyChallengeMetrics
+from utils.metrics import meets_threshold
+
+# Upper bounds (exclusive) of the completion buckets above 0%, matching the
+# dashboard's calendar colours: bucket 0 = no metrics for the day, 1 = 0%,
+# 2 = under 25%, 3 = under 50%, 4 = under 75%, 5 = under 90%, 6 = 90% or more
+HEATMAP_BUCKET_BOUNDS = [25, 50, 75, 90]
+
+
+def completion_bucket(completion_pct) -> int:
+    """Heatmap bucket of one day's overall completion (None = no metrics)."""
+    if completion_pct is None:
+        return 0
+    if completion_pct <= 0:
+        return 1
+    for bucket, bound in enumerate(HEATMAP_BUCKET_BOUNDS, start=2):
+        if completion_pct < bound:
+            return bucket
+    return len(HEATMAP_BUCKET_BOUNDS) + 2
+
+
+def _completed_column(dialect_name: str, commitment_id: str):
+    """Whether a day's status has the commitment completed, evaluated in the database."""
+    status = DailyChallengeMetrics.__table__.c.commitments_status
+    if dialect_name == "postgresql":
+        entry = type_coerce(status, JSONB).op("->", return_type=JSONB)(commitment_id)
+        return entry.op("->>", return_type=String)("completed") == "true"
+    return func.json_extract(status, '$."%s".completed' % commitment_id) == 1
+
+
+def _bitset(days: List[int], size: int) -> str:
+    bits = bytearray((size + 7) // 8)
+    for day in days:
+        bits[day // 8] |= 1 << (day % 8)
+    return base64.b64encode(bytes(bits)).decode("ascii")
+
+
+def build_challenge_heatmap(db: Session, challenge: Challenge) -> dict:
+    """
+    The challenge's heatmap from one query that projects each day's date,
+    completion and per-commitment completed flags - the status JSON itself
+    never leaves the database.
+    """
+    commitment_ids = [c["id"] for c in challenge.commitments or [] if c.get("id")]
+    dialect_name = db.get_bind().dialect.name
+    rows = db.exec(
+        select(
+            DailyChallengeMetrics.date,
+            DailyChallengeMetrics.overall_completion_pct,
+            *[_completed_column(dialect_name, c_id).label(f"c{i}") for i, c_id in enumerate(commitment_ids)],
+        )
+        .where(DailyChallengeMetrics.challenge_id == challenge.id)
+        .where(DailyChallengeMetrics.date.between(challenge.start_date, challenge.end_date))
+    ).all()
+
+    size = (challenge.end_date - challenge.start_date).days + 1
+    buckets = [0] * size
+    successful: List[int] = []
+    completed: List[List[int]] = [[] for _ in commitment_ids]
+    for row in rows:
+        day = (row[0] - challenge.start_date).days
+        buckets[day] = completion_bucket(row[1])
+        if meets_threshold(row[1], challenge.success_threshold):
+            successful.append(day)
+        for i, flag in enumerate(row[2:]):
+            if flag:
+                completed[i].append(day)
+
+    return {
+        "challenge_id": str(challenge.id),
+        "start_date": challenge.start_date.isoformat(),
+        "days": size,
+        "bucket_bounds": HEATMAP_BUCKET_BOUNDS,
+        "buckets": buckets,
+        "successful": _bitset(successful, size),
+        "commitments": [
+            {"id": c_id, "completed": _bitset(days, size)} for c_id, days in zip(commitment_ids, completed)
+        ],
+    }
@@ -1,11 +1,253 @@
+import json
+from collections import defaultdict
 from datetime import date, datetime, time
 from logging import getLogger
-from typing import Optional, List
-from sqlmodel import Session, select
-from models import Challenge, DailyChallengeMetrics, LoggedActivity
+from typing import Dict, Iterable, Optional, List, Tuple
+from sqlmodel import Session, select, delete, update
+from sqlalchemy import Boolean, Float, String, case, cast, false, func, literal, or_, true, type_coerce
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from models import Category, Challenge, DailyChallengeMetrics, LoggedActivity, PendingChallengeActivity
+from services.change_tracker import lock_user_writes
+from services.reference_cache import get_active_challenge
+from services.commitment_matcher import CommitmentMatcher, get_commitment_matcher
+from utils.metrics import calculate_streak_state, meets_threshold
 
 logger = getLogger(__name__)
 
+def _contribution(comm: dict, activity: LoggedActivity) -> Optional[float]:
+    """What one activity adds to a commitment's achieved value; None for binary commitments."""
+    duration_min = calculate_duration_minutes(activity.start_time, activity.end_time)
+    if comm.get("unit") == "hours":
+        return duration_min / 60.0
+    if comm.get("unit") == "minutes":
+        return duration_min
+    return None
+
+
+def _accrue_activity(
+    matcher: CommitmentMatcher,
+    current_status: dict,
+    activity: LoggedActivity,
+    category_name: Optional[str]
+) -> bool:
+    """
+    Add one activity's contribution to every commitment it matches
+    (by category, or by habit name as a substring - see commitment_matcher.py).
+    Mutates current_status; returns True if anything matched.
+    """
+    updated = False
+    
+    for comm in matcher.match(activity.activity_name, category_name):
+        c_id = comm.get("id")
+        c_habit = comm.get("habit")
+        c_unit = comm.get("unit")
+        c_target = comm.get("target") 
+        
+        logger.debug("Activity %r matched commitment %r", activity.activity_name, c_habit)
+        
+        # Get existing entry or init
+        status_entry = current_status.get(c_id, {
+            "achieved": 0,
+            "target": c_target,
+            "unit": c_unit,
+            "completed": False
+        })
+        
+        # Accrue progress
+        amount = _contribution(comm, activity)
+        if amount is not None:
+            status_entry["achieved"] = float(status_entry.get("achieved", 0)) + amount
+        else: 
+            # Default/Binary
+            status_entry["achieved"] = 1
+            status_entry["completed"] = True
+        
+        # Check completion
+        if c_unit in ["hours", "minutes"] and c_target:
+            if status_entry["achieved"] >= float(c_target):
+                status_entry["completed"] = True
+        
+        current_status[c_id] = status_entry
+        updated = True
+
+    return updated
+
+
+def _status_deltas(
+    matcher: CommitmentMatcher,
+    activities: List[Tuple[LoggedActivity, Optional[str]]]
+) -> Dict[str, Tuple[dict, List[Optional[float]]]]:
+    """Per matched commitment id: the commitment and each activity's contribution, in order."""
+    deltas: Dict[str, Tuple[dict, List[Optional[float]]]] = {}
+    for activity, category_name in activities:
+        for comm in matcher.match(activity.activity_name, category_name):
+            deltas.setdefault(comm["id"], (comm, []))[1].append(_contribution(comm, activity))
+    return deltas
+
+
+def _merged_status(dialect_name: str, deltas: Dict[str, Tuple[dict, List[Optional[float]]]]):
+    """
+    SQL for the stored commitments_status with `deltas` accrued into it, as
+    _accrue_activity would, for the DO UPDATE of a day's upsert. Each entry's
+    achieved value is summed in the same order as in Python, so the result is
+    the one a rebuild from the log gives. jsonb operators on Postgres, the
+    JSON1 functions on SQLite (which formats REAL with 15 digits unless told
+    otherwise, hence printf %!.17g).
+    """
+    postgres = dialect_name == "postgresql"
+    stored = DailyChallengeMetrics.__table__.c.commitments_status
+    merged = func.coalesce(type_coerce(stored, JSONB), cast("{}", JSONB)) if postgres else func.coalesce(stored, "{}")
+    
+    for c_id, (comm, amounts) in deltas.items():
+        c_target = comm.get("target")
+        initial = json.dumps({"achieved": 0, "target": c_target, "unit": comm.get("unit"), "completed": False})
+        if postgres:
+            stored_entry = type_coerce(stored, JSONB).op("->", return_type=JSONB)(c_id)
+            entry = type_coerce(func.coalesce(stored_entry, cast(initial, JSONB)), JSONB)
+            achieved = func.coalesce(entry["achieved"].astext.cast(Float), 0.0)
+            completed = func.coalesce(entry["completed"].astext.cast(Boolean), false())
+        else:
+            path = '$."%s"' % c_id
+            entry = func.coalesce(func.json_extract(stored, path), initial)
+            achieved = func.coalesce(func.json_extract(entry, "$.achieved"), 0.0)
+            completed = type_coerce(func.coalesce(func.json_extract(entry, "$.completed"), 0), Boolean)
+        
+        binary = False
+        for amount in amounts:
+            if amount is None:
+                achieved, binary = literal(1), True
+            else:
+                achieved = achieved + literal(amount, Float)
+        if binary:
+            completed = true()
+        elif comm.get("unit") in ["hours", "minutes"] and c_target:
+            completed = or_(completed, achieved >= float(c_target))
+        
+        if postgres:
+            entry = entry.op("||", return_type=JSONB)(
+                func.jsonb_build_object(cast("achieved", String), achieved, cast("completed", String), completed)
+            )
+            merged = merged.op("||", return_type=JSONB)(func.jsonb_build_object(cast(c_id, String), entry))
+        else:
+            achieved_json = literal(1) if binary else func.json(func.printf("%!.17g", achieved))
+            entry = func.json_set(
+                entry,
+                "$.achieved", achieved_json,
+                "$.completed", case((completed, func.json("true")), else_=func.json("false")),
+            )
+            merged = func.json_set(merged, path, func.json(entry))
+    return merged
+
+
+def _upsert_day(
+    db: Session,
+    challenge: Challenge,
+    effective_date: date,
+    activities: List[Tuple[LoggedActivity, Optional[str]]],
+    matcher: CommitmentMatcher
+) -> bool:
+    """
+    Accrue a day's activities into its metrics row with one INSERT ... ON
+    CONFLICT DO UPDATE: a new row gets the status accrued in Python, an
+    existing one has the same deltas merged into its stored status by the
+    database. No read first, so concurrent logs for the day can neither
+    collide on UNIQUE(challenge_id, date) nor overwrite each other's progress,
+    and the row stays locked until commit. Scores are left to the caller.
+
+    Returns:
+        True if anything matched (otherwise nothing is written)
+    """
+    current_status: dict = {}
+    updated = False
+    for activity, category_name in activities:
+        updated = _accrue_activity(matcher, current_status, activity, category_name) or updated
+    if not updated:
+        return False
+    
+    dialect_name = db.get_bind().dialect.name
+    now = datetime.utcnow()
+    row = DailyChallengeMetrics(
+        challenge_id=challenge.id,
+        date=effective_date,
+        day_number=(effective_date - challenge.start_date).days + 1,
+        commitments_status=current_status,
+        created_at=now,
+        updated_at=now,
+    )
+    insert = pg_insert if dialect_name == "postgresql" else sqlite_insert
+    statement = insert(DailyChallengeMetrics.__table__).values(
+        {column.name: getattr(row, column.name) for column in DailyChallengeMetrics.__table__.columns}
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=["challenge_id", "date"],
+        set_={
+            "commitments_status": _merged_status(dialect_name, _status_deltas(matcher, activities)),
+            "updated_at": now,
+        },
+    )
+    db.exec(statement)
+    return True
+
+
+def _score_day_totals(challenge: Challenge, metrics: DailyChallengeMetrics, current_status: dict):
+    """Store the day's commitment status and recompute its own (non-cumulative) scores."""
+    commitments = challenge.commitments or []
+    metrics.commitments_status = current_status
+    
+    # Recalculate overall completion score
+    total_commitments = len(commitments)
+    completed_count = sum(1 for v in current_status.values() if v.get("completed"))
+    
+    if total_commitments > 0:
+        metrics.overall_completion_pct = round((completed_count / total_commitments) * 100, 1)
+    
+    # Mark that there was activity today (for consistency)
+    metrics.consistency_score = 100  # Has activity = 100% consistency for the day
+    
+    # Calculate diligence (how much of targets achieved)
+    total_target_pct = 0
+    applicable_count = 0
+    for c_id, status in current_status.items():
+        target = status.get("target")
+        achieved = status.get("achieved", 0)
+        if target and float(target) > 0:
+            pct = min((float(achieved) / float(target)) * 100, 100)
+            total_target_pct += pct
+            applicable_count += 1
+    
+    if applicable_count > 0:
+        metrics.diligence_score = round(total_target_pct / applicable_count, 1)
+
+
+def _accrue_days(
+    db: Session,
+    challenge: Challenge,
+    activities: List[Tuple[LoggedActivity, Optional[str]]]
+) -> Dict[date, DailyChallengeMetrics]:
+    """
+    Upsert each affected day's metrics (see _upsert_day), then score those days
+    and carry the cumulative rates forward in one pass. Does not commit.
+
+    Returns:
+        The metrics rows of the days that changed, by date
+    """
+    by_day: Dict[date, List[Tuple[LoggedActivity, Optional[str]]]] = defaultdict(list)
+    for activity, category_name in activities:
+        effective_date = activity.effective_date or date.today()
+        # Don't track before start or after end
+        if challenge.start_date <= effective_date <= challenge.end_date:
+            by_day[effective_date].append((activity, category_name))
+    
+    matcher = get_commitment_matcher(challenge)
+    updated_days = {day for day in sorted(by_day) if _upsert_day(db, challenge, day, by_day[day], matcher)}
+    if not updated_days:
+        return {}
+    rows = _refresh_cumulative(db, challenge, min(updated_days), rescore=updated_days)
+    return {m.date: m for m in rows if m.date in updated_days}
+
+
 def update_challenge_progress(
     db: Session, 
     user_id: str, 
@@ -17,161 +259,369 @@ def update_challenge_progress(
     Matches activity category or name against challenge commitments.
     """
     try:
-        # 1. Get Active Challenge
-        statement = select(Challenge).where(Challenge.user_id == user_id).where(Challenge.status == "active")
-        challenge = db.exec(statement).first()
+        # Reference-data cache; read-only snapshot
+        challenge = get_active_challenge(db, user_id)
         if not challenge:
             return None # No active challenge
         
-        # 2. Get/Create Metrics for Effective Date
-        # Use effective_date (psychological day)
-        effective_date = activity.effective_date or date.today()
-        
-        # Don't track before start or after end
-        if effective_date < challenge.start_date or effective_date > challenge.end_date:
-            return None
-            
-        metrics_query = select(DailyChallengeMetrics).where(
-            DailyChallengeMetrics.challenge_id == challenge.id,
-            DailyChallengeMetrics.date == effective_date
-        )
-        metrics = db.exec(metrics_query).first()
-        
-        if not metrics:
-            # Initialize new metrics
-            day_num = (effective_date - challenge.start_date).days + 1
-            metrics = DailyChallengeMetrics(
-                challenge_id=challenge.id,
-                date=effective_date,
-                day_number=day_num,
-                commitments_status={}
-            )
-            db.add(metrics)
-            # We need to commit/flush to ensure we have an object we can modify safely? 
-            # Actually just adding it to session is enough for modification, but ID generation happens on flush.
-        
-        # 3. Process Commitments
-        # commitments is likely a list of dicts: [{id, habit, target, unit, category, ...}]
-        commitments = challenge.commitments or []
-        
-        # Identify current status map
-        # Structure: { commitment_id: { achieved: number, completed: bool, ... } }
-        current_status = dict(metrics.commitments_status) if metrics.commitments_status else {}
-        
-        updated = False
-        
-        for comm in commitments:
-            c_id = comm.get("id")
-            if not c_id: continue
-            
-            c_category = comm.get("category")
-            c_habit = comm.get("habit")
-            c_unit = comm.get("unit")
-            c_target = comm.get("target") 
-            
-            # MATCHING LOGIC
-            is_match = False
-            
-            # Match by Category (Primary)
-            if c_category and category_name and c_category.lower() == category_name.lower():
-                is_match = True
-            # Match by Habit Name (Secondary - substring match)
-            elif c_habit and activity.activity_name and c_habit.lower() in activity.activity_name.lower():
-                is_match = True
-                
-            if is_match:
-                print(f"[ChallengeTracker] Activity '{activity.activity_name}' matched commitment '{c_habit}'")
-                
-                # Calculate contribution
-                duration_min = calculate_duration_minutes(activity.start_time, activity.end_time)
-                duration_hours = duration_min / 60.0
-                
-                # Get existing entry or init
-                status_entry = current_status.get(c_id, {
-                    "achieved": 0,
-                    "target": c_target,
-                    "unit": c_unit,
-                    "completed": False
-                })
-                
-                # Accrue progress
-                if c_unit == "hours":
-                    status_entry["achieved"] = float(status_entry.get("achieved", 0)) + duration_hours
-                elif c_unit == "minutes":
-                    status_entry["achieved"] = float(status_entry.get("achieved", 0)) + duration_min
-                else: 
-                    # Default/Binary
-                    status_entry["achieved"] = 1
-                    status_entry["completed"] = True
-                    
-                # Check completion
-                if c_unit in ["hours", "minutes"] and c_target:
-                    if status_entry["achieved"] >= float(c_target):
-                        status_entry["completed"] = True
-                
-                current_status[c_id] = status_entry
-                updated = True
-
+        updated = _accrue_days(db, challenge, [(activity, category_name)])
         if updated:
-            metrics.commitments_status = current_status
-            
-            # Recalculate overall completion score
-            total_commitments = len(commitments)
-            completed_count = sum(1 for v in current_status.values() if v.get("completed"))
-            
-            if total_commitments > 0:
-                metrics.overall_completion_pct = round((completed_count / total_commitments) * 100, 1)
-            
-            # Mark that there was activity today (for consistency)
-            metrics.consistency_score = 100  # Has activity = 100% consistency for the day
-            
-            # Calculate diligence (how much of targets achieved)
-            total_target_pct = 0
-            applicable_count = 0
-            for c_id, status in current_status.items():
-                target = status.get("target")
-                achieved = status.get("achieved", 0)
-                if target and float(target) > 0:
-                    pct = min((float(achieved) / float(target)) * 100, 100)
-                    total_target_pct += pct
-                    applicable_count += 1
-            
-            if applicable_count > 0:
-                metrics.diligence_score = round(total_target_pct / applicable_count, 1)
-            
-            # Recalculate cumulative rates from all metrics in this challenge
-            all_metrics_query = select(DailyChallengeMetrics).where(
-                DailyChallengeMetrics.challenge_id == challenge.id,
-                DailyChallengeMetrics.date <= effective_date
-            ).order_by(DailyChallengeMetrics.date.asc())
-            all_metrics = db.exec(all_metrics_query).all()
-            
-            total_days = len(all_metrics)
-            consistent_days = sum(1 for m in all_metrics if m.consistency_score and m.consistency_score > 0)
-            total_diligence = sum(m.diligence_score or 0 for m in all_metrics)
-            
-            if total_days > 0:
-                metrics.cumulative_consistency_rate = round((consistent_days / total_days) * 100, 1)
-                metrics.cumulative_diligence_rate = round(total_diligence / total_days, 1)
-            
-            # Calculate streak (consecutive days with 70%+ completion)
-            streak = 0
-            for m in reversed(all_metrics):
-                if m.overall_completion_pct and m.overall_completion_pct >= 70:
-                    streak += 1
-                else:
-                    break
-            metrics.consecutive_completion_streak = streak
-            
-            db.add(metrics)
             db.commit()
+            metrics = next(iter(updated.values()))
             db.refresh(metrics)
             return metrics
             
     except Exception as e:
         print(f"ERROR in update_challenge_progress: {e}")
+        db.rollback()
         return None
 
+
+def update_challenge_progress_bulk(
+    db: Session,
+    user_id: str,
+    activities: List[Tuple[LoggedActivity, Optional[str]]]
+) -> int:
+    """
+    Batch version of update_challenge_progress for many (activity, category_name)
+    pairs: one upsert per affected day, one scoring pass over the days from
+    the earliest of them, and everything is committed together.
+
+    Returns:
+        Number of days whose metrics changed
+    """
+    try:
+        challenge = get_active_challenge(db, user_id)
+        if not challenge:
+            return 0
+        
+        days_updated = len(_accrue_days(db, challenge, activities))
+        db.commit()
+        return days_updated
+    
+    except Exception as e:
+        print(f"ERROR in update_challenge_progress_bulk: {e}")
+        db.rollback()
+        return 0
+
+def _carry_cumulative(previous: Optional[DailyChallengeMetrics], metrics: DailyChallengeMetrics, threshold: float):
+    """
+    Extend the previous day's running totals by this day and derive its
+    cumulative rates and streak (consecutive days at or above the threshold).
+    """
+    days = (previous.cumulative_days if previous else 0) + 1
+    consistent_days = (previous.cumulative_consistent_days if previous else 0) + (
+        1 if metrics.consistency_score and metrics.consistency_score > 0 else 0
+    )
+    total_diligence = (previous.cumulative_diligence_total if previous else 0.0) + (metrics.diligence_score or 0)
+    
+    metrics.cumulative_days = days
+    metrics.cumulative_consistent_days = consistent_days
+    metrics.cumulative_diligence_total = total_diligence
+    metrics.cumulative_consistency_rate = round((consistent_days / days) * 100, 1)
+    metrics.cumulative_diligence_rate = round(total_diligence / days, 1)
+    
+    if meets_threshold(metrics.overall_completion_pct, threshold):
+        metrics.consecutive_completion_streak = (previous.consecutive_completion_streak or 0) + 1 if previous else 1
+    else:
+        metrics.consecutive_completion_streak = 0
+
+
+def _refresh_cumulative(
+    db: Session,
+    challenge: Challenge,
+    from_date: date,
+    rescore: Iterable[date] = ()
+) -> List[DailyChallengeMetrics]:
+    """
+    Recompute cumulative rates and streaks for every day from from_date on,
+    carrying the running totals forward from the last day before it, after
+    rescoring the `rescore` days from their stored status. Logging today
+    touches just the previous day's row and today's. Falls back to the whole
+    challenge when the earlier day has no running totals yet (rows written
+    before they existed).
+
+    Returns:
+        The rows recomputed, in date order
+    """
+    previous = db.exec(
+        select(DailyChallengeMetrics)
+        .where(DailyChallengeMetrics.challenge_id == challenge.id)
+        .where(DailyChallengeMetrics.date < from_date)
+        .order_by(DailyChallengeMetrics.date.desc())
+        .limit(1)
+    ).first()
+    
+    statement = select(DailyChallengeMetrics).where(DailyChallengeMetrics.challenge_id == challenge.id)
+    if previous is not None and previous.cumulative_days is None:
+        previous = None
+    else:
+        statement = statement.where(DailyChallengeMetrics.date >= from_date)
+    
+    # The upserts wrote with Core, so don't trust rows already in the session
+    rows = db.exec(statement.order_by(DailyChallengeMetrics.date.asc()).execution_options(populate_existing=True)).all()
+    whole_challenge = previous is None
+    # A new day (no running totals yet) landing before an existing one can split a streak
+    splits_streak = False
+    existing_after = False
+    for m in reversed(rows):
+        if m.cumulative_days is not None:
+            existing_after = True
+        elif existing_after:
+            splits_streak = True
+    
+    rescore = set(rescore)
+    for m in rows:
+        if m.date in rescore:
+            _score_day_totals(challenge, m, m.commitments_status)
+        _carry_cumulative(previous, m, challenge.success_threshold)
+        db.add(m)
+        previous = m
+    
+    if splits_streak and not whole_challenge:
+        _store_streak_state(db, challenge.id, recompute_streak_state(db, challenge), exact=True)
+    elif rows:
+        _store_streak_state(db, challenge.id, _streak_state_of(rows, challenge.success_threshold), exact=whole_challenge)
+    return rows
+
+
+def _streak_state_of(rows: List[DailyChallengeMetrics], threshold: float) -> Tuple[int, int, Optional[date]]:
+    """(current, longest, last successful date) over carried rows in date order."""
+    return (
+        rows[-1].consecutive_completion_streak if rows else 0,
+        max((m.consecutive_completion_streak for m in rows), default=0),
+        max((m.date for m in rows if meets_threshold(m.overall_completion_pct, threshold)), default=None),
+    )
+
+
+def _store_streak_state(db: Session, challenge_id, state: Tuple[int, int, Optional[date]], exact: bool):
+    """
+    Write a challenge's streak state; a no-op statement when nothing changed.
+    With exact=False, `state` covers only the days from some date on: the
+    longest streak and last successful date can then only be raised, which is
+    all accrual can do to them.
+    """
+    current, longest, last_success = state
+    if exact:
+        values = {"current_streak": current, "longest_streak": longest, "last_success_date": last_success}
+        changed = [
+            Challenge.current_streak != current,
+            Challenge.longest_streak != longest,
+            Challenge.last_success_date.is_distinct_from(last_success),
+        ]
+    else:
+        values = {
+            "current_streak": current,
+            "longest_streak": case((Challenge.longest_streak < longest, longest), else_=Challenge.longest_streak),
+        }
+        changed = [Challenge.current_streak != current, Challenge.longest_streak < longest]
+        if last_success is not None:
+            values["last_success_date"] = case(
+                (or_(Challenge.last_success_date.is_(None), Challenge.last_success_date < last_success), last_success),
+                else_=Challenge.last_success_date,
+            )
+            changed += [Challenge.last_success_date.is_(None), Challenge.last_success_date < last_success]
+    db.exec(update(Challenge).where(Challenge.id == challenge_id).where(or_(*changed)).values(values))
+
+
+def recompute_streak_state(db: Session, challenge: Challenge) -> Tuple[int, int, Optional[date]]:
+    """(current, longest, last successful date) from all of the challenge's daily metrics."""
+    rows = db.exec(
+        select(DailyChallengeMetrics.date, DailyChallengeMetrics.overall_completion_pct)
+        .where(DailyChallengeMetrics.challenge_id == challenge.id)
+        .order_by(DailyChallengeMetrics.date.asc())
+    ).all()
+    return calculate_streak_state(rows, challenge.success_threshold)
+
+
+def get_streak_state(db: Session, challenge_id):
+    """
+    The challenge's stored streak state - one primary-key lookup, however long
+    the challenge. Row with current_streak, longest_streak and last_success_date,
+    or None if there's no such challenge.
+    """
+    return db.exec(
+        select(Challenge.current_streak, Challenge.longest_streak, Challenge.last_success_date)
+        .where(Challenge.id == challenge_id)
+    ).first()
+
+
+def verify_streak_state(db: Session, challenge: Challenge, repair: bool = False) -> Optional[dict]:
+    """
+    Cross-check the challenge's stored streak state against a full
+    recomputation from its daily metrics. With repair=True a mismatch is
+    overwritten with the recomputed state. Does not commit.
+
+    Returns:
+        None if they agree, else {"stored": (...), "expected": (...)}
+    """
+    stored = get_streak_state(db, challenge.id)
+    if stored is None:
+        return None
+    expected = recompute_streak_state(db, challenge)
+    if tuple(stored) == expected:
+        return None
+    if repair:
+        _store_streak_state(db, challenge.id, expected, exact=True)
+    return {"stored": tuple(stored), "expected": expected}
+
+
+# Columns a rebuild recomputes; notes, mood and energy level are the user's and are kept
+REBUILT_COLUMNS = [
+    "day_number",
+    "commitments_status",
+    "overall_completion_pct",
+    "consistency_score",
+    "diligence_score",
+    "cumulative_consistency_rate",
+    "cumulative_diligence_rate",
+    "consecutive_completion_streak",
+    "cumulative_days",
+    "cumulative_consistent_days",
+    "cumulative_diligence_total",
+    "updated_at",
+]
+
+
+def rebuild_challenge_metrics(db: Session, challenge: Challenge, days: Optional[Iterable[Optional[date]]] = None) -> int:
+    """
+    Recompute a challenge's daily metrics from the activity log: every day of
+    the challenge, or just `days` (plus the cumulative rates after them).
+
+    One query loads the activities, one the existing day rows; commitments are
+    attributed in memory, and all rewritten rows go out in a single upsert. The
+    result depends only on the log and the challenge: days with nothing that
+    counts lose their row, unless it holds notes, mood or energy, which are
+    kept with zeroed scores. The challenge's streak state is reset from the
+    result. Writes with Core statements, so metrics and challenge objects
+    already loaded in `db` are not refreshed. Does not commit.
+
+    Returns:
+        Number of day rows written
+    """
+    activities_statement = (
+        select(
+            LoggedActivity.activity_name,
+            LoggedActivity.start_time,
+            LoggedActivity.end_time,
+            LoggedActivity.effective_date,
+            Category.name.label("category_name"),
+        )
+        .outerjoin(Category, LoggedActivity.category_id == Category.id)
+        .where(LoggedActivity.user_id == challenge.user_id)
+        .order_by(LoggedActivity.id.asc())
+    )
+    if days is None:
+        activities_statement = activities_statement.where(
+            LoggedActivity.effective_date.between(challenge.start_date, challenge.end_date)
+        )
+    else:
+        days = sorted({d for d in days if d and challenge.start_date <= d <= challenge.end_date})
+        if not days:
+            return 0
+        activities_statement = activities_statement.where(LoggedActivity.effective_date.in_(days))
+    
+    if challenge.status == "active":
+        # Activities still queued for accrual (services/challenge_updates.py) are
+        # in the log, so this rebuild counts them; the lock keeps a drain out
+        lock_user_writes(db, challenge.user_id)
+        clear_statement = delete(PendingChallengeActivity).where(PendingChallengeActivity.user_id == challenge.user_id)
+        if days is not None:
+            clear_statement = clear_statement.where(PendingChallengeActivity.effective_date.in_(days))
+        db.exec(clear_statement)
+    
+    by_day: Dict[date, list] = defaultdict(list)
+    for activity in db.exec(activities_statement).all():
+        by_day[activity.effective_date].append(activity)
+    
+    # Detached copies of the stored rows, in date order, for the cumulative pass
+    metrics: Dict[date, DailyChallengeMetrics] = {
+        row.date: DailyChallengeMetrics(**row._mapping)
+        for row in db.exec(
+            select(*DailyChallengeMetrics.__table__.columns).where(DailyChallengeMetrics.challenge_id == challenge.id)
+        ).all()
+    }
+    
+    rebuilt_days = days if days is not None else sorted(set(by_day) | set(metrics))
+    matcher = get_commitment_matcher(challenge)
+    removed_ids = []
+    for day in rebuilt_days:
+        current_status: dict = {}
+        updated = False
+        for activity in by_day[day]:
+            updated = _accrue_activity(matcher, current_status, activity, activity.category_name) or updated
+        
+        m = metrics.get(day)
+        if not updated:
+            if m is None:
+                continue
+            if m.notes is None and m.mood is None and m.energy_level is None:
+                removed_ids.append(m.id)
+                del metrics[day]
+                continue
+        if m is None:
+            m = metrics[day] = DailyChallengeMetrics(challenge_id=challenge.id, date=day, day_number=0)
+        
+        m.overall_completion_pct = m.consistency_score = m.diligence_score = 0.0
+        if updated:
+            _score_day_totals(challenge, m, current_status)
+        else:
+            m.commitments_status = {}
+    
+    if removed_ids:
+        db.exec(delete(DailyChallengeMetrics).where(DailyChallengeMetrics.id.in_(removed_ids)))
+    
+    rows = []
+    previous = None
+    now = datetime.utcnow()
+    for day in sorted(metrics):
+        m = metrics[day]
+        _carry_cumulative(previous, m, challenge.success_threshold)
+        previous = m
+        if rebuilt_days and day >= rebuilt_days[0]:
+            m.day_number = (day - challenge.start_date).days + 1
+            m.updated_at = now
+            rows.append({column.name: getattr(m, column.name) for column in DailyChallengeMetrics.__table__.columns})
+    _store_streak_state(
+        db, challenge.id, _streak_state_of([metrics[day] for day in sorted(metrics)], challenge.success_threshold), exact=True
+    )
+    if not rows:
+        return 0
+    
+    insert = pg_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+    statement = insert(DailyChallengeMetrics.__table__).values(rows)
+    statement = statement.on_conflict_do_update(
+        index_elements=["challenge_id", "date"],
+        set_={column: statement.excluded[column] for column in REBUILT_COLUMNS},
+    )
+    db.exec(statement)
+    return len(rows)
+
+
+def recompute_challenge_days(db: Session, user_id: str, days: Iterable[Optional[date]]) -> int:
+    """
+    Rebuild the active challenge's metrics for `days` from the activity log, for
+    edits and deletes that accrual alone can't take back. Call before the edit's
+    commit: the metrics then commit with it, under the same data_version bump, so
+    no read can cache the old progress under the new ETag. Does not commit.
+
+    A failed rebuild is rolled back to a savepoint and leaves the edit itself intact.
+
+    Returns:
+        Number of day rows written
+    """
+    try:
+        challenge = get_active_challenge(db, user_id)
+        if not challenge:
+            return 0
+        with db.begin_nested():
+            return rebuild_challenge_metrics(db, challenge, days)
+    
+    except Exception as e:
+        print(f"ERROR in recompute_challenge_days: {e}")
+        return 0
+
+
 def calculate_duration_minutes(start_time: time, end_time: time) -> int:
     """Calculate duration in minutes, handling overnight activities."""
     if end_time < start_time:
@@ -0,0 +1,184 @@
+# services/challenge_updates.py
+"""
+Challenge Progress Updates
+Moves challenge accounting for newly logged activities off the request path.
+
+The activity create paths enqueue each activity in pending_challenge_activities
+(in their own transaction, no extra reads) and schedule a debounced update for
+its (user, effective_date). Once that day has gone CHALLENGE_UPDATE_DEBOUNCE_SECONDS
+without another log, one drain accrues everything queued for it, so a burst of
+QuickTap logs costs one metrics update instead of one per activity.
+
+Endpoints that show challenge progress call flush_challenge_updates() first,
+which drains whatever is still queued for the user - including rows queued by
+another worker - so users always see their own logs. A drain holds the user's
+write lock and deletes the rows it counts, so each activity is counted once
+however many workers race for it. Edits and deletes rebuild their days from the
+activity log, and the rebuild drops queued rows it already covers.
+"""
+
+import threading
+import time as clock
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import exists, insert
+from sqlmodel import Session, select, delete
+
+from models import Category, LoggedActivity, PendingChallengeActivity, UserSyncState
+from services.challenge_tracker import update_challenge_progress_bulk
+from services.change_tracker import lock_user_writes
+from services.reference_cache import get_active_challenge
+
+# Quiet period after the last log for a day before its metrics are updated
+CHALLENGE_UPDATE_DEBOUNCE_SECONDS = 2.0
+# Upper bound on the wait while logs for the day keep arriving
+CHALLENGE_UPDATE_MAX_DELAY_SECONDS = 10.0
+
+
+def enqueue_challenge_updates(db: Session, user_id: str, activities: List[LoggedActivity]) -> List[date]:
+    """
+    Queue new activities for challenge accounting, in the create's transaction.
+    Only activities inside the active challenge's window are queued.
+
+    Returns:
+        The days queued, to pass to schedule_challenge_updates() after commit
+    """
+    challenge = get_active_challenge(db, user_id)
+    if not challenge:
+        return []
+    activities = [
+        a for a in activities
+        if a.effective_date and challenge.start_date <= a.effective_date <= challenge.end_date
+    ]
+    if not activities:
+        return []
+    if any(a.id is None for a in activities):
+        db.flush()
+
+    queued_at = datetime.utcnow()
+    db.exec(insert(PendingChallengeActivity).values([
+        {"user_id": user_id, "activity_id": a.id, "effective_date": a.effective_date, "created_at": queued_at}
+        for a in activities
+    ]))
+    return sorted({a.effective_date for a in activities})
+
+
+def drain_challenge_updates(db: Session, user_id: str, days: Optional[Iterable[date]] = None) -> int:
+    """
+    Count the user's queued activities (all of them, or just those for `days`)
+    in their challenge metrics, and remove them from the queue. Commits.
+
+    Returns:
+        Number of activities counted
+    """
+    statement = select(PendingChallengeActivity.id).where(PendingChallengeActivity.user_id == user_id)
+    if days is not None:
+        statement = statement.where(PendingChallengeActivity.effective_date.in_(list(days)))
+    if db.exec(statement.limit(1)).first() is None:
+        return 0
+
+    # Creates enqueue under the same lock, so nothing is added until this commits
+    lock_user_writes(db, user_id)
+    activities_statement = (
+        select(
+            LoggedActivity.id,
+            LoggedActivity.activity_name,
+            LoggedActivity.start_time,
+            LoggedActivity.end_time,
+            LoggedActivity.effective_date,
+            Category.name.label("category_name"),
+        )
+        .join(PendingChallengeActivity, PendingChallengeActivity.activity_id == LoggedActivity.id)
+        .outerjoin(Category, LoggedActivity.category_id == Category.id)
+        .where(PendingChallengeActivity.user_id == user_id)
+        .order_by(LoggedActivity.id.asc())
+    )
+    clear_statement = delete(PendingChallengeActivity).where(PendingChallengeActivity.user_id == user_id)
+    if days is not None:
+        activities_statement = activities_statement.where(PendingChallengeActivity.effective_date.in_(list(days)))
+        clear_statement = clear_statement.where(PendingChallengeActivity.effective_date.in_(list(days)))
+    activities = db.exec(activities_statement).all()
+    db.exec(clear_statement)
+
+    # Commits; on failure it rolls back and the rows stay queued for the next drain
+    update_challenge_progress_bulk(db, user_id, [(activity, activity.category_name) for activity in activities])
+    return len(activities)
+
+
+# --- In-process debounce ---
+
+# (user_id, effective_date) -> {"first": monotonic time first scheduled, "deadline": ..., "timer": Timer}
+_scheduled: Dict[Tuple[str, date], dict] = {}
+_scheduled_lock = threading.Lock()
+
+
+def _start_timer(entry: dict, delay: float, bind, user_id: str, day: date):
+    timer = threading.Timer(delay, _on_timer, (bind, user_id, day))
+    timer.daemon = True
+    entry["timer"] = timer
+    timer.start()
+
+
+def _on_timer(bind, user_id: str, day: date):
+    key = (user_id, day)
+    with _scheduled_lock:
+        entry = _scheduled.get(key)
+        if entry is None:
+            return  # Drained by a read in the meantime
+        remaining = entry["deadline"] - clock.monotonic()
+        if remaining > 0:
+            _start_timer(entry, remaining, bind, user_id, day)
+            return
+        del _scheduled[key]
+
+    try:
+        with Session(bind) as session:
+            drain_challenge_updates(session, user_id, [day])
+    except Exception as e:
+        # The rows stay queued; the next read or log for the user picks them up
+        print(f"ERROR in challenge update for {user_id} on {day}: {e}")
+
+
+def schedule_challenge_updates(db: Session, user_id: str, days: List[date]):
+    """
+    Debounce a drain of each of `days` for the user. Call after the create has
+    committed; a log for a day that is already scheduled just pushes it back.
+    """
+    now = clock.monotonic()
+    with _scheduled_lock:
+        for day in days:
+            entry = _scheduled.get((user_id, day))
+            if entry is not None:
+                entry["deadline"] = min(now + CHALLENGE_UPDATE_DEBOUNCE_SECONDS, entry["first"] + CHALLENGE_UPDATE_MAX_DELAY_SECONDS)
+                continue
+            entry = _scheduled[(user_id, day)] = {"first": now, "deadline": now + CHALLENGE_UPDATE_DEBOUNCE_SECONDS}
+            _start_timer(entry, CHALLENGE_UPDATE_DEBOUNCE_SECONDS, db.get_bind(), user_id, day)
+
+
+def cancel_scheduled_updates(user_id: str, days: Optional[Iterable[date]] = None):
+    """Drop this worker's pending timers for the user (all days, or just `days`)."""
+    days = None if days is None else set(days)
+    with _scheduled_lock:
+        for key in [key for key in _scheduled if key[0] == user_id and (days is None or key[1] in days)]:
+            _scheduled.pop(key)["timer"].cancel()
+
+
+def flush_challenge_updates(db: Session, user_id: str) -> int:
+    """
+    Bring the user's challenge metrics up to date with everything they have
+    logged, before an endpoint reads them. Commits if anything was queued.
+
+    The queue check rides on the user's version lookup, which is kept for
+    conditional_get, so a read with nothing queued costs no extra round trip.
+    """
+    cancel_scheduled_updates(user_id)
+    pending = exists().where(PendingChallengeActivity.user_id == user_id)
+    row = db.exec(
+        select(UserSyncState.data_version, UserSyncState.day_version, pending).where(UserSyncState.user_id == user_id)
+    ).first()
+    # Draining locks the row but never bumps the versions, so these stay valid
+    db.info[("data_version", user_id)] = row[0] if row else 0
+    db.info[("day_version", user_id)] = row[1] if row else 0
+    if row is None or not row[2]:
+        return 0
+    return drain_challenge_updates(db, user_id)
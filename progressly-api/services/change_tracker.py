@@ -0,0 +1,211 @@
+# services/change_tracker.py
+"""
+Change Tracker Service
+Maintains the per-user change sequence used for delta sync, and the per-user
+data version used for ETags on read endpoints.
+
+Every activity write stamps the row with the user's next sequence number;
+deletes leave a tombstone carrying one. A client that remembers the highest
+number it has seen can then ask for just the rows changed after it.
+"""
+
+from datetime import datetime
+from typing import List, Optional, Tuple
+from sqlmodel import Session, select
+from sqlalchemy import insert, update
+from sqlalchemy.exc import IntegrityError
+
+from models import UserSyncState, ActivityTombstone, LoggedActivity
+
+
+def _get_sync_state(db: Session, user_id: str, for_update: bool = False) -> Optional[UserSyncState]:
+    statement = select(UserSyncState).where(UserSyncState.user_id == user_id)
+    if for_update:
+        # Row lock serializes concurrent writers for the same user until commit,
+        # so sequence numbers become visible in the order they were handed out
+        statement = statement.with_for_update()
+    return db.exec(statement).first()
+
+
+def _lock_sync_state(db: Session, user_id: str) -> UserSyncState:
+    """Return the user's sync state row, locked for update, creating it if needed."""
+    state = _get_sync_state(db, user_id, for_update=True)
+
+    if state is None:
+        try:
+            with db.begin_nested():
+                state = UserSyncState(
+                    user_id=user_id, change_seq=0, data_version=0, day_version=0, reference_version=0
+                )
+                db.add(state)
+        except IntegrityError:
+            # Another request created the row first - lock and use theirs
+            state = _get_sync_state(db, user_id, for_update=True)
+
+    # The row stays locked until commit, so its reference version is the one
+    # this request sees (lets the activity write path skip a version lookup)
+    db.info[("reference_version", user_id)] = state.reference_version
+    db.info.pop(("data_version", user_id), None)
+    db.info.pop(("day_version", user_id), None)
+    return state
+
+
+def lock_user_writes(db: Session, user_id: str):
+    """
+    Take the user's write lock (their sync state row) until commit, without
+    bumping anything. Serializes with every activity write for the user.
+    """
+    _lock_sync_state(db, user_id)
+
+
+def next_change_seq(db: Session, user_id: str) -> int:
+    """
+    Reserve and return the user's next change sequence number.
+    Also bumps the data version, since every activity write changes user data.
+    The caller's transaction owns the increment; it is only durable on commit.
+    """
+    state = _lock_sync_state(db, user_id)
+    state.change_seq += 1
+    state.data_version += 1
+    db.add(state)
+    db.flush()
+    return state.change_seq
+
+
+def bump_data_version(db: Session, user_id: str) -> int:
+    """
+    Mark the user's data as changed, invalidating ETags on every read endpoint.
+    Call from any write path before its commit.
+    """
+    state = _lock_sync_state(db, user_id)
+    state.data_version += 1
+    db.add(state)
+    db.flush()
+    return state.data_version
+
+
+def bump_day_version(db: Session, user_id: str) -> int:
+    """
+    Mark the user's current psychological day as possibly changed.
+    Invalidates cached effective dates in every worker (see effective_date.py).
+    """
+    state = _lock_sync_state(db, user_id)
+    state.day_version += 1
+    state.data_version += 1
+    db.add(state)
+    db.flush()
+    return state.day_version
+
+
+def get_day_version(db: Session, user_id: str) -> int:
+    """Return the user's current day version (0 if never bumped)."""
+    statement = select(UserSyncState.day_version).where(UserSyncState.user_id == user_id)
+    return db.exec(statement).first() or 0
+
+
+def bump_reference_version(db: Session, user_id: str) -> int:
+    """
+    Mark the user's reference data (categories, goals, targets, challenges) as
+    changed. Invalidates the reference-data cache in every worker and bumps the
+    data version too.
+    """
+    state = _lock_sync_state(db, user_id)
+    state.reference_version += 1
+    state.data_version += 1
+    db.add(state)
+    db.flush()
+    db.info[("reference_version", user_id)] = state.reference_version
+    return state.reference_version
+
+
+def get_reference_version(db: Session, user_id: str) -> int:
+    """
+    Return the user's reference version, without a query if this session
+    already holds the user's sync state row.
+    """
+    version = db.info.get(("reference_version", user_id))
+    if version is not None:
+        return version
+    statement = select(UserSyncState.reference_version).where(UserSyncState.user_id == user_id)
+    version = db.exec(statement).first() or 0
+    db.info[("reference_version", user_id)] = version
+    return version
+
+
+def get_data_version(db: Session, user_id: str) -> int:
+    """
+    Return the user's current data version (0 if they have never written),
+    without a query if this session has already read or bumped it.
+    """
+    version = db.info.get(("data_version", user_id))
+    if version is not None:
+        return version
+    statement = select(UserSyncState.data_version).where(UserSyncState.user_id == user_id)
+    version = db.exec(statement).first() or 0
+    db.info[("data_version", user_id)] = version
+    return version
+
+
+def get_data_and_day_version(db: Session, user_id: str) -> Tuple[int, int]:
+    """
+    Return the user's (data_version, day_version) in one lookup, for ETags that
+    depend on both. No query if this session has already read both.
+    """
+    cached = (db.info.get(("data_version", user_id)), db.info.get(("day_version", user_id)))
+    if None not in cached:
+        return cached
+    row = db.exec(
+        select(UserSyncState.data_version, UserSyncState.day_version).where(UserSyncState.user_id == user_id)
+    ).first()
+    data_version, day_version = tuple(row) if row else (0, 0)
+    db.info[("data_version", user_id)] = data_version
+    db.info[("day_version", user_id)] = day_version
+    return data_version, day_version
+
+
+def record_activity_tombstone(db: Session, activity: LoggedActivity) -> ActivityTombstone:
+    """Add a tombstone for an activity that is being deleted (not committed here)."""
+    tombstone = ActivityTombstone(
+        user_id=activity.user_id,
+        activity_id=activity.id,
+        change_seq=next_change_seq(db, activity.user_id),
+    )
+    db.add(tombstone)
+    return tombstone
+
+
+def record_activity_tombstones(db: Session, user_id: str, activity_ids: List[int]) -> Optional[int]:
+    """
+    Tombstone a batch of activities being deleted, all under one fresh sequence
+    number, in one multi-row INSERT (not committed here). Returns the number
+    used, or None if there was nothing to record.
+    """
+    if not activity_ids:
+        return None
+
+    seq = next_change_seq(db, user_id)
+    deleted_at = datetime.utcnow()
+    db.exec(insert(ActivityTombstone).values([
+        {"user_id": user_id, "activity_id": activity_id, "change_seq": seq, "deleted_at": deleted_at}
+        for activity_id in activity_ids
+    ]))
+    return seq
+
+
+def touch_activities(db: Session, user_id: str, activity_ids: List[int], **values) -> Optional[int]:
+    """
+    Apply `values` to a set of activities and stamp them with one fresh sequence
+    number, e.g. when a category delete detaches them. Returns the number used,
+    or None if there was nothing to touch.
+    """
+    if not activity_ids:
+        return None
+
+    seq = next_change_seq(db, user_id)
+    db.exec(
+        update(LoggedActivity)
+        .where(LoggedActivity.user_id == user_id)
+        .where(LoggedActivity.id.in_(activity_ids))
+        .values(change_seq=seq, **values)
+    )
+    return seq
@@ -0,0 +1,107 @@
+# services/commitment_matcher.py
+"""
+Commitment Matcher
+Decides which of a challenge's commitments an activity counts towards: those
+whose category equals the activity's category name, or whose habit occurs in
+the activity name (both case-insensitive).
+
+A challenge's commitments are compiled once into a category-name map plus an
+Aho-Corasick automaton over the habit names, so matching an activity costs
+O(len(activity name)) however many commitments there are. Compiled matchers
+are cached per challenge and keyed by its updated_at, which update_challenge
+bumps (it also drops the entry outright).
+"""
+
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+
+from models import Challenge
+
+
+class CommitmentMatcher:
+    """
+    Compiled form of a commitments list. Read-only once built, so one instance
+    is shared by every request for the challenge.
+    """
+
+    def __init__(self, commitments: List[dict]):
+        # Commitments without an id can't record progress and never match
+        self.commitments = [c for c in commitments or [] if c.get("id")]
+        self.by_category: Dict[str, List[int]] = {}
+        for index, comm in enumerate(self.commitments):
+            if comm.get("category"):
+                self.by_category.setdefault(comm["category"].lower(), []).append(index)
+        self._build_automaton()
+
+    def _build_automaton(self):
+        # Trie over the lower-cased habit names; state 0 is the root
+        self.goto: List[Dict[str, int]] = [{}]
+        self.output: List[List[int]] = [[]]
+        for index, comm in enumerate(self.commitments):
+            habit = comm.get("habit")
+            if not habit:
+                continue
+            state = 0
+            for char in habit.lower():
+                next_state = self.goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto[state][char] = next_state
+                    self.goto.append({})
+                    self.output.append([])
+                state = next_state
+            self.output[state].append(index)
+
+        # Failure links, breadth first; each state also inherits the outputs of
+        # its failure state, so a match never has to walk the failure chain
+        self.fail = [0] * len(self.goto)
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(char, 0)
+                self.output[next_state] = self.output[next_state] + self.output[self.fail[next_state]]
+
+    def match(self, activity_name: Optional[str], category_name: Optional[str]) -> List[dict]:
+        """The commitments the activity counts towards, in commitment order."""
+        matched = set(self.by_category.get(category_name.lower(), ())) if category_name else set()
+        if activity_name and len(self.goto) > 1:
+            goto, fail, output = self.goto, self.fail, self.output
+            state = 0
+            for char in activity_name.lower():
+                while state and char not in goto[state]:
+                    state = fail[state]
+                state = goto[state].get(char, 0)
+                if output[state]:
+                    matched.update(output[state])
+        return [self.commitments[index] for index in sorted(matched)]
+
+
+# challenge id -> (updated_at the matcher was compiled for, matcher)
+_matchers: Dict[UUID, Tuple[Optional[datetime], CommitmentMatcher]] = {}
+_matchers_lock = threading.Lock()
+
+
+def get_commitment_matcher(challenge: Challenge) -> CommitmentMatcher:
+    """The compiled matcher for the challenge's current commitments."""
+    cached = _matchers.get(challenge.id)
+    if cached is not None and cached[0] == challenge.updated_at:
+        return cached[1]
+    matcher = CommitmentMatcher(challenge.commitments)
+    if challenge.id is not None:
+        with _matchers_lock:
+            _matchers[challenge.id] = (challenge.updated_at, matcher)
+    return matcher
+
+
+def invalidate_commitment_matcher(challenge_id: UUID):
+    """Drop a challenge's compiled matcher, e.g. after its commitments change."""
+    with _matchers_lock:
+        _matchers.pop(challenge_id, None)
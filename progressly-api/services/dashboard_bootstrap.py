@@ -0,0 +1,159 @@
+# services/dashboard_bootstrap.py
+"""
+Dashboard Bootstrap Loader
+Fetches everything the dashboard needs besides the activity list in ONE statement.
+
+Against a remote Postgres each round trip costs tens of milliseconds, so the
+categories, last end time, End-Day session, last night's wake-up, the user's day
+version and candidate pie chart rows are read as a single UNION ALL. Each branch is tagged with a `kind`
+and fills a shared set of typed columns; load_bootstrap_context() splits the
+rows back out.
+"""
+
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List, Optional, Tuple
+from sqlmodel import Session, SQLModel, select
+from sqlalchemy import Date, DateTime, Integer, String, Time, cast, func, literal, null, or_, type_coerce, union_all
+
+from models import Category, DailyCategoryRollup, LoggedActivity, UserSession, UserSyncState
+from effective_date import night_sleep_conditions
+
+
+class BootstrapContext(SQLModel):
+    categories: List[Category] = []
+    last_end_time: Optional[time] = None
+    # (id, current_effective_date, ended_at) of the user's End-Day session, if any
+    session: Optional[Tuple[int, date, datetime]] = None
+    # Id of the user's Sleep category, if any
+    sleep_category_id: Optional[int] = None
+    # Wake-up times (end_at) of night sleeps that started yesterday and ended today
+    sleep_wake_ups: List[datetime] = []
+    # Validates the cached current effective date (see effective_date.py)
+    day_version: int = 0
+    # effective_date -> [(category_id, total_minutes)] for the candidate current days
+    day_totals: Dict[date, List[Tuple[int, int]]] = {}
+
+
+# Shared column layout of every UNION ALL branch
+_COLUMNS = [
+    ("kind", String),
+    ("id", Integer),
+    ("ref_id", Integer),
+    ("name", String),
+    ("color", String),
+    ("day", Date),
+    ("start", Time),
+    ("end", Time),
+    ("at", DateTime),
+    ("minutes", Integer),
+]
+
+
+def _branch(kind: str, **columns):
+    """Build the select-list for one branch, padding unused columns with typed NULLs."""
+    selected = []
+    for name, type_ in _COLUMNS:
+        if name == "kind":
+            selected.append(literal(kind, String).label(name))
+        elif name in columns:
+            # type_coerce, not CAST: SQLite would turn CAST('07:00:00' AS TIME) into 7
+            selected.append(type_coerce(columns[name], type_).label(name))
+        else:
+            # Typed NULL so Postgres can resolve the UNION column types
+            selected.append(cast(null(), type_).label(name))
+    return selected
+
+
+def bootstrap_context_statement(user_id: str, today: date):
+    """The single UNION ALL statement behind load_bootstrap_context()."""
+    yesterday = today - timedelta(days=1)
+
+    session_date = (
+        select(UserSession.current_effective_date)
+        .where(UserSession.user_id == user_id)
+        .scalar_subquery()
+    )
+    sleep_category_ids = (
+        select(Category.id)
+        .where(Category.user_id == user_id)
+        .where(func.lower(Category.name) == "sleep")
+    )
+    last_end_time = (
+        select(LoggedActivity.end_time)
+        .where(LoggedActivity.user_id == user_id)
+        .order_by(LoggedActivity.activity_date.desc(), LoggedActivity.start_time.desc())
+        .limit(1)
+        .scalar_subquery()
+    )
+
+    categories = select(*_branch(
+        "category", id=Category.id, name=Category.name, color=Category.color
+    )).where(Category.user_id == user_id)
+
+    last_end = select(*_branch("last_end", end=last_end_time))
+
+    session = select(*_branch(
+        "session", id=UserSession.id, day=UserSession.current_effective_date, at=UserSession.ended_at
+    )).where(UserSession.user_id == user_id)
+
+    day_version = select(*_branch("day_version", minutes=UserSyncState.day_version)).where(
+        UserSyncState.user_id == user_id
+    )
+
+    # Night sleeps that started yesterday and ended today, filtered in SQL on
+    # the persisted interval columns
+    sleeps = select(*_branch(
+        "sleep",
+        id=LoggedActivity.id,
+        ref_id=LoggedActivity.category_id,
+        at=LoggedActivity.end_at,
+    )).where(
+        LoggedActivity.user_id == user_id,
+        LoggedActivity.category_id.in_(sleep_category_ids),
+        *night_sleep_conditions(today),
+    )
+
+    # Pie chart rows for every day that can turn out to be the current one
+    rollups = select(*_branch(
+        "rollup",
+        ref_id=DailyCategoryRollup.category_id,
+        day=DailyCategoryRollup.effective_date,
+        minutes=DailyCategoryRollup.total_minutes,
+    )).where(
+        DailyCategoryRollup.user_id == user_id,
+        DailyCategoryRollup.total_minutes > 0,
+        or_(
+            DailyCategoryRollup.effective_date.in_([today, yesterday]),
+            DailyCategoryRollup.effective_date == session_date,
+        ),
+    )
+
+    return union_all(categories, last_end, session, day_version, sleeps, rollups)
+
+
+def load_bootstrap_context(db: Session, user_id: str, today: date) -> BootstrapContext:
+    """Run the bootstrap context statement (one round trip) and split its rows by kind."""
+    context = BootstrapContext(categories=[], sleep_wake_ups=[], day_totals={})
+    sleep_rows = []
+
+    for row in db.exec(bootstrap_context_statement(user_id, today)).all():
+        if row.kind == "category":
+            context.categories.append(Category(id=row.id, name=row.name, color=row.color, user_id=user_id))
+        elif row.kind == "last_end":
+            context.last_end_time = row.end
+        elif row.kind == "session":
+            context.session = (row.id, row.day, row.at)
+        elif row.kind == "day_version":
+            context.day_version = row.minutes
+        elif row.kind == "sleep":
+            sleep_rows.append(row)
+        elif row.kind == "rollup":
+            context.day_totals.setdefault(row.day, []).append((row.ref_id, row.minutes))
+
+    # Same pick as Category.name.ilike("sleep").first()
+    sleep_category = next((c for c in context.categories if c.name.lower() == "sleep"), None)
+    if sleep_category:
+        context.sleep_category_id = sleep_category.id
+        context.sleep_wake_ups = [row.at for row in sleep_rows if row.ref_id == sleep_category.id]
+
+    return context
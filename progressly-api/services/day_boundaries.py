@@ -0,0 +1,190 @@
+# services/day_boundaries.py
+"""
+Day Boundary Service
+Maintains day_boundaries: where each wake-up-to-wake-up day starts and ends.
+
+A day starts when the user pressed End My Day for it, else at the latest
+wake-up of a night sleep that crossed into it, else at midnight; it ends where
+the next day starts. Sleep activity writes and /api/end-day refresh the
+affected rows inside their own transaction, so readers look up a couple of
+rows instead of re-deriving boundaries from raw sleeps.
+"""
+
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlmodel import Session, select
+from sqlalchemy import delete, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from models import Category, DayBoundary, LoggedActivity, activity_interval
+from effective_date import night_sleep_conditions, night_wake_ups, wake_up_days
+from services.reference_cache import get_sleep_category_id
+
+SOURCE_SLEEP = "sleep"
+SOURCE_MANUAL = "manual_end_day"
+SOURCE_DEFAULT = "default"
+
+# day -> (start_at, source) for days whose start isn't plain midnight
+DayStarts = Dict[date, Tuple[datetime, str]]
+
+
+def _midnight(day: date) -> datetime:
+    return datetime.combine(day, time(0, 0))
+
+
+def _load_starts(db: Session, user_id: str, from_date: date, to_date: date) -> DayStarts:
+    statement = (
+        select(DayBoundary.effective_date, DayBoundary.start_at, DayBoundary.source)
+        .where(DayBoundary.user_id == user_id)
+        .where(DayBoundary.effective_date >= from_date)
+        .where(DayBoundary.effective_date <= to_date)
+    )
+    return {
+        row.effective_date: (row.start_at, row.source)
+        for row in db.exec(statement).all()
+        if row.source != SOURCE_DEFAULT
+    }
+
+
+def _write_days(db: Session, user_id: str, starts: DayStarts, days: Iterable[date]):
+    """Upsert the rows for `days`, each ending where the next day starts."""
+    table = DayBoundary.__table__
+    insert = pg_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+
+    for day in days:
+        start_at, source = starts.get(day, (_midnight(day), SOURCE_DEFAULT))
+        end_at = starts.get(day + timedelta(days=1), (_midnight(day + timedelta(days=1)),))[0]
+        statement = insert(table).values(
+            user_id=user_id,
+            effective_date=day,
+            start_at=start_at,
+            end_at=max(end_at, start_at),
+            source=source,
+        )
+        statement = statement.on_conflict_do_update(
+            index_elements=["user_id", "effective_date"],
+            set_={
+                "start_at": statement.excluded.start_at,
+                "end_at": statement.excluded.end_at,
+                "source": statement.excluded.source,
+            },
+        )
+        db.exec(statement)
+
+
+def sleep_wake_day(db: Session, activity: LoggedActivity) -> Optional[date]:
+    """
+    The day whose start this activity sets, if it is a night sleep that crossed
+    midnight; otherwise None. Uses the activity's current (unflushed) fields.
+    """
+    if activity.category_id is None or activity.category_id != get_sleep_category_id(db, activity.user_id):
+        return None
+    start_at, end_at, _ = activity_interval(activity.activity_date, activity.start_time, activity.end_time)
+    woke_on = end_at.date()
+    return woke_on if start_at.date() == woke_on - timedelta(days=1) else None
+
+
+def refresh_day_boundaries(db: Session, user_id: str, days: Iterable[Optional[date]]):
+    """
+    Re-derive the start of each day in `days` from the user's sleeps (End My Day
+    starts are kept) and rewrite that day's row and the previous day's.
+    Call after a sleep write with the sleep_wake_day() of its old and new
+    state, in the same transaction. Does not commit.
+    """
+    days = sorted({day for day in days if day is not None})
+    if not days:
+        return
+
+    db.flush()  # The sleep query below must see this request's writes
+    sleep_category_id = get_sleep_category_id(db, user_id)
+
+    for day in days:
+        starts = _load_starts(db, user_id, day - timedelta(days=1), day + timedelta(days=1))
+        if starts.get(day, (None, None))[1] != SOURCE_MANUAL:
+            wake_up = None
+            if sleep_category_id:
+                wake_up = db.exec(
+                    select(func.max(LoggedActivity.end_at))
+                    .where(LoggedActivity.user_id == user_id)
+                    .where(LoggedActivity.category_id == sleep_category_id)
+                    .where(*night_sleep_conditions(day))
+                ).first()
+            if wake_up:
+                starts[day] = (wake_up, SOURCE_SLEEP)
+            else:
+                starts.pop(day, None)
+        _write_days(db, user_id, starts, [day - timedelta(days=1), day])
+
+
+def set_manual_day_start(db: Session, user_id: str, day: date, start_at: datetime):
+    """Record that the user started `day` at start_at via End My Day. Does not commit."""
+    starts = _load_starts(db, user_id, day - timedelta(days=1), day + timedelta(days=1))
+    starts[day] = (start_at, SOURCE_MANUAL)
+    _write_days(db, user_id, starts, [day - timedelta(days=1), day])
+
+
+def load_day_boundaries(db: Session, user_id: str, from_date: date, to_date: date) -> List[Tuple[date, datetime, datetime]]:
+    """
+    (day, start, end) for every day in [from_date, to_date] - one indexed query.
+    Consecutive days tile the timeline (see effective_date.wake_up_days).
+    """
+    starts = _load_starts(db, user_id, from_date, to_date + timedelta(days=1))
+    return wake_up_days({day: start for day, (start, _) in starts.items()}, from_date, to_date)
+
+
+def rebuild_day_boundaries(db: Session, user_id: Optional[str] = None) -> int:
+    """
+    Recompute day_boundaries from the activity log, for one user or everyone,
+    keeping End My Day starts. Used for the initial backfill and as a repair
+    tool (e.g. after the Sleep category is renamed). Does not commit.
+
+    Returns:
+        Number of rows written
+    """
+    manual_statement = select(DayBoundary.user_id, DayBoundary.effective_date, DayBoundary.start_at).where(
+        DayBoundary.source == SOURCE_MANUAL
+    )
+    # Each user's Sleep category: the first (by id) named "sleep", as in reference_cache
+    categories_statement = (
+        select(Category.user_id, Category.id)
+        .where(func.lower(Category.name) == "sleep")
+        .order_by(Category.id)
+    )
+    clear_statement = delete(DayBoundary)
+    if user_id is not None:
+        manual_statement = manual_statement.where(DayBoundary.user_id == user_id)
+        categories_statement = categories_statement.where(Category.user_id == user_id)
+        clear_statement = clear_statement.where(DayBoundary.user_id == user_id)
+
+    sleep_categories: Dict[str, int] = {}
+    for row in db.exec(categories_statement).all():
+        sleep_categories.setdefault(row.user_id, row.id)
+
+    sleeps: Dict[str, List[Tuple[datetime, datetime]]] = defaultdict(list)
+    if sleep_categories:
+        sleeps_statement = (
+            select(LoggedActivity.user_id, LoggedActivity.category_id, LoggedActivity.start_at, LoggedActivity.end_at)
+            .where(LoggedActivity.category_id.in_(list(sleep_categories.values())))
+            .where(LoggedActivity.start_at.is_not(None))
+        )
+        for row in db.exec(sleeps_statement.execution_options(yield_per=1000)):
+            if sleep_categories.get(row.user_id) == row.category_id:
+                sleeps[row.user_id].append((row.start_at, row.end_at))
+
+    starts: Dict[str, DayStarts] = defaultdict(dict)
+    for owner, owner_sleeps in sleeps.items():
+        for day, wake_up in night_wake_ups(owner_sleeps).items():
+            starts[owner][day] = (wake_up, SOURCE_SLEEP)
+    for row in db.exec(manual_statement).all():
+        starts[row.user_id][row.effective_date] = (row.start_at, SOURCE_MANUAL)
+
+    db.exec(clear_statement)
+    rows_written = 0
+    for owner, owner_starts in starts.items():
+        days = sorted(set(owner_starts) | {day - timedelta(days=1) for day in owner_starts})
+        _write_days(db, owner, owner_starts, days)
+        rows_written += len(days)
+    db.flush()
+    return rows_written
@@ -0,0 +1,120 @@
+# services/reference_cache.py
+"""
+Reference Data Cache
+Per-user cache of slowly changing reference data: categories, goals, daily
+targets and the active challenge.
+
+These are read on nearly every request (every activity write resolves its
+category and the active challenge) but change only when the user edits them.
+Each user's entry is tagged with user_sync_state.reference_version; the
+categories, goals, targets and challenges write paths bump it through
+invalidate_reference_data(), so an edit handled by one worker invalidates the
+entry in every worker. Sections are loaded lazily on first use.
+
+Cached objects are detached snapshots shared between requests: treat them as
+read-only and never add them to a session.
+"""
+
+import threading
+from typing import Any, Callable, Dict, List, Optional
+from sqlmodel import Session, select
+
+from models import Category, Challenge, DailyTarget, Goal
+from services.change_tracker import bump_reference_version, get_reference_version
+
+# user_id -> {"version": int, <section>: value}
+_cache: Dict[str, Dict[str, Any]] = {}
+_cache_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+
+def _snapshot(obj):
+    """Detached copy of a table model, safe to share across sessions."""
+    return type(obj)(**obj.model_dump())
+
+
+def _section(db: Session, user_id: str, name: str, loader: Callable[[], Any]) -> Any:
+    version = get_reference_version(db, user_id)
+
+    entry = _cache.get(user_id)
+    if entry is not None and entry["version"] == version and name in entry:
+        _stats["hits"] += 1
+        return entry[name]
+
+    _stats["misses"] += 1
+    value = loader()
+    with _cache_lock:
+        entry = _cache.get(user_id)
+        if entry is None or entry["version"] < version:
+            entry = _cache[user_id] = {"version": version}
+        if entry["version"] == version:
+            entry[name] = value
+    return value
+
+
+def get_categories(db: Session, user_id: str) -> List[Category]:
+    """The user's categories, in id order."""
+    def load():
+        statement = select(Category).where(Category.user_id == user_id).order_by(Category.id)
+        return [_snapshot(c) for c in db.exec(statement).all()]
+    return _section(db, user_id, "categories", load)
+
+
+def get_category(db: Session, user_id: str, category_id: Optional[int]) -> Optional[Category]:
+    """One of the user's categories by id, or None."""
+    if category_id is None:
+        return None
+    return next((c for c in get_categories(db, user_id) if c.id == category_id), None)
+
+
+def get_sleep_category_id(db: Session, user_id: str) -> Optional[int]:
+    """Id of the user's Sleep category (case-insensitive name match), or None."""
+    return next((c.id for c in get_categories(db, user_id) if c.name.lower() == "sleep"), None)
+
+
+def get_goals(db: Session, user_id: str) -> List[Goal]:
+    def load():
+        return [_snapshot(g) for g in db.exec(select(Goal).where(Goal.user_id == user_id)).all()]
+    return _section(db, user_id, "goals", load)
+
+
+def get_daily_targets(db: Session, user_id: str) -> List[DailyTarget]:
+    def load():
+        return [_snapshot(t) for t in db.exec(select(DailyTarget).where(DailyTarget.user_id == user_id)).all()]
+    return _section(db, user_id, "targets", load)
+
+
+def get_active_challenge(db: Session, user_id: str) -> Optional[Challenge]:
+    """The user's latest active challenge, or None."""
+    def load():
+        statement = (
+            select(Challenge)
+            .where(Challenge.user_id == user_id)
+            .where(Challenge.status == "active")
+            .order_by(Challenge.created_at.desc())
+        )
+        challenge = db.exec(statement).first()
+        return _snapshot(challenge) if challenge else None
+    return _section(db, user_id, "active_challenge", load)
+
+
+def invalidate_reference_data(db: Session, user_id: str):
+    """
+    Drop the user's cached reference data, here and (via reference_version) in
+    every other worker. Call before commit from any category, goal, target or
+    challenge write. Also bumps the data version used for ETags.
+    """
+    bump_reference_version(db, user_id)
+    with _cache_lock:
+        _cache.pop(user_id, None)
+    _stats["invalidations"] += 1
+
+
+def reference_cache_stats() -> Dict[str, Any]:
+    """Hit/miss counters for this worker since start-up."""
+    lookups = _stats["hits"] + _stats["misses"]
+    return {
+        **_stats,
+        "hit_rate": round(_stats["hits"] / lookups, 3) if lookups else None,
+        "cached_users": len(_cache),
+    }
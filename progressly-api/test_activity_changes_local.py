@@ -0,0 +1,123 @@
+from datetime import date
+
+from fastapi.testclient import TestClient
+from sqlmodel import Session, SQLModel, create_engine, select
+from sqlmodel.pool import StaticPool
+import sys
+import os
+
+# Add current directory to sys.path to ensure imports work
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from main import app
+from database import get_session
+from dependencies import get_db_session, get_current_user
+from models import Category, LoggedActivity
+
+# Setup in-memory SQLite
+engine = create_engine(
+    "sqlite://",
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool
+)
+SQLModel.metadata.create_all(engine)
+
+USER_ID = "delta-sync-user"
+
+def get_session_override():
+    with Session(engine) as session:
+        yield session
+
+def get_current_user_override():
+    return USER_ID
+
+def item(name, start="09:00:00", end="10:00:00"):
+    return {"activity_name": name, "start_time": start, "end_time": end,
+            "category_id": None, "target_date": date.today().isoformat()}
+
+def replay(client, limit):
+    """Sync from scratch `limit` changes at a time, as a client would."""
+    known, since, calls = {}, 0, 0
+    while True:
+        body = client.get(f"/api/activities/changes?since={since}&limit={limit}").json()
+        calls += 1
+        for activity in body["changed"]:
+            known[activity["id"]] = activity["activity_name"]
+        for activity_id in body["deleted_ids"]:
+            known.pop(activity_id, None)
+        assert body["sync_token"] >= since
+        since = body["sync_token"]
+        if not body["has_more"]:
+            return known, since, calls
+
+def test_activity_changes():
+    print("Testing Activity Delta Sync...")
+    previous_overrides = dict(app.dependency_overrides)
+    app.dependency_overrides[get_db_session] = get_session_override
+    app.dependency_overrides[get_session] = get_session_override
+    app.dependency_overrides[get_current_user] = get_current_user_override
+    client = TestClient(app)
+
+    try:
+        with Session(engine) as session:
+            reading = Category(user_id=USER_ID, name="Reading", color="#FFFFFF")
+            session.add(reading)
+            session.commit()
+            reading_id = reading.id
+
+        ids = [client.post("/api/activities", json=item(name)).json()["id"] for name in ["Read", "Run", "Cook"]]
+        body = client.get("/api/activities/changes?since=0").json()
+        assert [a["id"] for a in body["changed"]] == ids
+        assert body["deleted_ids"] == [] and body["has_more"] is False
+        first_token = body["sync_token"]
+
+        # Nothing new: the token stays put
+        body = client.get(f"/api/activities/changes?since={first_token}").json()
+        assert body == {"changed": [], "deleted_ids": [], "sync_token": first_token, "has_more": False}
+
+        # An edit comes back as a change, a delete as a tombstone id
+        response = client.put(f"/api/activities/{ids[0]}", json={**item("Read more"), "category_id": reading_id})
+        assert response.status_code == 200
+        assert client.delete(f"/api/activities/{ids[1]}").status_code == 200
+        body = client.get(f"/api/activities/changes?since={first_token}").json()
+        assert [(a["id"], a["activity_name"]) for a in body["changed"]] == [(ids[0], "Read more")]
+        assert body["deleted_ids"] == [ids[1]]
+        delete_token = body["sync_token"]
+
+        # A bulk create stamps five rows with one sequence number
+        bulk = client.post("/api/activities/bulk", json={"activities": [item(f"Batch {i}") for i in range(5)]}).json()
+        bulk_ids = [r["activity"]["id"] for r in bulk["results"]]
+        last_id = client.post("/api/activities", json=item("Last")).json()["id"]
+        with Session(engine) as session:
+            bulk_seq = session.get(LoggedActivity, bulk_ids[0]).change_seq
+            assert {a.change_seq for a in session.exec(select(LoggedActivity).where(LoggedActivity.id.in_(bulk_ids)))} == {bulk_seq}
+
+        # A page never ends inside the group: it is trimmed back to the delete...
+        body = client.get(f"/api/activities/changes?since={delete_token - 1}&limit=3").json()
+        assert body["changed"] == [] and body["deleted_ids"] == [ids[1]]
+        assert body["sync_token"] == delete_token and body["has_more"] is True
+
+        # ...and a group larger than the limit is sent whole
+        body = client.get(f"/api/activities/changes?since={delete_token}&limit=3").json()
+        assert sorted(a["id"] for a in body["changed"]) == sorted(bulk_ids)
+        assert body["sync_token"] == bulk_seq and body["has_more"] is True
+        body = client.get(f"/api/activities/changes?since={bulk_seq}&limit=3").json()
+        assert [a["id"] for a in body["changed"]] == [last_id] and body["has_more"] is False
+
+        # Replaying from scratch in small pages ends with exactly the stored activities
+        with Session(engine) as session:
+            stored = {a.id: a.activity_name for a in session.exec(select(LoggedActivity).where(LoggedActivity.user_id == USER_ID))}
+        for limit in [1, 2, 4, 500]:
+            known, token, calls = replay(client, limit)
+            assert known == stored, limit
+            assert token == bulk_seq + 1
+        assert replay(client, 1)[2] > replay(client, 500)[2]
+
+        assert client.get("/api/activities/changes?since=-1").status_code == 422
+        assert client.get("/api/activities/changes?limit=0").status_code == 422
+    finally:
+        app.dependency_overrides = previous_overrides
+    print("Activity Delta Sync: SUCCESS")
+
+if __name__ == "__main__":
+    test_activity_changes()
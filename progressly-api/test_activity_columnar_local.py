@@ -0,0 +1,131 @@
+from datetime import date, datetime, time, timedelta
+
+from fastapi.testclient import TestClient
+from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel.pool import StaticPool
+import sys
+import os
+
+# Add current directory to sys.path to ensure imports work
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from main import app
+from database import get_session
+from dependencies import get_db_session, get_current_user
+from models import Category, LoggedActivity
+from utils import activity_json
+
+# Setup in-memory SQLite
+engine = create_engine(
+    "sqlite://",
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool
+)
+SQLModel.metadata.create_all(engine)
+
+USER_ID = "columnar-user"
+
+def get_session_override():
+    with Session(engine) as session:
+        yield session
+
+def get_current_user_override():
+    return USER_ID
+
+def seed_activities():
+    """Shared and missing categories, overnight rows, late logs and a legacy row without a day."""
+    today = date.today()
+    with Session(engine) as session:
+        work = Category(user_id=USER_ID, name="Work", color="#FFFFFF")
+        gym = Category(user_id=USER_ID, name="Gym", color="#000000")
+        session.add_all([work, gym])
+        session.commit()
+        for days_ago in range(5):
+            day = today - timedelta(days=days_ago)
+            session.add_all([
+                LoggedActivity(user_id=USER_ID, activity_name="Deep work", category_id=work.id,
+                               start_time=time(9, 0), end_time=time(11, 30),
+                               activity_date=datetime.combine(day, time(11, 31)), effective_date=day),
+                LoggedActivity(user_id=USER_ID, activity_name="Lift", category_id=gym.id,
+                               start_time=time(23, 15), end_time=time(0, 45),
+                               activity_date=datetime.combine(day + timedelta(days=1), time(0, 50)), effective_date=day),
+                LoggedActivity(user_id=USER_ID, activity_name="Walk \"outside\" ☀", category_id=None,
+                               start_time=time(17, 0), end_time=time(17, 20),
+                               activity_date=datetime.combine(day, time(17, 21)), effective_date=day),
+            ])
+        session.add(LoggedActivity(user_id=USER_ID, activity_name="Legacy", category_id=work.id,
+                                   start_time=time(8, 0), end_time=time(8, 30),
+                                   activity_date=datetime.combine(today - timedelta(days=9), time(8, 31)), effective_date=None))
+        session.commit()
+
+def decode_columnar(payload):
+    """Rebuild the default per-activity objects from the columnar form, as a client would."""
+    if payload["count"] == 0:
+        return []
+    base = date.fromisoformat(payload["base_date"])
+    columns = payload["columns"]
+
+    def clock(minute):
+        return time(minute // 60, minute % 60).isoformat()
+
+    activities = []
+    for i in range(payload["count"]):
+        category_index = columns["category"][i]
+        category = payload["categories"][category_index] if category_index is not None else None
+        effective_day = columns["effective_day"][i]
+        activities.append({
+            "activity_name": columns["activity_name"][i],
+            "start_time": clock(columns["start_minute"][i]),
+            "end_time": clock(columns["end_minute"][i]),
+            "id": columns["id"][i],
+            "user_id": payload["user_id"],
+            "activity_date": datetime.combine(
+                base + timedelta(days=columns["activity_day"][i]),
+                time.fromisoformat(clock(columns["activity_minute"][i])),
+            ).isoformat(),
+            "effective_date": (base + timedelta(days=effective_day)).isoformat() if effective_day is not None else None,
+            "category_id": category["id"] if category else None,
+            "category": {"name": category["name"], "color": category["color"], "id": category["id"]} if category else None,
+        })
+    return activities
+
+def test_columnar_round_trip():
+    print("Testing Columnar Activity Format...")
+    previous_overrides = dict(app.dependency_overrides)
+    app.dependency_overrides[get_db_session] = get_session_override
+    app.dependency_overrides[get_session] = get_session_override
+    app.dependency_overrides[get_current_user] = get_current_user_override
+    client = TestClient(app)
+    encoder = activity_json.orjson
+
+    try:
+        seed_activities()
+        yesterday = (date.today() - timedelta(days=1)).isoformat()
+        # Same answers from orjson and the stdlib encoder
+        for backend in [encoder, None]:
+            activity_json.orjson = backend
+
+            default = client.get("/api/dashboard-bootstrap").json()["activities_last_3_days"]
+            columnar = client.get("/api/dashboard-bootstrap?format=columnar").json()["activities_last_3_days"]
+            assert len(default) == columnar["count"] == 16
+            assert decode_columnar(columnar) == default
+            # Each category is sent once; the uncategorized rows reference none
+            assert sorted(c["name"] for c in columnar["categories"]) == ["Gym", "Work"]
+            assert columnar["columns"]["category"].count(None) == 5
+            assert len(activity_json.dumps(columnar)) < len(activity_json.dumps(default)) / 2
+
+            day = client.get(f"/api/activities?target_date={yesterday}").json()
+            assert day and decode_columnar(client.get(f"/api/activities?target_date={yesterday}&format=columnar").json()) == day
+
+            # An empty listing is an empty columnar object, not an error
+            empty = client.get("/api/dashboard-bootstrap?format=columnar&from=2000-01-01&to=2000-01-02").json()
+            assert empty["activities_last_3_days"]["count"] == 0 and decode_columnar(empty["activities_last_3_days"]) == []
+
+        assert client.get("/api/activities?format=xml").status_code == 422
+    finally:
+        activity_json.orjson = encoder
+        app.dependency_overrides = previous_overrides
+    print("Columnar Activity Format: SUCCESS")
+
+if __name__ == "__main__":
+    test_columnar_round_trip()
@@ -0,0 +1,158 @@
+from datetime import date, datetime, time, timedelta
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlmodel import Session, SQLModel, create_engine, select
+from sqlmodel.pool import StaticPool
+import sys
+import os
+
+# Add current directory to sys.path to ensure imports work
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from main import app
+from dependencies import get_db_session, get_current_user
+from models import Category, LoggedActivity
+from services.day_boundaries import rebuild_day_boundaries, load_day_boundaries
+
+# Setup in-memory SQLite
+engine = create_engine(
+    "sqlite://",
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool
+)
+SQLModel.metadata.create_all(engine)
+
+USER_ID = "range-test-user"
+START = date(2024, 5, 1)
+
+def get_session_override():
+    with Session(engine) as session:
+        yield session
+
+def get_current_user_override():
+    return USER_ID
+
+def seed():
+    with Session(engine) as session:
+        sleep = Category(user_id=USER_ID, name="Sleep", color="#000000")
+        work = Category(user_id=USER_ID, name="Work", color="#FFFFFF")
+        session.add_all([sleep, work])
+        session.commit()
+        for offset in range(14):
+            day = START + timedelta(days=offset)
+            # Night sleep from this day into the next, waking at a different time each day
+            session.add(LoggedActivity(
+                user_id=USER_ID, activity_name="Sleep", category_id=sleep.id,
+                start_time=time(23, 0), end_time=time(6 + offset % 4, 30),
+                activity_date=datetime.combine(day, time(8, 0)), effective_date=day,
+            ))
+            session.add(LoggedActivity(
+                user_id=USER_ID, activity_name="Deep work", category_id=work.id,
+                start_time=time(9, 0), end_time=time(11, 0),
+                activity_date=datetime.combine(day, time(11, 0)), effective_date=day,
+            ))
+            # Late-night activity that runs past midnight
+            session.add(LoggedActivity(
+                user_id=USER_ID, activity_name="Reading", category_id=None,
+                start_time=time(22, 30), end_time=time(0, 30),
+                activity_date=datetime.combine(day, time(22, 30)), effective_date=day,
+            ))
+        session.commit()
+        # Rows were inserted directly, so backfill their boundaries like the migration does
+        rebuild_day_boundaries(session, USER_ID)
+        session.commit()
+
+def test_range_matches_single_days():
+    print("Testing Activity Range...")
+    previous_overrides = dict(app.dependency_overrides)
+    app.dependency_overrides[get_db_session] = get_session_override
+    app.dependency_overrides[get_current_user] = get_current_user_override
+    client = TestClient(app)
+    seed()
+
+    statements = []
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    try:
+        first, last = START + timedelta(days=1), START + timedelta(days=12)
+        # The ETag's effective date is resolved (and cached per user) on the first read
+        assert client.get("/api/goals").status_code == 200
+        event.listen(engine, "before_cursor_execute", count_statement)
+        try:
+            response = client.get(f"/api/activities/range?from={first.isoformat()}&to={last.isoformat()}")
+        finally:
+            event.remove(engine, "before_cursor_execute", count_statement)
+        assert response.status_code == 200
+        days = response.json()["days"]
+        assert [d["date"] for d in days] == [(first + timedelta(days=i)).isoformat() for i in range(12)]
+
+        # Exactly one statement reads activities, however many days are requested
+        assert len([s for s in statements if "FROM loggedactivity" in s]) == 1
+
+        for day in days:
+            single = client.get(f"/api/activities?target_date={day['date']}").json()
+            assert sorted(a["id"] for a in day["activities"]) == sorted(a["id"] for a in single), day["date"]
+        # Consecutive days share their wake-up boundary, set by the night's sleep
+        for previous, current in zip(days, days[1:]):
+            assert previous["end"] == current["start"]
+        assert days[0]["start"] == datetime.combine(first, time(6, 30)).isoformat()
+
+        assert client.get(f"/api/activities/range?from={last.isoformat()}&to={first.isoformat()}").status_code == 400
+    finally:
+        app.dependency_overrides = previous_overrides
+    print("Activity Range: SUCCESS")
+
+def test_sleep_writes_maintain_day_boundaries():
+    print("Testing Day Boundary Maintenance...")
+    previous_overrides = dict(app.dependency_overrides)
+    app.dependency_overrides[get_db_session] = get_session_override
+    app.dependency_overrides[get_current_user] = get_current_user_override
+    client = TestClient(app)
+    today = date.today()
+
+    def boundaries():
+        with Session(engine) as session:
+            return load_day_boundaries(session, USER_ID, today, today)[0][1:]
+
+    try:
+        with Session(engine) as session:
+            if not session.exec(select(Category).where(Category.user_id == USER_ID)).first():
+                session.add(Category(user_id=USER_ID, name="Sleep", color="#000000"))
+                session.commit()
+            sleep_id = session.exec(select(Category.id).where(Category.user_id == USER_ID, Category.name == "Sleep")).first()
+
+        # Logged today, an overnight sleep ends today: it starts today's day
+        created = client.post("/api/activities", json={
+            "activity_name": "Sleep", "start_time": "23:00:00", "end_time": "06:15:00",
+            "category_id": sleep_id, "target_date": today.isoformat(),
+        }).json()
+        # activity_date is "now", so the sleep is anchored on today and wakes tomorrow
+        tomorrow = today + timedelta(days=1)
+        with Session(engine) as session:
+            row = load_day_boundaries(session, USER_ID, tomorrow, tomorrow)[0]
+        assert row[1] == datetime.combine(tomorrow, time(6, 15))
+        assert boundaries()[1] == row[1]  # Today ends where tomorrow starts
+
+        client.put(f"/api/activities/{created['id']}", json={
+            "activity_name": "Sleep", "start_time": "23:00:00", "end_time": "07:45:00", "category_id": sleep_id,
+        })
+        assert boundaries()[1] == datetime.combine(tomorrow, time(7, 45))
+
+        client.delete(f"/api/activities/{created['id']}")
+        assert boundaries()[1] == datetime.combine(tomorrow, time(0, 0))
+
+        # End My Day overrides the sleep-derived start
+        client.post("/api/end-day", json={"new_effective_date": tomorrow.isoformat()})
+        with Session(engine) as session:
+            row = load_day_boundaries(session, USER_ID, tomorrow, tomorrow)[0]
+        assert row[1] != datetime.combine(tomorrow, time(0, 0))
+        assert boundaries()[1] == row[1]
+    finally:
+        app.dependency_overrides = previous_overrides
+    print("Day Boundary Maintenance: SUCCESS")
+
+if __name__ == "__main__":
+    test_range_matches_single_days()
+    test_sleep_writes_maintain_day_boundaries()
@@ -0,0 +1,105 @@
+from datetime import date, datetime, time, timedelta
+
+from fastapi.testclient import TestClient
+from sqlmodel import Session, SQLModel, create_engine, select
+from sqlmodel.pool import StaticPool
+import sys
+import os
+
+# Add current directory to sys.path to ensure imports work
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from main import app
+from dependencies import get_db_session, get_current_user
+from models import Category, LoggedActivity
+
+# Setup in-memory SQLite
+engine = create_engine(
+    "sqlite://",
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool
+)
+SQLModel.metadata.create_all(engine)
+
+USER_ID = "search-test-user"
+NAMES = ["Deep work", "Reading", "Gym", "Deep Work review", "100% focus", "Cooking"]
+
+def get_session_override():
+    with Session(engine) as session:
+        yield session
+
+def get_current_user_override():
+    return USER_ID
+
+def seed():
+    start = date(2024, 1, 1)
+    with Session(engine) as session:
+        work = Category(user_id=USER_ID, name="Work", color="#FFFFFF")
+        session.add(work)
+        session.commit()
+        for i in range(300):
+            day = start + timedelta(days=i // 4)
+            session.add(LoggedActivity(
+                user_id=USER_ID, activity_name=NAMES[i % len(NAMES)],
+                category_id=work.id if i % 2 else None,
+                start_time=time(6 + (i % 4) * 3, 0), end_time=time(7 + (i % 4) * 3, 0),
+                activity_date=datetime.combine(day, time(23, 0)), effective_date=day,
+            ))
+        # Someone else's matching activity must never show up
+        session.add(LoggedActivity(
+            user_id="someone-else", activity_name="Deep work", start_time=time(9, 0), end_time=time(10, 0),
+            activity_date=datetime.combine(start, time(10, 0)), effective_date=start,
+        ))
+        session.commit()
+        return work.id
+
+def search_all(client, query):
+    """Follow next_cursor to the end and return the ids, in page order."""
+    ids, cursor = [], None
+    while True:
+        url = f"/api/activities/search?{query}&limit=7" + (f"&cursor={cursor}" if cursor else "")
+        response = client.get(url)
+        assert response.status_code == 200
+        body = response.json()
+        assert len(body["activities"]) <= 7
+        ids += [a["id"] for a in body["activities"]]
+        cursor = body["next_cursor"]
+        if not cursor:
+            return ids
+
+def expected_ids(predicate):
+    with Session(engine) as session:
+        rows = [a for a in session.exec(select(LoggedActivity).where(LoggedActivity.user_id == USER_ID)).all() if predicate(a)]
+    rows.sort(key=lambda a: (a.effective_date, a.start_time, a.id), reverse=True)
+    return [a.id for a in rows]
+
+def test_activity_search():
+    print("Testing Activity Search...")
+    previous_overrides = dict(app.dependency_overrides)
+    app.dependency_overrides[get_db_session] = get_session_override
+    app.dependency_overrides[get_current_user] = get_current_user_override
+    client = TestClient(app)
+    work_id = seed()
+
+    try:
+        # Case-insensitive substring, newest first across keyset pages
+        assert search_all(client, "q=deep%20WORK") == expected_ids(lambda a: "deep work" in a.activity_name.lower())
+
+        # Combined with category and date filters
+        got = search_all(client, f"q=work&category_id={work_id}&from=2024-01-10&to=2024-02-10")
+        assert got == expected_ids(lambda a: "work" in a.activity_name.lower() and a.category_id == work_id
+                                   and date(2024, 1, 10) <= a.effective_date <= date(2024, 2, 10))
+        assert got
+
+        # Wildcards typed by the user are matched literally
+        assert search_all(client, "q=0%25%20f") == expected_ids(lambda a: "0% f" in a.activity_name)
+        assert search_all(client, "q=d_w") == []
+
+        assert client.get("/api/activities/search?q=ab").status_code == 422
+        assert client.get("/api/activities/search?q=work&cursor=bogus").status_code == 400
+    finally:
+        app.dependency_overrides = previous_overrides
+    print("Activity Search: SUCCESS")
+
+if __name__ == "__main__":
+    test_activity_search()
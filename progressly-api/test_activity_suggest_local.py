@@ -0,0 +1,170 @@
+import time as timer
+from datetime import date, datetime, time
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlmodel import Session, SQLModel, create_engine, select
+from sqlmodel.pool import StaticPool
+import sys
+import os
+
+# Add current directory to sys.path to ensure imports work
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from main import app
+from database import get_session
+from dependencies import get_db_session, get_current_user
+from models import ActivityPreset, Category, LoggedActivity
+from services import activity_presets
+from services.activity_presets import get_preset_index, rebuild_activity_presets, record_activity_usage, suggest_activity_names
+
+# Setup in-memory SQLite
+engine = create_engine(
+    "sqlite://",
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool
+)
+SQLModel.metadata.create_all(engine)
+
+USER_ID = "suggest-test-user"
+
+def get_session_override():
+    with Session(engine) as session:
+        yield session
+
+def get_current_user_override():
+    return USER_ID
+
+def log(client, name, start, end, category_id=None):
+    response = client.post("/api/activities", json={
+        "activity_name": name, "start_time": start, "end_time": end,
+        "category_id": category_id, "target_date": date.today().isoformat(),
+    })
+    assert response.status_code == 200
+    return response.json()
+
+def presets_by_name():
+    with Session(engine) as session:
+        presets = session.exec(select(ActivityPreset).where(ActivityPreset.user_id == USER_ID)).all()
+        return {p.activity_name: (p.usage_count, p.category_id, p.typical_start_time, p.typical_duration_minutes, p.is_frequent)
+                for p in presets}
+
+def test_presets_and_suggestions():
+    print("Testing Activity Suggestions...")
+    previous_overrides = dict(app.dependency_overrides)
+    app.dependency_overrides[get_db_session] = get_session_override
+    app.dependency_overrides[get_session] = get_session_override
+    app.dependency_overrides[get_current_user] = get_current_user_override
+    client = TestClient(app)
+
+    try:
+        with Session(engine) as session:
+            work = Category(user_id=USER_ID, name="Work", color="#FFFFFF")
+            session.add(work)
+            session.commit()
+            work_id = work.id
+
+        # Deep work: mornings, most used. Dev work: evenings. Meditate: around midnight
+        for _ in range(6):
+            log(client, "Deep work", "09:00:00", "11:00:00", work_id)
+        for _ in range(3):
+            log(client, "Dev work", "20:00:00", "21:00:00", work_id)
+        log(client, "Meditate", "23:30:00", "23:50:00")
+        log(client, "Meditate", "00:30:00", "00:40:00")
+        client.post("/api/activities/bulk", json={"activities": [
+            {"activity_name": "Dishes", "start_time": "19:00:00", "end_time": "19:15:00",
+             "category_id": None, "target_date": date.today().isoformat()}
+        ] * 2})
+
+        presets = presets_by_name()
+        assert presets["Deep work"] == (6, work_id, time(9, 0), 120, True)
+        assert presets["Dev work"][0] == 3 and presets["Dev work"][4] is False
+        # Start times average around the clock; durations are a running mean
+        assert presets["Meditate"][2:4] == (time(0, 0), 15)
+        assert presets["Dishes"][0] == 2
+
+        # Time of day decides between the two "... work" names
+        morning = client.get("/api/activities/suggest?prefix=de&at=09:15:00").json()
+        evening = client.get("/api/activities/suggest?prefix=de&at=20:10:00").json()
+        assert [s["activity_name"] for s in morning] == ["Deep work", "Dev work"]
+        assert [s["activity_name"] for s in evening] == ["Dev work", "Deep work"]
+        # Any word in the name can match the prefix
+        assert {s["activity_name"] for s in client.get("/api/activities/suggest?prefix=WOR").json()} == {"Deep work", "Dev work"}
+        assert client.get("/api/activities/suggest?prefix=xyz").json() == []
+        assert len(client.get("/api/activities/suggest?limit=2").json()) == 2
+
+        # Warm lookups are served from memory: no SQL at all, well under a millisecond
+        statements = []
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            with Session(engine) as session:
+                started = timer.perf_counter()
+                for prefix in ["d", "de", "dee", "deep", "m", "me", "w", "wo", ""] * 100:
+                    suggest_activity_names(session, USER_ID, prefix, time(9, 0))
+                per_lookup = (timer.perf_counter() - started) / 900
+            client.get("/api/activities/suggest?prefix=med")
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+        assert statements == []
+        assert per_lookup < 0.001, per_lookup
+
+        # A write refreshes this worker's index
+        log(client, "Deep breathing", "09:00:00", "09:10:00")
+        assert "Deep breathing" in {s["activity_name"] for s in client.get("/api/activities/suggest?prefix=deep").json()}
+
+        # The index is only dropped once the write commits: before that, or after a
+        # rollback, a reload could only see the old presets
+        def usage(session, name):
+            activity = LoggedActivity(
+                user_id=USER_ID, activity_name=name, start_time=time(7, 0), end_time=time(7, 30),
+                activity_date=datetime.now(),
+            )
+            session.add(activity)
+            record_activity_usage(session, USER_ID, [activity])
+        with Session(engine) as session:
+            get_preset_index(session, USER_ID)
+            usage(session, "Stretch")
+            session.flush()
+            with session.begin_nested():
+                pass
+            assert USER_ID in activity_presets._index_cache
+            session.rollback()
+            assert USER_ID in activity_presets._index_cache
+            usage(session, "Stretch")
+            session.commit()
+            assert USER_ID not in activity_presets._index_cache
+        assert "Stretch" in {s["activity_name"] for s in client.get("/api/activities/suggest?prefix=str").json()}
+
+        # A load that overlaps a committed write is served but not kept
+        load_index = activity_presets._load_index
+        def racing_load(session, user_id):
+            index = load_index(session, user_id)
+            activity_presets._drop_index(user_id)
+            return index
+        activity_presets._index_cache.pop(USER_ID, None)
+        activity_presets._load_index = racing_load
+        try:
+            with Session(engine) as session:
+                assert get_preset_index(session, USER_ID).entries
+        finally:
+            activity_presets._load_index = load_index
+        assert USER_ID not in activity_presets._index_cache
+
+        # Rebuilding from the log reproduces the incremental statistics
+        incremental = presets_by_name()
+        with Session(engine) as session:
+            rebuild_activity_presets(session, USER_ID)
+            session.commit()
+        assert presets_by_name() == incremental
+
+        # Deleting a category that presets point at still works
+        assert client.delete(f"/api/categories/{work_id}").status_code == 200
+        assert presets_by_name()["Deep work"][1] is None
+    finally:
+        app.dependency_overrides = previous_overrides
+    print("Activity Suggestions: SUCCESS")
+
+if __name__ == "__main__":
+    test_presets_and_suggestions()
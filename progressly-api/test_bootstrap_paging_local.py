@@ -0,0 +1,107 @@
+from datetime import date, datetime, time, timedelta
+
+from fastapi.testclient import TestClient
+from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel.pool import StaticPool
+import sys
+import os
+
+# Add current directory to sys.path to ensure imports work
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from main import app
+from database import get_session
+from dependencies import get_db_session, get_current_user
+from models import Category, LoggedActivity
+
+# Setup in-memory SQLite
+engine = create_engine(
+    "sqlite://",
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool
+)
+SQLModel.metadata.create_all(engine)
+
+USER_ID = "bootstrap-paging-user"
+
+def get_session_override():
+    with Session(engine) as session:
+        yield session
+
+def get_current_user_override():
+    return USER_ID
+
+def seed_activities():
+    """Ten days of activities, with start-time ties so the keyset has to fall back to ids."""
+    today = date.today()
+    with Session(engine) as session:
+        work = Category(user_id=USER_ID, name="Work", color="#FFFFFF")
+        session.add(work)
+        session.commit()
+        for days_ago in range(10):
+            day = today - timedelta(days=days_ago)
+            for start in [time(9, 0), time(9, 0), time(14, 0)]:
+                session.add(LoggedActivity(
+                    user_id=USER_ID, activity_name=f"Work {days_ago}", category_id=work.id,
+                    start_time=start, end_time=time(start.hour + 1, 0),
+                    activity_date=datetime.combine(day, start), effective_date=day,
+                ))
+        session.commit()
+
+def key(activity):
+    return (activity["effective_date"], activity["start_time"], activity["id"])
+
+def test_windowed_bootstrap_pages():
+    print("Testing Windowed Bootstrap Paging...")
+    previous_overrides = dict(app.dependency_overrides)
+    app.dependency_overrides[get_db_session] = get_session_override
+    app.dependency_overrides[get_session] = get_session_override
+    app.dependency_overrides[get_current_user] = get_current_user_override
+    client = TestClient(app)
+
+    try:
+        seed_activities()
+        today = date.today()
+        window_from, window_to = today - timedelta(days=6), today - timedelta(days=2)
+        everything = client.get("/api/dashboard-bootstrap").json()["activities_last_3_days"]
+        assert len(everything) == 30
+        expected = sorted(
+            (a for a in everything if window_from.isoformat() <= a["effective_date"] <= window_to.isoformat()),
+            key=key, reverse=True,
+        )
+        assert len(expected) == 15
+
+        # Walk the window newest to oldest, 4 at a time: every row exactly once
+        pages = []
+        url = f"/api/dashboard-bootstrap?from={window_from.isoformat()}&to={window_to.isoformat()}&limit=4"
+        cursor = None
+        while True:
+            response = client.get(url + (f"&cursor={cursor}" if cursor else ""))
+            assert response.status_code == 200
+            body = response.json()
+            page = body["activities_last_3_days"]
+            # Each page is in chronological order, like the legacy mode
+            assert page == sorted(page, key=key)
+            pages.append(page)
+            cursor = body["next_cursor"]
+            if cursor is None:
+                break
+        assert [len(page) for page in pages] == [4, 4, 4, 3]
+        assert [a["id"] for page in pages for a in reversed(page)] == [a["id"] for a in expected]
+
+        # full_history=false without a window sends only the newest page
+        body = client.get("/api/dashboard-bootstrap?full_history=false&limit=5").json()
+        newest = sorted(everything, key=key, reverse=True)[:5]
+        assert [a["id"] for a in reversed(body["activities_last_3_days"])] == [a["id"] for a in newest]
+        assert body["next_cursor"] is not None
+
+        # A malformed cursor is the client's mistake, not a server error
+        for bad in ["bogus", "bm90fGF8Y3Vyc29y", "%%%"]:
+            assert client.get(f"/api/dashboard-bootstrap?cursor={bad}").status_code == 400
+        assert client.get("/api/dashboard-bootstrap?limit=0").status_code == 422
+    finally:
+        app.dependency_overrides = previous_overrides
+    print("Windowed Bootstrap Paging: SUCCESS")
+
+if __name__ == "__main__":
+    test_windowed_bootstrap_pages()
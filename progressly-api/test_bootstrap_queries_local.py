@@ -0,0 +1,129 @@
+from datetime import date, datetime, time, timedelta
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlmodel import Session, SQLModel, create_engine, select
+from sqlmodel.pool import StaticPool
+import sys
+import os
+
+# Add current directory to sys.path to ensure imports work
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from main import app
+from dependencies import get_db_session, get_current_user
+from models import Category, LoggedActivity
+from services.category_rollup import rebuild_category_rollups
+
+# Setup in-memory SQLite
+engine = create_engine(
+    "sqlite://",
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool
+)
+SQLModel.metadata.create_all(engine)
+
+USER_ID = "bootstrap-test-user"
+
+def get_session_override():
+    with Session(engine) as session:
+        yield session
+
+def get_current_user_override():
+    return USER_ID
+
+def seed_activities():
+    today = date.today()
+    yesterday = today - timedelta(days=1)
+    with Session(engine) as session:
+        sleep = Category(user_id=USER_ID, name="Sleep", color="#000000")
+        work = Category(user_id=USER_ID, name="Work", color="#FFFFFF")
+        session.add_all([sleep, work])
+        session.commit()
+
+        for days_ago in range(30):
+            day = today - timedelta(days=days_ago)
+            session.add(LoggedActivity(
+                user_id=USER_ID, activity_name="Deep work", category_id=work.id,
+                start_time=time(9, 0), end_time=time(11, 0),
+                activity_date=datetime.combine(day, time(11, 0)), effective_date=day,
+            ))
+        # Night sleep that started yesterday and ended this morning
+        session.add(LoggedActivity(
+            user_id=USER_ID, activity_name="Sleep", category_id=sleep.id,
+            start_time=time(23, 0), end_time=time(7, 0),
+            activity_date=datetime.combine(yesterday, time(0, 0)), effective_date=yesterday,
+        ))
+        session.commit()
+        rebuild_category_rollups(session, USER_ID)
+        session.commit()
+
+def test_bootstrap_query_count():
+    print("Testing Bootstrap Query Count...")
+    previous_overrides = dict(app.dependency_overrides)
+    app.dependency_overrides[get_db_session] = get_session_override
+    app.dependency_overrides[get_current_user] = get_current_user_override
+    client = TestClient(app)
+    seed_activities()
+    # The ETag's effective date is resolved (and cached per user) on the first read
+    assert client.get("/api/goals").status_code == 200
+
+    statements = []
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", count_statement)
+    try:
+        response = client.get("/api/dashboard-bootstrap")
+    finally:
+        event.remove(engine, "before_cursor_execute", count_statement)
+        app.dependency_overrides = previous_overrides
+
+    if response.status_code != 200:
+        print(f"Failed to fetch bootstrap: {response.text}")
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data["activities_last_3_days"]) == 31
+    assert data["effective_date"] == date.today().isoformat()  # Sleep ended today
+    assert data["last_end_time"] is not None
+    assert {c["name"] for c in data["categories"]} == {"Sleep", "Work"}
+    assert [(p["name"], p["duration"]) for p in data["pie_chart_data"]] == [("Work", 120)]
+
+    # 1 ETag version lookup + 1 activity list + 1 UNION ALL for everything else
+    for statement in statements:
+        print(f"  {statement.splitlines()[0][:100]}")
+    assert len(statements) == 3, f"Expected 3 statements, got {len(statements)}"
+    print("Bootstrap Query Count: SUCCESS")
+
+def test_effective_date_cache_invalidation():
+    print("Testing Effective Date Cache Invalidation...")
+    previous_overrides = dict(app.dependency_overrides)
+    app.dependency_overrides[get_db_session] = get_session_override
+    app.dependency_overrides[get_current_user] = get_current_user_override
+    client = TestClient(app)
+    today = date.today()
+    try:
+        with Session(engine) as session:
+            sleep = session.exec(
+                select(LoggedActivity).where(LoggedActivity.user_id == USER_ID, LoggedActivity.end_time == time(7, 0))
+            ).first()
+        assert client.get("/api/dashboard-bootstrap").json()["effective_date"] == today.isoformat()
+
+        # Moving the wake-up past midnight-tonight means no sleep ended today any more
+        response = client.put(f"/api/activities/{sleep.id}", json={
+            "activity_name": "Sleep", "start_time": "01:00:00", "end_time": "07:00:00", "category_id": sleep.category_id,
+        })
+        assert response.status_code == 200
+        assert client.get("/api/dashboard-bootstrap").json()["effective_date"] == (today - timedelta(days=1)).isoformat()
+
+        # End My Day pins the day regardless of sleep
+        response = client.post("/api/end-day", json={"new_effective_date": today.isoformat()})
+        assert response.status_code == 200
+        assert client.get("/api/dashboard-bootstrap").json()["effective_date"] == today.isoformat()
+    finally:
+        app.dependency_overrides = previous_overrides
+    print("Effective Date Cache Invalidation: SUCCESS")
+
+if __name__ == "__main__":
+    test_bootstrap_query_count()
+    test_effective_date_cache_invalidation()
@@ -0,0 +1,261 @@
+from datetime import date, timedelta
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlmodel import Session, SQLModel, create_engine, select
+from sqlmodel.pool import StaticPool
+import sys
+import os
+
+# Add current directory to sys.path to ensure imports work
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from main import app
+from database import get_session
+from dependencies import get_db_session, get_current_user
+from models import ActivityTombstone, Category, Challenge, DailyCategoryRollup, DailyChallengeMetrics, LoggedActivity
+from services.category_rollup import rebuild_category_rollups
+from services.challenge_updates import flush_challenge_updates
+
+# Setup in-memory SQLite
+engine = create_engine(
+    "sqlite://",
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool
+)
+SQLModel.metadata.create_all(engine)
+
+SINGLE_USER = "bulk-single-user"
+BULK_USER = "bulk-batch-user"
+EDIT_USER = "bulk-edit-user"
+current_user = {"id": SINGLE_USER}
+
+def get_session_override():
+    with Session(engine) as session:
+        yield session
+
+def get_current_user_override():
+    return current_user["id"]
+
+def seed(user_id):
+    today = date.today()
+    with Session(engine) as session:
+        work = Category(user_id=user_id, name="Work", color="#FFFFFF")
+        gym = Category(user_id=user_id, name="Gym", color="#000000")
+        session.add_all([work, gym])
+        session.add(Challenge(
+            user_id=user_id, name="30 Days", start_date=today - timedelta(days=5),
+            end_date=today + timedelta(days=24), duration_days=30,
+            commitments=[
+                {"id": "c1", "habit": "Deep work", "category": "Work", "target": 2, "unit": "hours"},
+                {"id": "c2", "habit": "Read", "target": 30, "unit": "minutes"},
+                {"id": "c3", "habit": "Workout", "category": "Gym", "unit": "binary"},
+            ],
+        ))
+        session.commit()
+        return {"Work": work.id, "Gym": gym.id}
+
+def queued_items(categories):
+    """An offline queue spanning four days, several items per day."""
+    today = date.today()
+    items = []
+    for days_ago in range(4):
+        target = (today - timedelta(days=days_ago)).isoformat()
+        items += [
+            {"activity_name": "Deep work", "start_time": "09:00:00", "end_time": "10:30:00", "category_id": categories["Work"], "target_date": target},
+            {"activity_name": "Read a book", "start_time": "21:00:00", "end_time": "21:20:00", "category_id": None, "target_date": target},
+            {"activity_name": "Deep work", "start_time": "14:00:00", "end_time": "15:00:00", "category_id": categories["Work"], "target_date": target},
+        ]
+        if days_ago % 2:
+            items.append({"activity_name": "Lift", "start_time": "23:30:00", "end_time": "00:30:00", "category_id": categories["Gym"], "target_date": target})
+    return items
+
+def snapshot(user_id):
+    with Session(engine) as session:
+        flush_challenge_updates(session, user_id)
+        challenge = session.exec(select(Challenge).where(Challenge.user_id == user_id)).first()
+        metrics = session.exec(
+            select(DailyChallengeMetrics)
+            .where(DailyChallengeMetrics.challenge_id == challenge.id)
+            .order_by(DailyChallengeMetrics.date)
+        ).all()
+        rollups = session.exec(
+            select(DailyCategoryRollup.effective_date, DailyCategoryRollup.total_minutes, DailyCategoryRollup.activity_count)
+            .where(DailyCategoryRollup.user_id == user_id)
+            .order_by(DailyCategoryRollup.effective_date, DailyCategoryRollup.total_minutes)
+        ).all()
+        return (
+            [(m.date, m.commitments_status, m.overall_completion_pct, m.diligence_score,
+              m.cumulative_consistency_rate, m.cumulative_diligence_rate, m.consecutive_completion_streak) for m in metrics],
+            [tuple(r) for r in rollups],
+        )
+
+def test_bulk_create_matches_single_creates():
+    print("Testing Bulk Activity Create...")
+    previous_overrides = dict(app.dependency_overrides)
+    app.dependency_overrides[get_db_session] = get_session_override
+    app.dependency_overrides[get_session] = get_session_override
+    app.dependency_overrides[get_current_user] = get_current_user_override
+    client = TestClient(app)
+
+    try:
+        # One POST per queued activity
+        current_user["id"] = SINGLE_USER
+        single_categories = seed(SINGLE_USER)
+        for item in queued_items(single_categories):
+            assert client.post("/api/activities", json=item).status_code == 200
+
+        # The same queue in one call, with two bad items mixed in
+        current_user["id"] = BULK_USER
+        bulk_categories = seed(BULK_USER)
+        items = queued_items(bulk_categories)
+        items.insert(2, {**items[0], "category_id": single_categories["Work"]})  # Someone else's category
+        items.insert(5, {**items[0], "target_date": "not-a-date"})
+
+        statements = []
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            response = client.post("/api/activities/bulk", json={"activities": items})
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+
+        assert response.status_code == 200
+        body = response.json()
+        assert body["created"] == len(items) - 2
+        assert [r["index"] for r in body["results"]] == list(range(len(items)))
+        assert [r["index"] for r in body["results"] if not r["success"]] == [2, 5]
+        created = [r["activity"] for r in body["results"] if r["success"]]
+        assert len({a["id"] for a in created}) == len(created)
+        assert created[0]["category"]["name"] == "Work"
+
+        # One batched INSERT for the activities where the dialect can return ids in row
+        # order from a batch (Postgres); SQLite falls back to a row at a time.
+        # Challenge metrics are updated in the background
+        inserts = [s for s in statements if s.startswith("INSERT INTO loggedactivity")]
+        assert len(inserts) == (1 if engine.dialect.name == "postgresql" else len(created))
+        assert not any("daily_challenge_metrics" in s for s in statements)
+        with Session(engine) as session:
+            stored = session.exec(select(LoggedActivity).where(LoggedActivity.user_id == BULK_USER)).all()
+            assert len(stored) == len(created)
+            assert all(a.start_at is not None and a.duration_minutes > 0 for a in stored)
+            assert len({a.change_seq for a in stored}) == 1
+
+        # Same challenge metrics and rollups as logging one at a time
+        single, bulk = snapshot(SINGLE_USER), snapshot(BULK_USER)
+        assert single[0] and single == bulk
+
+        too_many = {"activities": [items[0]] * 501}
+        assert client.post("/api/activities/bulk", json=too_many).status_code == 400
+    finally:
+        app.dependency_overrides = previous_overrides
+    print("Bulk Activity Create: SUCCESS")
+
+def rollups_match_activity_log(user_id):
+    """True if the incrementally maintained rollup equals a rebuild from the activity log."""
+    def rows(session):
+        return sorted(session.exec(
+            select(DailyCategoryRollup.effective_date, DailyCategoryRollup.category_id,
+                   DailyCategoryRollup.total_minutes, DailyCategoryRollup.activity_count)
+            .where(DailyCategoryRollup.user_id == user_id)
+        ).all())
+    with Session(engine) as session:
+        maintained = rows(session)
+        rebuild_category_rollups(session, user_id)
+        rebuilt = rows(session)
+        session.rollback()
+    return maintained == rebuilt
+
+def test_bulk_update_and_delete():
+    print("Testing Bulk Activity Update/Delete...")
+    previous_overrides = dict(app.dependency_overrides)
+    app.dependency_overrides[get_db_session] = get_session_override
+    app.dependency_overrides[get_session] = get_session_override
+    app.dependency_overrides[get_current_user] = get_current_user_override
+    client = TestClient(app)
+
+    try:
+        current_user["id"] = EDIT_USER
+        categories = seed(EDIT_USER)
+        body = client.post("/api/activities/bulk", json={"activities": queued_items(categories)}).json()
+        created = [r["activity"] for r in body["results"]]
+        today = date.today().isoformat()
+        todays_work = [a["id"] for a in created if a["effective_date"] == today and a["category_id"] == categories["Work"]]
+        with Session(engine) as session:
+            foreign_id = session.exec(select(LoggedActivity.id).where(LoggedActivity.user_id == SINGLE_USER)).first()
+
+        # One shared end time that would turn the 14:00 session into a 21-hour overnight one
+        # is refused as a whole, naming the row
+        afternoon = [a["id"] for a in created if a["id"] in todays_work and a["start_time"] == "14:00:00"]
+        before_rollups = snapshot(EDIT_USER)[1]
+        response = client.patch("/api/activities/bulk", json={"ids": todays_work, "end_time": "11:00:00"})
+        assert response.status_code == 400
+        assert response.json()["detail"]["ids"] == afternoon
+        # Likewise a shared start time that would put the morning session at 20 hours
+        response = client.patch("/api/activities/bulk", json={"ids": todays_work, "start_time": "14:30:00"})
+        assert response.status_code == 400
+        assert response.json()["detail"]["ids"] == sorted(set(todays_work) - set(afternoon))
+        with Session(engine) as session:
+            untouched = session.exec(select(LoggedActivity).where(LoggedActivity.id.in_(todays_work))).all()
+            assert sorted(a.duration_minutes for a in untouched) == [60, 90]
+        assert snapshot(EDIT_USER)[1] == before_rollups
+
+        # Re-categorize today's work as gym, with someone else's activity and a bogus id mixed in
+        statements = []
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            response = client.patch("/api/activities/bulk", json={
+                "ids": todays_work + [foreign_id, 999999], "category_id": categories["Gym"], "end_time": "16:00:00",
+            })
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+        assert response.status_code == 200
+        assert sorted(response.json()["affected_ids"]) == sorted(todays_work)
+        assert response.json()["not_found_ids"] == sorted([foreign_id, 999999])
+        assert len([s for s in statements if s.startswith("UPDATE loggedactivity")]) == 1
+
+        with Session(engine) as session:
+            edited = session.exec(select(LoggedActivity).where(LoggedActivity.id.in_(todays_work))).all()
+            assert {a.category_id for a in edited} == {categories["Gym"]}
+            assert len({a.change_seq for a in edited}) == 1
+            # Derived interval follows the new end time (09:00-16:00 and 14:00-16:00)
+            assert sorted(a.duration_minutes for a in edited) == [120, 7 * 60]
+            foreign = session.get(LoggedActivity, foreign_id)
+            assert foreign.user_id == SINGLE_USER and foreign.category_id != categories["Gym"]
+            challenge = session.exec(select(Challenge).where(Challenge.user_id == EDIT_USER)).first()
+            metrics = session.exec(select(DailyChallengeMetrics).where(
+                DailyChallengeMetrics.challenge_id == challenge.id, DailyChallengeMetrics.date == date.today()
+            )).first()
+            # The work moved to Gym: "Deep work" still matches by name, and Gym completes the workout
+            assert metrics.commitments_status["c3"]["completed"] is True
+        assert rollups_match_activity_log(EDIT_USER)
+
+        # Clear today entirely
+        todays_ids = [a["id"] for a in created if a["effective_date"] == today]
+        response = client.request("DELETE", "/api/activities/bulk", json={"ids": todays_ids + [foreign_id]})
+        assert response.status_code == 200
+        assert sorted(response.json()["affected_ids"]) == sorted(todays_ids)
+        assert response.json()["not_found_ids"] == [foreign_id]
+
+        with Session(engine) as session:
+            assert not session.exec(select(LoggedActivity).where(LoggedActivity.id.in_(todays_ids))).all()
+            assert session.get(LoggedActivity, foreign_id) is not None
+            tombstones = session.exec(select(ActivityTombstone).where(ActivityTombstone.user_id == EDIT_USER)).all()
+            assert sorted(t.activity_id for t in tombstones) == sorted(todays_ids)
+            assert len({t.change_seq for t in tombstones}) == 1
+            # Nothing counts towards the challenge today any more, so the day has no metrics
+            assert session.get(DailyChallengeMetrics, metrics.id) is None
+        assert rollups_match_activity_log(EDIT_USER)
+
+        changes = client.get("/api/activities/changes?since=0").json()
+        assert sorted(changes["deleted_ids"]) == sorted(todays_ids)
+    finally:
+        app.dependency_overrides = previous_overrides
+    print("Bulk Activity Update/Delete: SUCCESS")
+
+if __name__ == "__main__":
+    test_bulk_create_matches_single_creates()
+    test_bulk_update_and_delete()
@@ -0,0 +1,128 @@
+from datetime import date, timedelta
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlmodel import Session, SQLModel, create_engine, select
+from sqlmodel.pool import StaticPool
+import sys
+import os
+
+# Add current directory to sys.path to ensure imports work
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from main import app
+from database import get_session
+from dependencies import get_db_session, get_current_user
+from models import Category, DailyCategoryRollup
+from services.category_rollup import rebuild_category_rollups
+
+# Setup in-memory SQLite
+engine = create_engine(
+    "sqlite://",
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool
+)
+SQLModel.metadata.create_all(engine)
+
+USER_ID = "rollup-user"
+
+def get_session_override():
+    with Session(engine) as session:
+        yield session
+
+def get_current_user_override():
+    return USER_ID
+
+def rollups_match_activity_log():
+    """True if the incrementally maintained rollup equals a rebuild from the activity log."""
+    def rows(session):
+        return sorted(session.exec(
+            select(DailyCategoryRollup.effective_date, DailyCategoryRollup.category_id,
+                   DailyCategoryRollup.total_minutes, DailyCategoryRollup.activity_count)
+            .where(DailyCategoryRollup.user_id == USER_ID)
+        ).all())
+    with Session(engine) as session:
+        maintained = rows(session)
+        rebuild_category_rollups(session, USER_ID)
+        rebuilt = rows(session)
+        session.rollback()
+    return maintained == rebuilt
+
+def test_rollup_follows_activity_writes():
+    print("Testing Category Rollup Maintenance...")
+    previous_overrides = dict(app.dependency_overrides)
+    app.dependency_overrides[get_db_session] = get_session_override
+    app.dependency_overrides[get_session] = get_session_override
+    app.dependency_overrides[get_current_user] = get_current_user_override
+    client = TestClient(app)
+
+    try:
+        with Session(engine) as session:
+            work = Category(user_id=USER_ID, name="Work", color="#FFFFFF")
+            gym = Category(user_id=USER_ID, name="Gym", color="#000000")
+            session.add_all([work, gym])
+            session.commit()
+            work_id, gym_id = work.id, gym.id
+
+        today = date.today()
+        yesterday = today - timedelta(days=1)
+
+        def log(name, start, end, category_id, day=today):
+            response = client.post("/api/activities", json={
+                "activity_name": name, "start_time": start, "end_time": end,
+                "category_id": category_id, "target_date": day.isoformat(),
+            })
+            assert response.status_code == 200
+            return response.json()["id"]
+
+        def summary(day=today):
+            response = client.get(f"/api/summary/daily/{day.isoformat()}")
+            assert response.status_code == 200
+            assert rollups_match_activity_log()
+            return {item["category_name"]: item["total_duration_minutes"] for item in response.json()}
+
+        # Create: seconds are ignored and overnight activities wrap
+        deep_work = log("Deep work", "09:00:00", "10:30:59", work_id)
+        lift = log("Lift", "23:30:00", "00:30:00", gym_id)
+        assert summary() == {"Work": 90.0, "Gym": 60.0}
+
+        # Logged today for yesterday's psychological day: counts towards yesterday
+        log("Late email", "00:15:00", "00:45:00", work_id, day=yesterday)
+        assert summary(yesterday) == {"Work": 30.0}
+        assert summary() == {"Work": 90.0, "Gym": 60.0}
+
+        # Update: longer, and moved to another category
+        statements = []
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            response = client.put(f"/api/activities/{deep_work}", json={
+                "activity_name": "Deep work", "start_time": "09:00:00", "end_time": "11:00:00", "category_id": gym_id,
+            })
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+        assert response.status_code == 200
+        assert summary() == {"Gym": 180.0}
+        # The user's write lock is taken before the activity is read
+        reads = [s for s in statements if s.startswith("SELECT")]
+        assert "FROM user_sync_state" in reads[0] and "FROM loggedactivity" in reads[1]
+
+        # Delete
+        assert client.delete(f"/api/activities/{lift}").status_code == 200
+        assert summary() == {"Gym": 120.0}
+        assert client.delete(f"/api/activities/{lift}").status_code == 404
+        assert summary() == {"Gym": 120.0}
+
+        # Deleting a category drops its rows; the detached activities are uncategorized
+        log("Standup", "11:00:00", "11:15:00", work_id)
+        assert summary() == {"Gym": 120.0, "Work": 15.0}
+        assert client.delete(f"/api/categories/{gym_id}").status_code == 200
+        assert summary() == {"Work": 15.0}
+        assert summary(yesterday) == {"Work": 30.0}
+    finally:
+        app.dependency_overrides = previous_overrides
+    print("Category Rollup Maintenance: SUCCESS")
+
+if __name__ == "__main__":
+    test_rollup_follows_activity_writes()
@@ -0,0 +1,641 @@
+import base64
+from datetime import date, timedelta
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event, update
+from sqlmodel import Session, SQLModel, create_engine, select
+from sqlmodel.pool import StaticPool
+import sys
+import os
+import time
+
+# Add current directory to sys.path to ensure imports work
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from main import app
+from database import get_session
+from dependencies import get_db_session, get_current_user
+from models import Category, Challenge, DailyChallengeMetrics, PendingChallengeActivity
+from services import challenge_updates
+from services.ai_context_builder import build_coach_context
+from services.challenge_heatmap import completion_bucket
+from services.challenge_tracker import _merged_status, get_streak_state, rebuild_challenge_metrics, verify_streak_state
+from services.challenge_updates import flush_challenge_updates
+
+# Setup in-memory SQLite
+engine = create_engine(
+    "sqlite://",
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool
+)
+SQLModel.metadata.create_all(engine)
+
+USER_ID = "challenge-progress-user"
+REBUILD_USER = "challenge-rebuild-user"
+BURST_USER = "challenge-burst-user"
+RACE_USER = "challenge-race-user"
+STREAK_USER = "challenge-streak-user"
+HEATMAP_USER = "challenge-heatmap-user"
+EDIT_USER = "challenge-edit-user"
+DAYS = 60
+current_user = {"id": USER_ID}
+
+def get_session_override():
+    with Session(engine) as session:
+        yield session
+
+def get_current_user_override():
+    return current_user["id"]
+
+def item(days_ago, name, start, end):
+    target = (date.today() - timedelta(days=days_ago)).isoformat()
+    return {"activity_name": name, "start_time": start, "end_time": end, "category_id": None, "target_date": target}
+
+def load_metrics(user_id=USER_ID):
+    with Session(engine) as session:
+        flush_challenge_updates(session, user_id)
+        challenge = session.exec(select(Challenge).where(Challenge.user_id == user_id)).first()
+        return session.exec(
+            select(DailyChallengeMetrics)
+            .where(DailyChallengeMetrics.challenge_id == challenge.id)
+            .order_by(DailyChallengeMetrics.date)
+        ).all()
+
+def assert_matches_full_recomputation(metrics):
+    """Every day's cumulative fields equal a from-scratch scan of the days up to it."""
+    for i, m in enumerate(metrics):
+        upto = metrics[:i + 1]
+        consistent = sum(1 for d in upto if d.consistency_score and d.consistency_score > 0)
+        diligence = sum(d.diligence_score or 0 for d in upto)
+        streak = 0
+        for d in reversed(upto):
+            if d.overall_completion_pct and d.overall_completion_pct >= 70:
+                streak += 1
+            else:
+                break
+        expected = (round(consistent / len(upto) * 100, 1), round(diligence / len(upto), 1), streak)
+        actual = (m.cumulative_consistency_rate, m.cumulative_diligence_rate, m.consecutive_completion_streak)
+        assert actual == expected, (m.date, actual, expected)
+
+def test_incremental_cumulative_stats():
+    print("Testing Incremental Challenge Stats...")
+    previous_overrides = dict(app.dependency_overrides)
+    app.dependency_overrides[get_db_session] = get_session_override
+    app.dependency_overrides[get_session] = get_session_override
+    app.dependency_overrides[get_current_user] = get_current_user_override
+    client = TestClient(app)
+
+    try:
+        current_user["id"] = USER_ID
+        today = date.today()
+        with Session(engine) as session:
+            session.add(Challenge(
+                user_id=USER_ID, name="Long haul", start_date=today - timedelta(days=DAYS),
+                end_date=today + timedelta(days=30), duration_days=DAYS + 31,
+                commitments=[
+                    {"id": "c1", "habit": "Deep work", "target": 2, "unit": "hours"},
+                    {"id": "c2", "habit": "Read", "target": 30, "unit": "minutes"},
+                ],
+            ))
+            session.commit()
+
+        # Skip every seventh day and vary how much gets done
+        history = []
+        for days_ago in range(DAYS, 0, -1):
+            if days_ago % 7 == 0:
+                continue
+            history.append(item(days_ago, "Deep work", "09:00:00", "10:00:00" if days_ago % 3 else "11:30:00"))
+            if days_ago % 4:
+                history.append(item(days_ago, "Read", "21:00:00", "21:40:00"))
+        assert client.post("/api/activities/bulk", json={"activities": history}).status_code == 200
+        assert_matches_full_recomputation(load_metrics())
+
+        # Counting today's logs reads only yesterday's row and today's, however long the challenge
+        loaded = []
+        def record(target, context):
+            loaded.append(target.date)
+        event.listen(DailyChallengeMetrics, "load", record)
+        try:
+            assert client.post("/api/activities", json=item(0, "Deep work", "08:00:00", "10:30:00")).status_code == 200
+            assert client.post("/api/activities", json=item(0, "Read", "22:00:00", "22:45:00")).status_code == 200
+            assert client.get("/api/challenges/active").status_code == 200
+        finally:
+            event.remove(DailyChallengeMetrics, "load", record)
+        yesterday = today - timedelta(days=1)
+        assert loaded and set(loaded) <= {yesterday, today} and len(loaded) <= 4, loaded
+        metrics = load_metrics()
+        assert_matches_full_recomputation(metrics)
+        assert metrics[-1].consecutive_completion_streak > 0
+
+        # A late entry for a past day carries forward through the days after it
+        assert client.post("/api/activities", json=item(DAYS - 1, "Deep work", "13:00:00", "14:00:00")).status_code == 200
+        assert client.post("/api/activities", json=item(14, "Deep work", "09:00:00", "12:00:00")).status_code == 200
+        assert_matches_full_recomputation(load_metrics())
+
+        # Rows from before the running totals existed are rebuilt once, then kept incrementally
+        with Session(engine) as session:
+            session.exec(update(DailyChallengeMetrics).values(
+                cumulative_days=None, cumulative_consistent_days=None, cumulative_diligence_total=None
+            ))
+            session.commit()
+        assert client.post("/api/activities", json=item(0, "Deep work", "19:00:00", "19:30:00")).status_code == 200
+        metrics = load_metrics()
+        assert all(m.cumulative_days is not None for m in metrics)
+        assert [m.cumulative_days for m in metrics] == list(range(1, len(metrics) + 1))
+        assert_matches_full_recomputation(metrics)
+    finally:
+        app.dependency_overrides = previous_overrides
+    print("Incremental Challenge Stats: SUCCESS")
+
+def comparable(metrics):
+    return [(m.date, m.day_number, m.commitments_status, m.overall_completion_pct, m.consistency_score,
+             m.diligence_score, m.cumulative_consistency_rate, m.cumulative_diligence_rate,
+             m.consecutive_completion_streak, m.notes) for m in metrics]
+
+def assert_matches_rebuild(user_id):
+    """The maintained metrics equal a from-scratch rebuild of the whole challenge."""
+    maintained = comparable(load_metrics(user_id))
+    with Session(engine) as session:
+        challenge = session.exec(select(Challenge).where(Challenge.user_id == user_id)).first()
+        rebuild_challenge_metrics(session, challenge)
+        session.commit()
+    assert comparable(load_metrics(user_id)) == maintained
+
+def test_rebuild_challenge_metrics():
+    print("Testing Challenge Metrics Rebuild...")
+    previous_overrides = dict(app.dependency_overrides)
+    app.dependency_overrides[get_db_session] = get_session_override
+    app.dependency_overrides[get_session] = get_session_override
+    app.dependency_overrides[get_current_user] = get_current_user_override
+    client = TestClient(app)
+
+    try:
+        current_user["id"] = REBUILD_USER
+        today = date.today()
+        with Session(engine) as session:
+            challenge = Challenge(
+                user_id=REBUILD_USER, name="Ninety", start_date=today - timedelta(days=89),
+                end_date=today, duration_days=90,
+                commitments=[
+                    {"id": "c1", "habit": "Deep work", "target": 2, "unit": "hours"},
+                    {"id": "c2", "habit": "Read", "target": 30, "unit": "minutes"},
+                    {"id": "c3", "habit": "Stretch", "unit": "binary"},
+                ],
+            )
+            misc = Category(user_id=REBUILD_USER, name="Misc", color="#FFFFFF")
+            session.add_all([challenge, misc])
+            session.commit()
+            challenge_id, misc_id = challenge.id, misc.id
+
+        history = []
+        for days_ago in range(89, -1, -1):
+            history.append(item(days_ago, "Deep work", "09:00:00", "10:30:00" if days_ago % 3 else "11:15:00"))
+            history.append(item(days_ago, "Read", "21:00:00", "21:20:00" if days_ago % 2 else "21:45:00"))
+            if days_ago % 5 == 0:
+                history.append(item(days_ago, "Stretch", "07:00:00", "07:10:00"))
+        body = client.post("/api/activities/bulk", json={"activities": history}).json()
+        assert body["created"] == len(history)
+        assert len(load_metrics(REBUILD_USER)) == 90
+        # Accruing activity by activity and rebuilding from the log agree
+        assert_matches_rebuild(REBUILD_USER)
+
+        # A full 90-day rebuild is a handful of statements, not a round trip per day
+        statements = []
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        with Session(engine) as session:
+            challenge = session.get(Challenge, challenge_id)
+            event.listen(engine, "before_cursor_execute", record)
+            try:
+                started = time.perf_counter()
+                assert rebuild_challenge_metrics(session, challenge) == 90
+                elapsed = time.perf_counter() - started
+            finally:
+                event.remove(engine, "before_cursor_execute", record)
+            session.commit()
+        assert len(statements) <= 6, statements
+        assert elapsed < 0.2, elapsed
+
+        # Shortening a completed session takes the progress back
+        ids = {(a["effective_date"], a["activity_name"], a["start_time"]): a["id"]
+               for a in (r["activity"] for r in body["results"])}
+        day = (today - timedelta(days=3)).isoformat()
+        assert next(m for m in load_metrics(REBUILD_USER) if m.date.isoformat() == day).commitments_status["c1"]["completed"]
+        response = client.put(f"/api/activities/{ids[(day, 'Deep work', '09:00:00')]}", json={
+            "activity_name": "Deep work", "start_time": "09:00:00", "end_time": "09:30:00", "category_id": misc_id,
+        })
+        assert response.status_code == 200
+        status = next(m for m in load_metrics(REBUILD_USER) if m.date.isoformat() == day).commitments_status
+        assert status["c1"]["achieved"] == 0.5 and not status["c1"]["completed"]
+        assert_matches_rebuild(REBUILD_USER)
+
+        # Deleting a day's activities drops its row, unless the user wrote notes on it
+        cleared, noted = (today - timedelta(days=10)).isoformat(), (today - timedelta(days=20)).isoformat()
+        with Session(engine) as session:
+            row = session.exec(select(DailyChallengeMetrics).where(
+                DailyChallengeMetrics.challenge_id == challenge_id, DailyChallengeMetrics.date == today - timedelta(days=20)
+            )).one()
+            row.notes = "Travel day"
+            session.add(row)
+            session.commit()
+        for key, activity_id in ids.items():
+            if key[0] in (cleared, noted):
+                assert client.delete(f"/api/activities/{activity_id}").status_code == 200
+        metrics = {m.date.isoformat(): m for m in load_metrics(REBUILD_USER)}
+        assert cleared not in metrics
+        assert metrics[noted].notes == "Travel day" and metrics[noted].overall_completion_pct == 0
+        assert_matches_rebuild(REBUILD_USER)
+
+        # Changing the commitments re-scores history
+        response = client.put(f"/api/challenges/{challenge_id}", json={"commitments": [
+            {"id": "c1", "habit": "Deep work", "target": 1, "unit": "hours"},
+            {"id": "c2", "habit": "Read", "target": 30, "unit": "minutes"},
+        ]})
+        assert response.status_code == 200
+        metrics = load_metrics(REBUILD_USER)
+        assert all("c3" not in m.commitments_status for m in metrics)
+        assert all(m.commitments_status["c1"]["completed"] for m in metrics if m.date.isoformat() not in (day, noted))
+        assert_matches_rebuild(REBUILD_USER)
+
+        # The repair job, for one day and for the whole challenge
+        with Session(engine) as session:
+            session.exec(update(DailyChallengeMetrics).values(overall_completion_pct=0, cumulative_days=None))
+            session.commit()
+        os.environ.setdefault("CLEANUP_SECRET_TOKEN", "test-token")
+        headers = {"X-CLEANUP-TOKEN": os.environ["CLEANUP_SECRET_TOKEN"]}
+        response = client.post(f"/api/jobs/rebuild-challenge-metrics?challenge_id={challenge_id}&day={day}", headers=headers)
+        assert response.json()["challenges_rebuilt"] == 1 and response.json()["rows_written"] == 4
+        response = client.post(f"/api/jobs/rebuild-challenge-metrics?user_id={REBUILD_USER}", headers=headers)
+        assert response.json() == {"success": True, "challenges_rebuilt": 1, "rows_written": 89}
+        assert_matches_rebuild(REBUILD_USER)
+        assert all(m.overall_completion_pct > 0 for m in load_metrics(REBUILD_USER) if m.date.isoformat() not in (day, noted))
+    finally:
+        app.dependency_overrides = previous_overrides
+    print("Challenge Metrics Rebuild: SUCCESS")
+
+def test_background_challenge_updates():
+    print("Testing Background Challenge Updates...")
+    previous_overrides = dict(app.dependency_overrides)
+    app.dependency_overrides[get_db_session] = get_session_override
+    app.dependency_overrides[get_session] = get_session_override
+    app.dependency_overrides[get_current_user] = get_current_user_override
+    client = TestClient(app)
+    debounce = challenge_updates.CHALLENGE_UPDATE_DEBOUNCE_SECONDS
+
+    try:
+        current_user["id"] = BURST_USER
+        today = date.today()
+        with Session(engine) as session:
+            challenge = Challenge(
+                user_id=BURST_USER, name="Burst", start_date=today - timedelta(days=3),
+                end_date=today + timedelta(days=26), duration_days=30,
+                commitments=[{"id": "c1", "habit": "Water", "target": 8, "unit": "minutes"}],
+            )
+            session.add(challenge)
+            session.commit()
+            challenge_id = challenge.id
+
+        def drains(statements):
+            return [s for s in statements if s.startswith("DELETE FROM pending_challenge_activities")]
+
+        statements = []
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            # A QuickTap burst: the requests never touch the metrics
+            for minute in range(6):
+                start = f"08:{minute:02d}:00"
+                assert client.post("/api/activities", json=item(0, "Water", start, f"08:{minute + 1:02d}:00")).status_code == 200
+            assert not any("daily_challenge_metrics" in s for s in statements)
+            with Session(engine) as session:
+                assert len(session.exec(select(PendingChallengeActivity).where(PendingChallengeActivity.user_id == BURST_USER)).all()) == 6
+
+            # The next read sees all of them, counted in one go
+            assert client.get("/api/challenges/active").json()["id"] == str(challenge_id)
+            assert len(drains(statements)) == 1
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+        metrics = load_metrics(BURST_USER)
+        assert metrics[-1].commitments_status["c1"]["achieved"] == 6
+        with Session(engine) as session:
+            assert not session.exec(select(PendingChallengeActivity).where(PendingChallengeActivity.user_id == BURST_USER)).all()
+
+        # Without a read, the debounce fires once after the burst goes quiet
+        challenge_updates.CHALLENGE_UPDATE_DEBOUNCE_SECONDS = 0.3
+        statements.clear()
+        for minute in range(10, 13):
+            assert client.post("/api/activities", json=item(0, "Water", f"08:{minute}:00", f"08:{minute + 1}:00")).status_code == 200
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            deadline = time.monotonic() + 5
+            while not drains(statements) and time.monotonic() < deadline:
+                time.sleep(0.05)
+            time.sleep(0.3)
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+        assert len(drains(statements)) == 1
+        with Session(engine) as session:
+            row = session.exec(select(DailyChallengeMetrics).where(DailyChallengeMetrics.challenge_id == challenge_id)).one()
+            assert row.commitments_status["c1"]["achieved"] == 9 and row.commitments_status["c1"]["completed"]
+
+        challenge_updates.CHALLENGE_UPDATE_DEBOUNCE_SECONDS = debounce
+
+        # Deleting a queued activity before it is counted leaves nothing behind to count
+        activity_id = client.post("/api/activities", json=item(0, "Water", "09:00:00", "09:01:00")).json()["id"]
+        assert client.delete(f"/api/activities/{activity_id}").status_code == 200
+        assert load_metrics(BURST_USER)[-1].commitments_status["c1"]["achieved"] == 9
+    finally:
+        challenge_updates.CHALLENGE_UPDATE_DEBOUNCE_SECONDS = debounce
+        app.dependency_overrides = previous_overrides
+    print("Background Challenge Updates: SUCCESS")
+
+def test_concurrent_day_upserts():
+    print("Testing Concurrent Day Upserts...")
+    previous_overrides = dict(app.dependency_overrides)
+    app.dependency_overrides[get_db_session] = get_session_override
+    app.dependency_overrides[get_session] = get_session_override
+    app.dependency_overrides[get_current_user] = get_current_user_override
+    client = TestClient(app)
+
+    try:
+        current_user["id"] = RACE_USER
+        today = date.today()
+        with Session(engine) as session:
+            challenge = Challenge(
+                user_id=RACE_USER, name="Race", start_date=today - timedelta(days=2),
+                end_date=today + timedelta(days=27), duration_days=30,
+                commitments=[
+                    {"id": "c1", "habit": "Deep work", "target": 1, "unit": "hours"},
+                    {"id": "c2", "habit": "Meditate", "unit": "check"},
+                ],
+            )
+            session.add(challenge)
+            session.commit()
+            challenge_id = challenge.id
+
+        assert client.post("/api/activities", json=item(0, "Deep work", "09:00:00", "09:20:00")).status_code == 200
+        with Session(engine) as session:
+            flush_challenge_updates(session, RACE_USER)
+
+        # One worker has today's row loaded when another counts a log for the same day
+        with Session(engine) as stale:
+            row = stale.exec(select(DailyChallengeMetrics).where(DailyChallengeMetrics.challenge_id == challenge_id)).one()
+            assert row.commitments_status["c1"]["achieved"] == 1 / 3
+
+            assert client.post("/api/activities", json=item(0, "Deep work", "10:00:00", "10:20:00")).status_code == 200
+            with Session(engine) as other:
+                flush_challenge_updates(other, RACE_USER)
+
+            # The first worker's accrual merges into the row as stored, with no read first
+            assert client.post("/api/activities", json=item(0, "Deep work", "11:00:00", "11:20:00")).status_code == 200
+            assert client.post("/api/activities", json=item(0, "Meditate", "12:00:00", "12:10:00")).status_code == 200
+            statements = []
+            def record(conn, cursor, statement, parameters, context, executemany):
+                statements.append(statement)
+            event.listen(engine, "before_cursor_execute", record)
+            try:
+                assert flush_challenge_updates(stale, RACE_USER) == 2
+            finally:
+                event.remove(engine, "before_cursor_execute", record)
+        metrics_statements = [s for s in statements if "daily_challenge_metrics" in s]
+        assert metrics_statements[0].startswith("INSERT INTO daily_challenge_metrics") and "ON CONFLICT" in metrics_statements[0]
+        assert len([s for s in metrics_statements if s.startswith("INSERT")]) == 1
+
+        # Sums are exact and in log order, so the rebuild agrees to the last bit
+        status = load_metrics(RACE_USER)[-1].commitments_status
+        assert status["c1"]["achieved"] == 1 / 3 + 1 / 3 + 1 / 3 and status["c1"]["completed"]
+        assert status["c2"] == {"achieved": 1, "target": None, "unit": "check", "completed": True}
+        assert load_metrics(RACE_USER)[-1].overall_completion_pct == 100
+        assert_matches_rebuild(RACE_USER)
+
+        # Postgres gets the same merge with jsonb operators
+        from sqlalchemy.dialects import postgresql
+        deltas = {"c1": ({"id": "c1", "unit": "hours", "target": 1}, [0.5]), "c2": ({"id": "c2", "unit": "check"}, [None])}
+        sql = str(_merged_status("postgresql", deltas).compile(dialect=postgresql.dialect()))
+        assert "jsonb_build_object" in sql and "->>" in sql
+    finally:
+        app.dependency_overrides = previous_overrides
+    print("Concurrent Day Upserts: SUCCESS")
+
+def test_streak_state():
+    print("Testing Challenge Streak State...")
+    previous_overrides = dict(app.dependency_overrides)
+    app.dependency_overrides[get_db_session] = get_session_override
+    app.dependency_overrides[get_session] = get_session_override
+    app.dependency_overrides[get_current_user] = get_current_user_override
+    client = TestClient(app)
+
+    try:
+        current_user["id"] = STREAK_USER
+        today = date.today()
+        with Session(engine) as session:
+            challenge = Challenge(
+                user_id=STREAK_USER, name="Streaks", start_date=today - timedelta(days=10),
+                end_date=today + timedelta(days=19), duration_days=30, success_threshold=50.0,
+                commitments=[
+                    {"id": "c1", "habit": "Run", "target": 30, "unit": "minutes"},
+                    {"id": "c2", "habit": "Read", "target": 20, "unit": "minutes"},
+                ],
+            )
+            session.add(challenge)
+            session.commit()
+            challenge_id = challenge.id
+
+        def state():
+            with Session(engine) as session:
+                flush_challenge_updates(session, STREAK_USER)
+                challenge = session.get(Challenge, challenge_id)
+                assert verify_streak_state(session, challenge) is None
+                stored = get_streak_state(session, challenge_id)
+                return stored.current_streak, stored.longest_streak, stored.last_success_date
+
+        def day(days_ago):
+            return today - timedelta(days=days_ago)
+
+        # Half the commitments done is a success at this challenge's 50% threshold
+        run = lambda days_ago: item(days_ago, "Run", "06:00:00", "06:30:00")
+        history = [run(9), run(8), item(7, "Read", "21:00:00", "21:05:00"), run(5), run(3), run(1)]
+        assert client.post("/api/activities/bulk", json={"activities": history}).status_code == 200
+        assert state() == (3, 3, day(1))
+
+        # Today starts below the threshold, then crosses it
+        assert client.post("/api/activities", json=item(0, "Read", "08:00:00", "08:10:00")).status_code == 200
+        assert state() == (0, 3, day(1))
+        assert client.post("/api/activities", json=item(0, "Read", "12:00:00", "12:15:00")).status_code == 200
+        assert state() == (4, 4, today)
+
+        # A late log for a day without metrics yet splits the run it lands in
+        assert client.post("/api/activities", json=item(2, "Read", "21:00:00", "21:05:00")).status_code == 200
+        assert state() == (2, 2, today)
+        assert_matches_rebuild(STREAK_USER)
+        assert state() == (2, 2, today)
+
+        # The coach reads the stored state
+        with Session(engine) as session:
+            context = build_coach_context(session, STREAK_USER)
+        assert "Current streak: 2 days" in context and "Longest streak: 2 days" in context
+
+        # Drift is reported, and repaired on request
+        with Session(engine) as session:
+            session.exec(update(Challenge).where(Challenge.id == challenge_id).values(longest_streak=99))
+            session.commit()
+        with Session(engine) as session:
+            challenge = session.get(Challenge, challenge_id)
+            assert verify_streak_state(session, challenge) == {"stored": (2, 99, today), "expected": (2, 2, today)}
+        os.environ.setdefault("CLEANUP_SECRET_TOKEN", "test-token")
+        response = client.post(
+            f"/api/jobs/verify-challenge-streaks?challenge_id={challenge_id}&repair=true",
+            headers={"X-CLEANUP-TOKEN": os.environ["CLEANUP_SECRET_TOKEN"]},
+        )
+        assert response.status_code == 200 and len(response.json()["mismatches"]) == 1
+        assert state() == (2, 2, today)
+    finally:
+        app.dependency_overrides = previous_overrides
+    print("Challenge Streak State: SUCCESS")
+
+def test_challenge_heatmap():
+    print("Testing Challenge Heatmap...")
+    previous_overrides = dict(app.dependency_overrides)
+    app.dependency_overrides[get_db_session] = get_session_override
+    app.dependency_overrides[get_session] = get_session_override
+    app.dependency_overrides[get_current_user] = get_current_user_override
+    client = TestClient(app)
+
+    try:
+        current_user["id"] = HEATMAP_USER
+        today = date.today()
+        start = today - timedelta(days=79)
+        with Session(engine) as session:
+            challenge = Challenge(
+                user_id=HEATMAP_USER, name="Heatmap", start_date=start,
+                end_date=start + timedelta(days=99), duration_days=100,
+                commitments=[
+                    {"id": "c1", "habit": "Deep work", "target": 2, "unit": "hours"},
+                    {"id": "c2", "habit": "Read", "target": 30, "unit": "minutes"},
+                    {"id": "c3", "habit": "Meditate", "unit": "check"},
+                ],
+            )
+            session.add(challenge)
+            session.commit()
+            challenge_id = challenge.id
+
+        history = []
+        for days_ago in range(80):
+            if days_ago % 6 == 0:
+                continue
+            history.append(item(days_ago, "Deep work", "09:00:00", "11:00:00" if days_ago % 2 else "10:00:00"))
+            if days_ago % 3:
+                history.append(item(days_ago, "Read", "21:00:00", "21:30:00"))
+            if days_ago % 5 == 0:
+                history.append(item(days_ago, "Meditate", "07:00:00", "07:10:00"))
+        assert client.post("/api/activities/bulk", json={"activities": history}).status_code == 200
+
+        # The first read applies the pending progress updates; measure the one after it
+        assert client.get(f"/api/challenges/{challenge_id}/heatmap").status_code == 200
+        statements = []
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            response = client.get(f"/api/challenges/{challenge_id}/heatmap")
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+        assert response.status_code == 200
+        # 100 days in a few hundred bytes, from one query that leaves the status JSON in the database
+        assert len(response.content) < 600, len(response.content)
+        metrics_reads = [s for s in statements if s.startswith("SELECT") and "FROM daily_challenge_metrics" in s]
+        assert len(metrics_reads) == 1
+        projected = metrics_reads[0].split(" FROM ")[0].replace("json_extract(daily_challenge_metrics.commitments_status", "")
+        assert "commitments_status" not in projected
+
+        heatmap = response.json()
+        assert heatmap["start_date"] == start.isoformat() and heatmap["days"] == len(heatmap["buckets"]) == 100
+
+        def days_in(bitset):
+            bits = base64.b64decode(bitset)
+            return {i for i in range(heatmap["days"]) if bits[i // 8] >> (i % 8) & 1}
+
+        # Every day agrees with its full metrics row
+        rows = {(m.date - start).days: m for m in load_metrics(HEATMAP_USER)}
+        assert len(rows) > 50
+        for i, bucket in enumerate(heatmap["buckets"]):
+            m = rows.get(i)
+            assert bucket == completion_bucket(m.overall_completion_pct if m else None)
+        assert days_in(heatmap["successful"]) == {i for i, m in rows.items() if m.overall_completion_pct >= 70}
+        for commitment in heatmap["commitments"]:
+            expected = {i for i, m in rows.items() if m.commitments_status.get(commitment["id"], {}).get("completed")}
+            assert expected and days_in(commitment["completed"]) == expected, commitment["id"]
+
+        # Unchanged data is a 304; someone else's challenge is off limits
+        etag = response.headers["etag"]
+        assert client.get(f"/api/challenges/{challenge_id}/heatmap", headers={"If-None-Match": etag}).status_code == 304
+        current_user["id"] = USER_ID
+        assert client.get(f"/api/challenges/{challenge_id}/heatmap").status_code == 403
+    finally:
+        app.dependency_overrides = previous_overrides
+    print("Challenge Heatmap: SUCCESS")
+
+def test_edits_rebuild_in_the_same_transaction():
+    print("Testing Challenge Rebuild on Edit...")
+    previous_overrides = dict(app.dependency_overrides)
+    app.dependency_overrides[get_db_session] = get_session_override
+    app.dependency_overrides[get_session] = get_session_override
+    app.dependency_overrides[get_current_user] = get_current_user_override
+    client = TestClient(app)
+
+    try:
+        current_user["id"] = EDIT_USER
+        today = date.today()
+        with Session(engine) as session:
+            work = Category(user_id=EDIT_USER, name="Work", color="#FFFFFF")
+            session.add(work)
+            session.add(Challenge(
+                user_id=EDIT_USER, name="Edits", start_date=today - timedelta(days=3),
+                end_date=today + timedelta(days=26), duration_days=30,
+                commitments=[{"id": "c1", "habit": "Deep work", "target": 2, "unit": "hours"}],
+            ))
+            session.commit()
+            work_id = work.id
+
+        activity_id = client.post("/api/activities", json=item(0, "Deep work", "09:00:00", "11:00:00")).json()["id"]
+        assert load_metrics(EDIT_USER)[-1].commitments_status["c1"]["completed"] is True
+
+        commits = []
+        def record_commit(conn):
+            commits.append(conn)
+        event.listen(engine, "commit", record_commit)
+        try:
+            # Shortening the session takes the day back - in the edit's own commit,
+            # so a read between two commits can't cache old progress under the new ETag
+            response = client.put(f"/api/activities/{activity_id}", json={
+                "activity_name": "Deep work", "start_time": "09:00:00", "end_time": "09:30:00", "category_id": work_id,
+            })
+            assert response.status_code == 200
+            assert len(commits) == 1
+            with Session(engine) as session:
+                challenge = session.exec(select(Challenge).where(Challenge.user_id == EDIT_USER)).one()
+                day = session.exec(select(DailyChallengeMetrics).where(
+                    DailyChallengeMetrics.challenge_id == challenge.id, DailyChallengeMetrics.date == today
+                )).one()
+                assert day.commitments_status["c1"]["completed"] is False
+
+            commits.clear()
+            assert client.delete(f"/api/activities/{activity_id}").status_code == 200
+            assert len(commits) == 1
+            with Session(engine) as session:
+                assert session.get(DailyChallengeMetrics, day.id) is None
+        finally:
+            event.remove(engine, "commit", record_commit)
+    finally:
+        app.dependency_overrides = previous_overrides
+    print("Challenge Rebuild on Edit: SUCCESS")
+
+if __name__ == "__main__":
+    test_incremental_cumulative_stats()
+    test_rebuild_challenge_metrics()
+    test_background_challenge_updates()
+    test_concurrent_day_upserts()
+    test_streak_state()
+    test_challenge_heatmap()
+    test_edits_rebuild_in_the_same_transaction()
@@ -0,0 +1,76 @@
+import random
+import time
+from datetime import datetime
+
+import sys
+import os
+
+# Add current directory to sys.path to ensure imports work
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from models import Challenge
+from services.commitment_matcher import CommitmentMatcher, get_commitment_matcher, invalidate_commitment_matcher
+
+def naive_match(commitments, activity_name, category_name):
+    """The per-commitment loop the matcher replaces."""
+    matched = []
+    for comm in commitments:
+        if not comm.get("id"):
+            continue
+        c_category, c_habit = comm.get("category"), comm.get("habit")
+        if c_category and category_name and c_category.lower() == category_name.lower():
+            matched.append(comm)
+        elif c_habit and activity_name and c_habit.lower() in activity_name.lower():
+            matched.append(comm)
+    return matched
+
+def test_matcher_agrees_with_substring_loop():
+    print("Testing Commitment Matcher...")
+    rng = random.Random(7)
+    # Overlapping habits ("work" in "deep work", "ork"), repeats and a case-only difference
+    habits = ["Deep work", "work", "ork", "Read", "read", "Reading", "Gym", "Run", "Running late", "a", None, ""]
+    categories = ["Work", "Health", "work", None]
+    commitments = [
+        {"id": f"c{i}", "habit": rng.choice(habits), "category": rng.choice(categories), "unit": "minutes"}
+        for i in range(40)
+    ]
+    commitments.append({"habit": "Deep work"})  # No id: never counts
+
+    matcher = CommitmentMatcher(commitments)
+    words = ["deep", "work", "WORK", "read", "ing", "gym", "run", "late", "ork", "x", "Deep work"]
+    for _ in range(2000):
+        name = " ".join(rng.choice(words) for _ in range(rng.randint(0, 4))) or None
+        category = rng.choice(["Work", "WORK", "Health", "Other", None])
+        assert matcher.match(name, category) == naive_match(commitments, name, category), (name, category)
+
+    # Cost follows the name, not the number of commitments
+    many = [{"id": f"h{i}", "habit": f"habit number {i}"} for i in range(2000)]
+    big = CommitmentMatcher(many)
+    started = time.perf_counter()
+    for _ in range(1000):
+        big.match("Evening run with a podcast", None)
+    elapsed = time.perf_counter() - started
+    assert elapsed < 0.5, elapsed
+    assert [c["id"] for c in big.match("did habit number 1999 today", None)] == ["h1", "h19", "h199", "h1999"]
+    print("Commitment Matcher: SUCCESS")
+
+def test_matcher_cache_follows_challenge_version():
+    challenge = Challenge(
+        user_id="matcher-user", name="Cache", start_date=datetime(2024, 1, 1).date(),
+        end_date=datetime(2024, 2, 1).date(), duration_days=31,
+        commitments=[{"id": "c1", "habit": "Read"}], updated_at=datetime(2024, 1, 1),
+    )
+    first = get_commitment_matcher(challenge)
+    assert get_commitment_matcher(challenge) is first
+
+    # update_challenge bumps updated_at (and drops the entry), so new commitments take effect
+    challenge.commitments = [{"id": "c2", "habit": "Write"}]
+    challenge.updated_at = datetime(2024, 1, 2)
+    second = get_commitment_matcher(challenge)
+    assert second is not first and [c["id"] for c in second.match("Write a letter", None)] == ["c2"]
+    invalidate_commitment_matcher(challenge.id)
+    assert get_commitment_matcher(challenge) is not second
+
+if __name__ == "__main__":
+    test_matcher_agrees_with_substring_loop()
+    test_matcher_cache_follows_challenge_version()
@@ -0,0 +1,174 @@
+import time
+from datetime import date, datetime, timedelta
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlmodel import Session, SQLModel, create_engine, select
+from sqlmodel.pool import StaticPool
+import sys
+import os
+
+# Add current directory to sys.path to ensure imports work
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from main import app
+from database import get_session
+from dependencies import get_db_session, get_current_user
+from models import UserSession
+from services.change_tracker import get_data_version
+from effective_date import SESSION_TTL
+
+# Setup in-memory SQLite
+engine = create_engine(
+    "sqlite://",
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool
+)
+SQLModel.metadata.create_all(engine)
+
+USER_ID = "data-version-user"
+
+def get_session_override():
+    with Session(engine) as session:
+        yield session
+
+def get_current_user_override():
+    return USER_ID
+
+def data_version():
+    with Session(engine) as session:
+        return get_data_version(session, USER_ID)
+
+def test_etags_follow_every_write():
+    print("Testing ETags and Data Version...")
+    previous_overrides = dict(app.dependency_overrides)
+    app.dependency_overrides[get_db_session] = get_session_override
+    app.dependency_overrides[get_session] = get_session_override
+    app.dependency_overrides[get_current_user] = get_current_user_override
+    client = TestClient(app)
+
+    today = date.today()
+    ids = {}
+
+    def activity(name, category="work"):
+        return {"activity_name": name, "start_time": "09:00:00", "end_time": "10:00:00",
+                "category_id": ids[category], "target_date": today.isoformat()}
+
+    def keep(key, response, field="id"):
+        ids[key] = response.json()[field]
+        return response
+
+    # Every write path the app has, in an order where each can succeed
+    writes = [
+        ("create category", lambda: keep("work", client.post("/api/categories", json={"name": "Work"}))),
+        ("rename category", lambda: client.put(f"/api/categories/{ids['work']}", json={"name": "Focus"})),
+        ("second category", lambda: keep("gym", client.post("/api/categories/", json={"name": "Gym", "color": "#000000"}))),
+        ("create goal", lambda: client.post("/api/goals", json={"content": "Ship it"})),
+        ("create target", lambda: keep("target", client.post("/api/targets", json={"category_name": "Focus", "target_hours": 2}))),
+        ("update target", lambda: client.put(f"/api/targets/{ids['target']}", json={"category_name": "Focus", "target_hours": 3})),
+        ("delete target", lambda: client.delete(f"/api/targets/{ids['target']}")),
+        ("log activity", lambda: keep("activity", client.post("/api/activities", json=activity("Deep work")))),
+        ("edit activity", lambda: client.put(f"/api/activities/{ids['activity']}", json={
+            **activity("Deeper work"), "category_id": ids["gym"]})),
+        ("bulk create", lambda: keep("bulk", client.post("/api/activities/bulk", json={
+            "activities": [activity("Email"), activity("Review")]}), "results")),
+        ("bulk update", lambda: client.patch("/api/activities/bulk", json={
+            "ids": [r["activity"]["id"] for r in ids["bulk"]], "category_id": ids["gym"]})),
+        ("bulk delete", lambda: client.request("DELETE", "/api/activities/bulk", json={
+            "ids": [r["activity"]["id"] for r in ids["bulk"]]})),
+        ("delete activity", lambda: client.delete(f"/api/activities/{ids['activity']}")),
+        ("end day", lambda: client.post("/api/end-day", json={"new_effective_date": today.isoformat()})),
+        ("start timer", lambda: client.post("/api/timer/active", json={
+            "category_id": str(ids["work"]), "category_name": "Focus", "start_time": "2024-01-01T09:00:00"})),
+        ("stop timer", lambda: client.delete("/api/timer/active")),
+        ("create challenge", lambda: keep("challenge", client.post("/api/challenges", json={
+            "name": "30 Days", "start_date": today.isoformat(), "end_date": (today + timedelta(days=29)).isoformat(),
+            "duration_days": 30, "commitments": [{"id": "c1", "habit": "Deep work", "target": 1, "unit": "hours"}]}))),
+        ("edit challenge", lambda: client.put(f"/api/challenges/{ids['challenge']}", json={"name": "Thirty Days"})),
+        ("abandon challenge", lambda: client.post(f"/api/challenges/{ids['challenge']}/abandon")),
+        ("delete challenge", lambda: client.delete(f"/api/challenges/{ids['challenge']}")),
+        ("delete category", lambda: client.delete(f"/api/categories/{ids['gym']}")),
+    ]
+
+    try:
+        response = client.get("/api/goals")
+        assert response.status_code == 200
+        etag = response.headers["etag"]
+        assert response.headers["cache-control"] == "private, no-cache"
+
+        for label, write in writes:
+            # Unchanged data: 304 after one version lookup, on any ETag-aware endpoint
+            statements = []
+            def record(conn, cursor, statement, parameters, context, executemany):
+                statements.append(statement)
+            event.listen(engine, "before_cursor_execute", record)
+            try:
+                for path in ["/api/goals", "/api/categories", "/api/targets", "/api/activities"]:
+                    response = client.get(path, headers={"If-None-Match": etag})
+                    assert response.status_code == 304, (label, path)
+                    assert response.headers["etag"] == etag
+            finally:
+                event.remove(engine, "before_cursor_execute", record)
+            assert len(statements) == 4, (label, statements)
+
+            version = data_version()
+            response = write()
+            assert response.status_code in (200, 204), (label, response.status_code, response.text)
+            assert data_version() > version, label
+
+            # The old ETag no longer matches: full response with a new one
+            response = client.get("/api/goals", headers={"If-None-Match": etag})
+            assert response.status_code == 200, label
+            assert response.headers["etag"] != etag, label
+            etag = response.headers["etag"]
+
+        # Weak and wildcard validators match too
+        assert client.get("/api/goals", headers={"If-None-Match": f'"nope", W/{etag}'}).status_code == 304
+        assert client.get("/api/goals", headers={"If-None-Match": "*"}).status_code == 304
+    finally:
+        app.dependency_overrides = previous_overrides
+    print("ETags and Data Version: SUCCESS")
+
+def test_expired_session_changes_etag():
+    print("Testing ETag After End-Day Session Expiry...")
+    previous_overrides = dict(app.dependency_overrides)
+    app.dependency_overrides[get_db_session] = get_session_override
+    app.dependency_overrides[get_session] = get_session_override
+    app.dependency_overrides[get_current_user] = get_current_user_override
+    client = TestClient(app)
+
+    try:
+        today = date.today()
+        yesterday = today - timedelta(days=1)
+        assert client.post("/api/end-day", json={"new_effective_date": yesterday.isoformat()}).status_code == 200
+        # Leave the session a moment to live, so it lapses with no write in between
+        with Session(engine) as session:
+            user_session = session.exec(select(UserSession).where(UserSession.user_id == USER_ID)).one()
+            user_session.ended_at = datetime.utcnow() - SESSION_TTL + timedelta(seconds=1)
+            session.add(user_session)
+            session.commit()
+
+        response = client.get("/api/dashboard-bootstrap")
+        assert response.json()["effective_date"] == yesterday.isoformat()
+        etag = response.headers["etag"]
+        assert client.get("/api/dashboard-bootstrap", headers={"If-None-Match": etag}).status_code == 304
+
+        time.sleep(1.5)
+        version = data_version()
+        # The expiry changes the ETag by itself; the bootstrap then drops the stale session
+        response = client.get("/api/dashboard-bootstrap", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.json()["effective_date"] == today.isoformat()
+        assert response.headers["etag"] != etag
+        assert data_version() > version
+        with Session(engine) as session:
+            assert session.exec(select(UserSession).where(UserSession.user_id == USER_ID)).first() is None
+        # Every other ETag-aware read moved on too
+        assert client.get("/api/goals", headers={"If-None-Match": etag}).status_code == 200
+    finally:
+        app.dependency_overrides = previous_overrides
+    print("ETag After End-Day Session Expiry: SUCCESS")
+
+if __name__ == "__main__":
+    test_etags_follow_every_write()
+    test_expired_session_changes_etag()
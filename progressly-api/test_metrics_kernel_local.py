@@ -0,0 +1,158 @@
+import random
+from datetime import date, timedelta
+
+import sys
+import os
+
+# Add current directory to sys.path to ensure imports work
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils import metrics
+from utils.metrics import (
+    calculate_consistency_rate,
+    calculate_current_streak,
+    calculate_diligence_rate,
+    calculate_longest_streak,
+    calculate_streak_state,
+    metrics_kernel,
+)
+
+def legacy_rates(rows, threshold):
+    """The per-element loops the kernel replaces, over rows in date order."""
+    current = longest = 0
+    last_success = None
+    for row in rows:
+        if row["overall_completion_pct"] >= threshold:
+            current += 1
+            longest = max(longest, current)
+            last_success = row["date"]
+        else:
+            current = 0
+    consistent = sum(1 for row in rows if row["consistency_score"] > 0)
+    diligence = 0
+    for row in rows:
+        diligence += row["diligence_score"]
+    return (current, longest, last_success,
+            round(consistent / len(rows) * 100, 1), round(diligence / len(rows), 1))
+
+def synthetic_rows(rng, days):
+    start = date(2024, 1, 1)
+    return [
+        {
+            "date": start + timedelta(days=i),
+            "overall_completion_pct": rng.choice([0.0, 33.3, 50.0, 70.0, 85.7, 100.0]),
+            "consistency_score": rng.choice([0.0, 100.0, 100.0]),
+            "diligence_score": rng.random() * 100,
+        }
+        for i in range(days)
+    ]
+
+def adapters(rows, threshold):
+    newest_first = sorted(rows, key=lambda row: row["date"], reverse=True)
+    return (
+        calculate_current_streak(newest_first, threshold),
+        calculate_longest_streak(rows, threshold),
+        calculate_streak_state(rows, threshold),
+        calculate_consistency_rate(rows),
+        calculate_diligence_rate(rows),
+    )
+
+def test_adapters_match_legacy_loops():
+    print("Testing Metrics Kernel...")
+    rng = random.Random(11)
+    numpy = metrics.np
+    try:
+        for _ in range(200):
+            rows = synthetic_rows(rng, rng.randint(1, 60))
+            threshold = rng.choice([50.0, 70.0])
+            current, longest, last_success, consistency, diligence = legacy_rates(rows, threshold)
+            shuffled = rows[:]
+            rng.shuffle(shuffled)
+
+            # Same answers with and without NumPy, whatever order the rows come in
+            for backend in [numpy, None]:
+                metrics.np = backend
+                assert adapters(shuffled, threshold) == (
+                    current, longest, (current, longest, last_success), consistency, diligence
+                )
+    finally:
+        metrics.np = numpy
+
+    assert calculate_current_streak([]) == calculate_longest_streak([]) == 0
+    assert calculate_streak_state([]) == (0, 0, None)
+    # Days without a score yet count as unsuccessful instead of raising
+    assert calculate_streak_state([{"date": "2024-01-02", "overall_completion_pct": None},
+                                   {"date": "2024-01-01", "overall_completion_pct": 90}]) == (0, 1, "2024-01-01")
+    print("Metrics Kernel: SUCCESS")
+
+def test_batched_challenges_and_rolling_windows():
+    print("Testing Batched Metrics Kernel...")
+    rng = random.Random(5)
+    batches = {key: synthetic_rows(rng, rng.randint(1, 30)) for key in ["c3", "c1", "c2"]}
+    rows = [(key, row) for key, group in batches.items() for row in group]
+    rng.shuffle(rows)
+    columns = dict(
+        completion=[row["overall_completion_pct"] for _, row in rows],
+        consistency=[row["consistency_score"] for _, row in rows],
+        diligence=[row["diligence_score"] for _, row in rows],
+        dates=[row["date"] for _, row in rows],
+        groups=[key for key, _ in rows],
+        window=7,
+    )
+
+    numpy = metrics.np
+    try:
+        results = []
+        for backend in [numpy, None]:
+            metrics.np = backend
+            results.append(metrics_kernel(**columns))
+    finally:
+        metrics.np = numpy
+
+    for result in results:
+        assert list(result["group_keys"]) == ["c1", "c2", "c3"]
+        for g, key in enumerate(result["group_keys"]):
+            current, longest, last_success, consistency, diligence = legacy_rates(batches[key], 70.0)
+            assert (result["current_streak"][g], result["longest_streak"][g]) == (current, longest)
+            last = result["last_success"][g]
+            assert (rows[last][1]["date"] if last >= 0 else None) == last_success
+            assert round(float(result["consistency_rate"][g]), 1) == consistency
+            assert abs(result["diligence_rate"][g] - sum(r["diligence_score"] for r in batches[key]) / len(batches[key])) < 1e-9
+
+        # Rolling windows cover the row and up to six before it, within its own challenge
+        for position, index in enumerate(result["order"]):
+            key, row = rows[index]
+            group = batches[key]
+            at = group.index(row)
+            recent = group[max(at - 6, 0):at + 1]
+            expected = sum(r["overall_completion_pct"] for r in recent) / len(recent)
+            assert abs(result["rolling_completion"][position] - expected) < 1e-9
+
+    # The two backends agree row for row
+    for name in ["order", "streak", "days"]:
+        assert [int(v) for v in results[0][name]] == [int(v) for v in results[1][name]]
+    print("Batched Metrics Kernel: SUCCESS")
+
+def test_empty_input():
+    print("Testing Empty Metrics Kernel...")
+    numpy = metrics.np
+    try:
+        for backend in [numpy, None]:
+            metrics.np = backend
+            # One challenge with no days yet, and a batch of no challenges
+            for kwargs in [{}, {"groups": []}, {"groups": [], "dates": [], "window": None}]:
+                result = metrics_kernel([], **kwargs)
+                assert len(result["group_keys"]) == 0
+                for name in ["days", "current_streak", "longest_streak", "last_success",
+                             "consistency_rate", "diligence_rate", "order", "streak"]:
+                    assert len(result[name]) == 0, name
+                assert ("rolling_completion" in result) == ("window" not in kwargs)
+                assert all(len(v) == 0 for k, v in result.items() if k.startswith("rolling_"))
+    finally:
+        metrics.np = numpy
+    print("Empty Metrics Kernel: SUCCESS")
+
+if __name__ == "__main__":
+    test_adapters_match_legacy_loops()
+    test_batched_challenges_and_rolling_windows()
+    test_empty_input()
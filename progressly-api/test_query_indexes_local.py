@@ -0,0 +1,121 @@
+from datetime import date, datetime, time, timedelta
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel.pool import StaticPool
+import sys
+import os
+
+# Add current directory to sys.path to ensure imports work
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from main import app
+from database import get_session
+from dependencies import get_db_session, get_current_user
+from models import Category, LoggedActivity
+from effective_date import resolve_current_effective_date
+
+# Setup in-memory SQLite
+engine = create_engine(
+    "sqlite://",
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool
+)
+SQLModel.metadata.create_all(engine)
+
+USER_ID = "index-test-user"
+
+def get_session_override():
+    with Session(engine) as session:
+        yield session
+
+def get_current_user_override():
+    return USER_ID
+
+def seed():
+    today = date.today()
+    with Session(engine) as session:
+        sleep = Category(user_id=USER_ID, name="Sleep", color="#000000")
+        work = Category(user_id=USER_ID, name="Work", color="#FFFFFF")
+        session.add_all([sleep, work])
+        session.commit()
+        for days_ago in range(60):
+            day = today - timedelta(days=days_ago)
+            session.add(LoggedActivity(
+                user_id=USER_ID, activity_name="Deep work", category_id=work.id,
+                start_time=time(9, 0), end_time=time(11, 0),
+                activity_date=datetime.combine(day, time(11, 0)), effective_date=day,
+            ))
+            session.add(LoggedActivity(
+                user_id=USER_ID, activity_name="Sleep", category_id=sleep.id,
+                start_time=time(23, 0), end_time=time(7, 0),
+                activity_date=datetime.combine(day, time(7, 0)), effective_date=day,
+            ))
+        session.commit()
+
+def capture_statements(action):
+    """Run action() and return the (statement, parameters) it executed."""
+    executed = []
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append((statement, parameters))
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        action()
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    return executed
+
+def query_plan(statement, parameters):
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+    return " | ".join(row[-1] for row in rows)
+
+def assert_index_used(executed, table_marker, index_name):
+    matching = [(s, p) for s, p in executed if table_marker in s and s.lstrip().upper().startswith("SELECT")]
+    assert matching, f"No statement touching {table_marker} was executed"
+    plans = [query_plan(s, p) for s, p in matching]
+    for plan in plans:
+        print(f"  {plan}")
+    assert any(f"USING INDEX {index_name}" in plan or f"USING COVERING INDEX {index_name}" in plan for plan in plans), \
+        f"Expected an index scan on {index_name}, got: {plans}"
+
+def test_hot_queries_use_indexes():
+    print("Testing Hot Query Plans...")
+    previous_overrides = dict(app.dependency_overrides)
+    app.dependency_overrides[get_db_session] = get_session_override
+    app.dependency_overrides[get_session] = get_session_override
+    app.dependency_overrides[get_current_user] = get_current_user_override
+    client = TestClient(app)
+    seed()
+    today = date.today()
+
+    try:
+        # get_activities: interval overlap on the persisted start_at/end_at
+        executed = capture_statements(
+            lambda: client.get(f"/api/activities?target_date={(today - timedelta(days=10)).isoformat()}")
+        )
+        assert_index_used(executed, "FROM loggedactivity", "ix_loggedactivity_user_id_start_at")
+
+        # Windowed bootstrap: effective_date range
+        executed = capture_statements(
+            lambda: client.get(f"/api/dashboard-bootstrap?from={(today - timedelta(days=7)).isoformat()}")
+        )
+        assert_index_used(executed, "FROM loggedactivity", "ix_loggedactivity_user_id_effective_date")
+
+        # Effective-date resolver: recent sleeps of one category
+        def resolve():
+            with Session(engine) as session:
+                resolve_current_effective_date(session, USER_ID, today, day_version=-1)
+        executed = capture_statements(resolve)
+        assert_index_used(executed, "category_id = ", "ix_loggedactivity_user_id_category_id_activity_date")
+
+        # Case-insensitive category lookup on create
+        executed = capture_statements(lambda: client.post("/api/categories/", json={"name": "WORK"}))
+        assert_index_used(executed, "lower(category.name)", "ix_category_user_id_lower_name")
+    finally:
+        app.dependency_overrides = previous_overrides
+    print("Hot Query Plans: SUCCESS")
+
+if __name__ == "__main__":
+    test_hot_queries_use_indexes()
@@ -0,0 +1,100 @@
+import re
+from datetime import date, timedelta
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel.pool import StaticPool
+import sys
+import os
+
+# Add current directory to sys.path to ensure imports work
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from main import app
+from database import get_session
+from dependencies import get_db_session, get_current_user
+from models import Category, Challenge
+from services.reference_cache import reference_cache_stats
+
+# Setup in-memory SQLite
+engine = create_engine(
+    "sqlite://",
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool
+)
+SQLModel.metadata.create_all(engine)
+
+USER_ID = "reference-cache-user"
+
+def get_session_override():
+    with Session(engine) as session:
+        yield session
+
+def get_current_user_override():
+    return USER_ID
+
+def seed():
+    today = date.today()
+    with Session(engine) as session:
+        work = Category(user_id=USER_ID, name="Work", color="#FFFFFF")
+        session.add(work)
+        session.add(Challenge(
+            user_id=USER_ID, name="30 Days", start_date=today - timedelta(days=2),
+            end_date=today + timedelta(days=27), duration_days=30,
+            commitments=[{"id": "c1", "habit": "Deep work", "category": "Work", "target": 2, "unit": "hours"}],
+        ))
+        session.commit()
+        return work.id
+
+def log_activity(client, category_id, name):
+    return client.post("/api/activities", json={
+        "activity_name": name, "start_time": "09:00:00", "end_time": "10:00:00",
+        "category_id": category_id, "target_date": date.today().isoformat(),
+    })
+
+def test_activity_logging_uses_reference_cache():
+    print("Testing Reference Cache on Activity Logging...")
+    previous_overrides = dict(app.dependency_overrides)
+    app.dependency_overrides[get_db_session] = get_session_override
+    app.dependency_overrides[get_session] = get_session_override
+    app.dependency_overrides[get_current_user] = get_current_user_override
+    client = TestClient(app)
+    work_id = seed()
+
+    statements = []
+    def record_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    try:
+        # Warm the cache
+        assert log_activity(client, work_id, "Deep work").status_code == 200
+
+        before = reference_cache_stats()
+        event.listen(engine, "before_cursor_execute", record_statement)
+        try:
+            response = log_activity(client, work_id, "Deep work")
+        finally:
+            event.remove(engine, "before_cursor_execute", record_statement)
+        after = reference_cache_stats()
+
+        assert response.status_code == 200
+        assert response.json()["category"]["name"] == "Work"
+        assert after["misses"] == before["misses"]
+        assert after["hits"] > before["hits"]
+        for statement in statements:
+            print(f"  {statement.splitlines()[0][:100]}")
+        reads = [s for s in statements if s.lstrip().upper().startswith("SELECT")]
+        reference_tables = [Category.__table__.name, Challenge.__table__.name]
+        assert not any(re.search(rf"\bFROM {table}\b", s) for s in reads for table in reference_tables)
+
+        # Renaming a category invalidates the cached copy
+        response = client.put(f"/api/categories/{work_id}", json={"name": "Focus"})
+        assert response.status_code == 200
+        assert log_activity(client, work_id, "Deep work").json()["category"]["name"] == "Focus"
+    finally:
+        app.dependency_overrides = previous_overrides
+    print("Reference Cache on Activity Logging: SUCCESS")
+
+if __name__ == "__main__":
+    test_activity_logging_uses_reference_cache()
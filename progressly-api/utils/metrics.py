@@ -1,23 +1,249 @@
 # utils/metrics.py
 """
 Streak and metrics calculation utilities for challenge tracking.
+
+The work is done by metrics_kernel(), which takes the daily metrics as columns
+(completion, consistency, diligence, dates) and computes streaks, rates and
+rolling windows for one challenge or a batch of them in a single vectorized
+pass. The calculate_* functions are thin adapters that pull the columns out of
+a list of rows (dicts or objects) and call it.
 """
 
-from typing import List, Any
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 from datetime import date
 
+# NumPy is optional - without it the kernel runs the same computation as a Python loop
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def meets_threshold(completion: Optional[float], threshold: float = 70.0) -> bool:
+    """Whether a day's overall completion makes it a successful (streak) day."""
+    return completion is not None and completion >= threshold
+
+
+# --- Columnar kernel ---
+
+def metrics_kernel(
+    completion: Sequence[Optional[float]],
+    consistency: Optional[Sequence[Optional[float]]] = None,
+    diligence: Optional[Sequence[Optional[float]]] = None,
+    dates: Optional[Sequence[Any]] = None,
+    groups: Optional[Sequence[Any]] = None,
+    threshold: float = 70.0,
+    window: Optional[int] = 7,
+) -> Dict[str, Any]:
+    """
+    Streaks, rates and rolling windows over daily metrics given as columns.
+
+    Args:
+        completion: overall_completion_pct per row (None/NaN counts as unsuccessful)
+        consistency: consistency_score per row (None = 0; omitted = all 0)
+        diligence: diligence_score per row (None = 0; omitted = all 0)
+        dates: date per row (dates or ISO strings); rows are put in date order
+            within each group unless they already are. None = rows are in order
+        groups: challenge key per row, to process many challenges at once.
+            None = all rows belong to one challenge
+        threshold: Minimum completion percentage to count as "successful" day
+        window: Rows per rolling window (a row and the ones before it in its
+            group); None skips the rolling windows
+
+    Returns:
+        dict of arrays (lists without NumPy). Per group, in sorted key order:
+            group_keys, days, current_streak, longest_streak,
+            last_success (input row index of the last successful day, or -1),
+            consistency_rate, diligence_rate (percentages, unrounded)
+        Per row, in processing order (input row index in `order`):
+            order, streak (consecutive successful days ending at the row),
+            rolling_completion, rolling_consistency, rolling_diligence
+            (trailing means; consistency as the percentage of days shown up)
+    """
+    if np is not None:
+        return _metrics_kernel_numpy(completion, consistency, diligence, dates, groups, threshold, window)
+    return _metrics_kernel_python(completion, consistency, diligence, dates, groups, threshold, window)
+
+
+def _day_number(value: Any) -> int:
+    """Sort key for a date, datetime or ISO date string (None sorts first)."""
+    if value is None:
+        return -1
+    return (date.fromisoformat(value) if isinstance(value, str) else value).toordinal()
+
+
+def _metrics_kernel_numpy(completion, consistency, diligence, dates, groups, threshold, window):
+    n = len(completion)
+    completion = np.asarray(completion, dtype=float)  # None -> NaN
+    consistency = np.zeros(n) if consistency is None else np.nan_to_num(np.asarray(consistency, dtype=float))
+    diligence = np.zeros(n) if diligence is None else np.nan_to_num(np.asarray(diligence, dtype=float))
+
+    if groups is None:
+        group_keys, codes = np.zeros(1 if n else 0, dtype=int), np.zeros(n, dtype=int)
+    else:
+        group_keys, codes = np.unique(np.asarray(groups), return_inverse=True)
+        codes = codes.reshape(-1)
+
+    if n == 0:
+        # No rows, no groups: every column is empty (ends/starts below assume a row)
+        empty = {key: np.zeros(0, dtype=int) for key in [
+            "days", "current_streak", "longest_streak", "last_success", "order", "streak",
+        ]}
+        empty.update({key: np.zeros(0) for key in ["consistency_rate", "diligence_rate"]})
+        if window is not None:
+            empty.update({key: np.zeros(0) for key in ["rolling_completion", "rolling_consistency", "rolling_diligence"]})
+        return {"group_keys": group_keys[:0], **empty}
+
+    # Group, then date order - sorting only when the rows aren't in it already
+    order = np.arange(n)
+    if n > 1:
+        if dates is None:
+            day_keys = None
+        elif isinstance(dates, np.ndarray):
+            day_keys = dates.astype("datetime64[D]").astype("int64")
+        else:
+            # Much faster than letting NumPy convert date objects itself
+            day_keys = np.fromiter((_day_number(d) for d in dates), dtype=np.int64, count=n)
+        same_group = codes[1:] == codes[:-1]
+        in_order = (codes[1:] >= codes[:-1]) if day_keys is None else (
+            (codes[1:] > codes[:-1]) | (same_group & (day_keys[1:] >= day_keys[:-1]))
+        )
+        if not in_order.all():
+            order = np.argsort(codes, kind="stable") if day_keys is None else np.lexsort((day_keys, codes))
+            completion, consistency, diligence, codes = completion[order], consistency[order], diligence[order], codes[order]
+
+    position = np.arange(n)
+    group_start = np.ones(n, dtype=bool)
+    group_start[1:] = codes[1:] != codes[:-1]
+    starts = np.flatnonzero(group_start)
+    ends = np.append(starts[1:], n) - 1
+    first_of_row = np.maximum.accumulate(np.where(group_start, position, 0))
+
+    # A row's streak is its distance from the last unsuccessful row before it,
+    # or from just before its group's first row
+    success = completion >= threshold
+    last_break = np.maximum.accumulate(np.where(~success, position, np.where(group_start, position - 1, -1)))
+    streak = np.where(success, position - last_break, 0)
+
+    def rolling_mean(values):
+        cumulative = np.concatenate(([0.0], np.cumsum(values)))
+        lower = np.maximum(position + 1 - window, first_of_row)
+        return (cumulative[position + 1] - cumulative[lower]) / (position + 1 - lower)
+
+    def group_total(values):
+        cumulative = np.cumsum(values)
+        return cumulative[ends] - np.where(starts > 0, cumulative[starts - 1], 0.0)
+
+    days = ends - starts + 1
+    last_success = np.maximum.reduceat(np.where(success, position, -1), starts)
+    result = {
+        "group_keys": group_keys,
+        "days": days,
+        "current_streak": streak[ends],
+        "longest_streak": np.maximum.reduceat(streak, starts),
+        "last_success": np.where(last_success >= 0, order[np.maximum(last_success, 0)], -1),
+        "consistency_rate": group_total(consistency > 0) / days * 100,
+        "diligence_rate": group_total(diligence) / days,
+        "order": order,
+        "streak": streak,
+    }
+    if window is not None:
+        result["rolling_completion"] = rolling_mean(np.nan_to_num(completion))
+        result["rolling_consistency"] = rolling_mean(consistency > 0) * 100
+        result["rolling_diligence"] = rolling_mean(diligence)
+    return result
+
+
+def _metrics_kernel_python(completion, consistency, diligence, dates, groups, threshold, window):
+    n = len(completion)
+    consistency = [0.0] * n if consistency is None else [c or 0.0 for c in consistency]
+    diligence = [0.0] * n if diligence is None else [d or 0.0 for d in diligence]
+    completion_values = [c if c is not None and c == c else 0.0 for c in completion]  # None/NaN -> 0, as in the mean
+    group_keys = sorted(set(groups)) if groups is not None else ([0] if n else [])
+    code_of = {key: code for code, key in enumerate(group_keys)}
+    codes = [0] * n if groups is None else [code_of[key] for key in groups]
+    day_keys = [0] * n if dates is None else [_day_number(d) for d in dates]
+
+    sort_keys = list(zip(codes, day_keys))
+    order = list(range(n))
+    if any(sort_keys[i] > sort_keys[i + 1] for i in range(n - 1)):
+        order.sort(key=sort_keys.__getitem__)
+
+    per_row = ["streak"] + (["rolling_completion", "rolling_consistency", "rolling_diligence"] if window is not None else [])
+    result = {key: [] for key in [
+        "days", "current_streak", "longest_streak", "last_success", "consistency_rate", "diligence_rate", *per_row
+    ]}
+    result["group_keys"] = group_keys
+    result["order"] = order
+
+    start = 0
+    while start < n:
+        end = start
+        while end + 1 < n and codes[order[end + 1]] == codes[order[start]]:
+            end += 1
+        rows = order[start:end + 1]
+
+        streak = longest = 0
+        last_success = -1
+        total_consistent = total_diligence = 0.0
+        window_sums = [0.0, 0.0, 0.0]
+        for offset, i in enumerate(rows):
+            if meets_threshold(completion[i], threshold):
+                streak += 1
+                longest = max(longest, streak)
+                last_success = i
+            else:
+                streak = 0
+            total_consistent += 1 if consistency[i] > 0 else 0
+            total_diligence += diligence[i]
+            result["streak"].append(streak)
+
+            if window is not None:
+                window_sums[0] += completion_values[i]
+                window_sums[1] += 1 if consistency[i] > 0 else 0
+                window_sums[2] += diligence[i]
+                if offset >= window:
+                    leaving = rows[offset - window]
+                    window_sums[0] -= completion_values[leaving]
+                    window_sums[1] -= 1 if consistency[leaving] > 0 else 0
+                    window_sums[2] -= diligence[leaving]
+                size = min(offset + 1, window)
+                result["rolling_completion"].append(window_sums[0] / size)
+                result["rolling_consistency"].append(window_sums[1] / size * 100)
+                result["rolling_diligence"].append(window_sums[2] / size)
+
+        days = len(rows)
+        result["days"].append(days)
+        result["current_streak"].append(streak)
+        result["longest_streak"].append(longest)
+        result["last_success"].append(last_success)
+        result["consistency_rate"].append(total_consistent / days * 100)
+        result["diligence_rate"].append(total_diligence / days)
+        start = end + 1
+    return result
+
+
+# --- Adapters over lists of rows ---
+
+def _column(daily_metrics: List[Any], name: str, default: Any = 0) -> List[Any]:
+    """One field of every row, from dicts or objects."""
+    return [
+        metric.get(name, default) if isinstance(metric, dict) else getattr(metric, name, default)
+        for metric in daily_metrics
+    ]
+
 
 def calculate_current_streak(
-    daily_metrics: List[Any], 
+    daily_metrics: List[Any],
     threshold: float = 70.0
 ) -> int:
     """
     Calculate current streak of consecutive days with completion >= threshold.
-    
+
     Args:
         daily_metrics: List of daily_challenge_metrics ordered by date DESC (most recent first)
         threshold: Minimum completion percentage to count as "successful" day (default 70%)
-    
+
     Returns:
         Number of consecutive successful days from today
 
@@ -30,34 +256,24 @@ def calculate_current_streak(
         >>> calculate_current_streak(metrics)
         2
     """
-    streak = 0
-    for metric in daily_metrics:
-        # Handle both dict and object access
-        completion = (
-            metric.get('overall_completion_pct', 0) 
-            if isinstance(metric, dict) 
-            else getattr(metric, 'overall_completion_pct', 0)
-        )
-        
-        if completion >= threshold:
-            streak += 1
-        else:
-            break  # Streak broken
-    
-    return streak
+    if not daily_metrics:
+        return 0
+    # Oldest first, as given (no dates: the caller's order is the date order)
+    completion = _column(daily_metrics, 'overall_completion_pct')[::-1]
+    return int(metrics_kernel(completion, threshold=threshold, window=None)["current_streak"][0])
 
 
 def calculate_longest_streak(
-    daily_metrics: List[Any], 
+    daily_metrics: List[Any],
     threshold: float = 70.0
 ) -> int:
     """
     Calculate longest streak of consecutive days with completion >= threshold.
-    
+
     Args:
         daily_metrics: List of daily_challenge_metrics (any order, will be sorted)
         threshold: Minimum completion percentage to count as "successful" day (default 70%)
-    
+
     Returns:
         Maximum consecutive successful days in the dataset
 
@@ -75,74 +291,70 @@ def calculate_longest_streak(
     """
     if not daily_metrics:
         return 0
-    
-    # Sort by date chronologically (oldest first)
-    def get_date(metric):
-        if isinstance(metric, dict):
-            return metric.get('date')
-        return getattr(metric, 'date', None)
-    
-    sorted_metrics = sorted(daily_metrics, key=get_date)
-    
-    max_streak = 0
-    current_streak = 0
-    
-    for metric in sorted_metrics:
-        completion = (
-            metric.get('overall_completion_pct', 0) 
-            if isinstance(metric, dict) 
-            else getattr(metric, 'overall_completion_pct', 0)
-        )
-        
-        if completion >= threshold:
-            current_streak += 1
-            max_streak = max(max_streak, current_streak)
-        else:
-            current_streak = 0
-    
-    return max_streak
+    result = metrics_kernel(
+        _column(daily_metrics, 'overall_completion_pct'),
+        dates=_column(daily_metrics, 'date', None),
+        threshold=threshold,
+        window=None,
+    )
+    return int(result["longest_streak"][0])
+
+
+def calculate_streak_state(
+    daily_metrics: List[Any],
+    threshold: float = 70.0
+) -> Tuple[int, int, Optional[date]]:
+    """
+    Current streak, longest streak and last successful date in one pass.
+    This is the full recomputation the streak state stored on challenges
+    (see services/challenge_tracker.py) is verified against.
+
+    Args:
+        daily_metrics: List of daily_challenge_metrics (any order, will be sorted)
+        threshold: Minimum completion percentage to count as "successful" day (default 70%)
+
+    Returns:
+        (current streak, longest streak, date of the last successful day or None)
+    """
+    if not daily_metrics:
+        return 0, 0, None
+    dates = _column(daily_metrics, 'date', None)
+    result = metrics_kernel(_column(daily_metrics, 'overall_completion_pct'), dates=dates, threshold=threshold, window=None)
+    last_success = int(result["last_success"][0])
+    return (
+        int(result["current_streak"][0]),
+        int(result["longest_streak"][0]),
+        dates[last_success] if last_success >= 0 else None,
+    )
 
 
 def calculate_consistency_rate(daily_metrics: List[Any]) -> float:
     """
     Calculate percentage of days user showed up (any activity > 0).
-    
+
     Returns:
         Percentage (0-100) of days with any logged activity
     """
     if not daily_metrics:
         return 0.0
-    
-    days_with_activity = 0
-    for metric in daily_metrics:
-        consistency = (
-            metric.get('consistency_score', 0) 
-            if isinstance(metric, dict) 
-            else getattr(metric, 'consistency_score', 0)
-        )
-        if consistency > 0:
-            days_with_activity += 1
-    
-    return round((days_with_activity / len(daily_metrics)) * 100, 1)
+
+    result = metrics_kernel(
+        [None] * len(daily_metrics), consistency=_column(daily_metrics, 'consistency_score'), window=None
+    )
+    return round(float(result["consistency_rate"][0]), 1)
 
 
 def calculate_diligence_rate(daily_metrics: List[Any]) -> float:
     """
     Calculate average diligence (how much of target was achieved).
-    
+
     Returns:
         Average diligence percentage across all days
     """
     if not daily_metrics:
         return 0.0
-    
-    total_diligence = 0
-    for metric in daily_metrics:
-        diligence = (
-            metric.get('diligence_score', 0) 
-            if isinstance(metric, dict) 
-            else getattr(metric, 'diligence_score', 0)
-        )
-        total_diligence += diligence
-    
-    return round(total_diligence / len(daily_metrics), 1)
+
+    result = metrics_kernel(
+        [None] * len(daily_metrics), diligence=_column(daily_metrics, 'diligence_score'), window=None
+    )
+    return round(float(result["diligence_rate"][0]), 1)
@@ -0,0 +1,37 @@
+# utils/pagination.py
+"""
+Keyset (cursor) pagination helpers.
+
+Cursors are opaque, URL-safe strings that encode the sort key of the last row
+a client has seen. Fetching the next page is then a simple range condition on
+an index instead of an OFFSET scan that grows with history size.
+"""
+
+import base64
+from datetime import date, time
+from typing import Optional, Tuple
+
+from fastapi import HTTPException
+
+
+def encode_activity_cursor(effective_date: date, start_time: time, activity_id: int) -> str:
+    """Encode an activity's (effective_date, start_time, id) sort key as a cursor."""
+    raw = f"{effective_date.isoformat()}|{start_time.isoformat()}|{activity_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_activity_cursor(cursor: Optional[str]) -> Optional[Tuple[date, time, int]]:
+    """
+    Decode a cursor produced by encode_activity_cursor.
+    Raises a 400 if the cursor is malformed.
+    """
+    if not cursor:
+        return None
+
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        date_str, time_str, id_str = raw.split("|")
+        return date.fromisoformat(date_str), time.fromisoformat(time_str), int(id_str)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor.")